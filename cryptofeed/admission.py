@@ -0,0 +1,205 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Admission control of the websocket connections of an exchange: all the connections of
+an exchange (in a process) share a connect budget and a message budget, so that after
+an outage they come back at the rate the exchange accepts, most important first,
+instead of all at once.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+import weakref
+
+LOG = logging.getLogger("feedhandler")
+
+
+class TokenBucket:
+    """
+    Token bucket whose waiters are served by priority (lowest first), then in arrival order
+    """
+
+    def __init__(self, rate: float, burst: int, loop: asyncio.AbstractEventLoop = None):
+        """
+        rate: float
+            tokens added per second
+        burst: int
+            maximum number of tokens, the bucket starts full
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.loop = loop
+        self.waiters = []
+        self.seq = itertools.count()
+        self.timer = None
+
+    def _refill(self, now: float):
+        if now < self.paused_until:
+            self.updated = now
+            return
+        start = max(self.updated, self.paused_until)
+        self.tokens = min(self.burst, self.tokens + (now - start) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority: int = 0):
+        self._refill(time.monotonic())
+        if not self.waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        waiter = self.loop.create_future()
+        heapq.heappush(self.waiters, (priority, next(self.seq), waiter))
+        self._schedule()
+        await waiter
+
+    def pause(self, seconds: float):
+        """
+        Hand out no tokens for the next seconds, and start again from an empty bucket
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, now + seconds)
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self._schedule()
+
+    def _schedule(self):
+        if self.timer is not None or not self.waiters:
+            return
+        now = time.monotonic()
+        delay = (
+            max(0.0, self.paused_until - now) + max(0.0, 1 - self.tokens) / self.rate
+        )
+        self.timer = self.loop.call_later(delay, self._release)
+
+    def _release(self):
+        self.timer = None
+        self._refill(time.monotonic())
+        while self.waiters and self.tokens >= 1:
+            _, _, waiter = heapq.heappop(self.waiters)
+            # cancelled while waiting
+            if waiter.done():
+                continue
+            self.tokens -= 1
+            waiter.set_result(None)
+        while self.waiters and self.waiters[0][2].done():
+            heapq.heappop(self.waiters)
+        self._schedule()
+
+
+class AdmissionController:
+    """
+    Connect and message budgets shared by the websocket connections of an exchange, and
+    the backoff of their reconnects. One controller per exchange and event loop, see get.
+    """
+
+    # connections / messages per second and burst, exchanges override them with
+    # Exchange.websocket_limits
+    defaults = {
+        "connect_rate": 1,
+        "connect_burst": 5,
+        "message_rate": 10,
+        "message_burst": 20,
+        "max_backoff": 60,
+        "max_rate_limited_backoff": 180,
+    }
+
+    _controllers = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get(
+        cls, exchange: str, loop: asyncio.AbstractEventLoop = None, **limits
+    ) -> "AdmissionController":
+        """
+        The controller of the exchange for the loop (by default the running loop). limits
+        only apply when the controller is created, by the first feed of the exchange.
+        """
+        loop = loop if loop else asyncio.get_running_loop()
+        controllers = cls._controllers.setdefault(loop, {})
+        if exchange not in controllers:
+            controllers[exchange] = cls(exchange, loop, **limits)
+        return controllers[exchange]
+
+    def __init__(
+        self,
+        exchange: str,
+        loop: asyncio.AbstractEventLoop = None,
+        share: float = 1.0,
+        **limits,
+    ):
+        """
+        exchange: str
+            exchange id, for logging
+        share: float
+            fraction of the exchange's rates this controller may use, e.g. 1 / number of
+            processes connecting from the same IP
+        limits:
+            overrides of AdmissionController.defaults
+        """
+        unknown = set(limits) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown admission limits {sorted(unknown)}")
+        limits = {**self.defaults, **limits}
+        self.exchange = exchange
+        self.connects = TokenBucket(
+            limits["connect_rate"] * share,
+            max(1, int(limits["connect_burst"] * share)),
+            loop,
+        )
+        self.messages = TokenBucket(
+            limits["message_rate"] * share,
+            max(1, int(limits["message_burst"] * share)),
+            loop,
+        )
+        self.max_backoff = limits["max_backoff"]
+        self.max_rate_limited_backoff = limits["max_rate_limited_backoff"]
+
+    async def connect(self, priority: int = 0):
+        """
+        Wait for the budget to open a connection, lower priorities first
+        """
+        await self.connects.acquire(priority)
+
+    async def send(self, priority: int = 0):
+        """
+        Wait for the budget to send a message (subscriptions, ...)
+        """
+        await self.messages.acquire(priority)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before the next attempt after attempt consecutive failures: exponential,
+        capped at max_backoff, and jittered so connections that failed together spread out
+        """
+        delay = min(self.max_backoff, 2 ** max(0, attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def rate_limited(self, attempt: int) -> float:
+        """
+        The exchange rejected a connection with 429: stop connecting to it for a (capped,
+        jittered) delay, which is returned. Pauses every connection of the exchange, not
+        only the rejected one.
+        """
+        delay = min(self.max_rate_limited_backoff, 15 * 2 ** max(0, attempt - 1))
+        delay = random.uniform(delay / 2, delay)
+        LOG.warning(
+            "%s: rate limited - pausing new connections for %.1f seconds",
+            self.exchange,
+            delay,
+        )
+        self.connects.pause(delay)
+        return delay
@@ -5,11 +5,14 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 """
 
+import asyncio
 import time
 from decimal import Decimal
 
 import numpy as np
 
+from cryptofeed.types import BookDeltaBatch, OrderBook, Trade, TradeBatch
+
 
 class AggregateCallback:
     def __init__(self, handler):
@@ -88,6 +91,76 @@ class OHLCV(AggregateCallback):
         self._agg(trade.symbol, trade.amount, trade.price)
 
 
+class Batch(AggregateCallback):
+    """
+    Accumulates the trades (TradeBatch) or book deltas (BookDeltaBatch) of each symbol in
+    columns, and calls the handler with a batch and the receipt timestamp of its last
+    update once it holds size rows, or window seconds after its first update (on a timer
+    of the event loop, a symbol going quiet does not hold its batch back). The handler
+    owns the batch, the next updates go into a new one. Book snapshots have no delta and
+    are left out.
+    """
+
+    def __init__(self, *args, size=1024, window=1):
+        super().__init__(*args)
+        self.size = size
+        self.window = window
+        self.batches = {}
+        self.receipts = {}
+
+    def _batch(self, obj):
+        key = (type(obj), obj.exchange, obj.symbol)
+        batch = self.batches.get(key)
+        if batch is None:
+            if isinstance(obj, Trade):
+                batch = TradeBatch(
+                    obj.exchange,
+                    obj.symbol,
+                    capacity=self.size,
+                    fixed_point=obj.fixed_point,
+                )
+            elif isinstance(obj, OrderBook):
+                batch = BookDeltaBatch(
+                    obj.exchange,
+                    obj.symbol,
+                    capacity=self.size,
+                    fixed_point=obj.fixed_point,
+                )
+            else:
+                raise TypeError(f"{type(obj).__name__} updates cannot be batched")
+            self.batches[key] = batch
+            asyncio.get_running_loop().call_later(self.window, self._expire, key, batch)
+        return key, batch
+
+    def _take(self, key) -> tuple:
+        return self.batches.pop(key), self.receipts.pop(key)
+
+    def _expire(self, key, batch):
+        # the batch may have been handed over already, when it was full. It is taken now,
+        # so the updates appended before the handler runs go into a new one
+        if self.batches.get(key) is batch:
+            asyncio.create_task(self.handler(*self._take(key)))
+
+    async def _append(self, obj, receipt_timestamp: float):
+        if isinstance(obj, OrderBook) and not obj.delta:
+            return
+        key, batch = self._batch(obj)
+        batch.append(obj, receipt_timestamp)
+        self.receipts[key] = receipt_timestamp
+        if len(batch) >= self.size:
+            await self.handler(*self._take(key))
+
+    async def __call__(self, obj, receipt_timestamp: float):
+        await self._append(obj, receipt_timestamp)
+
+    async def batch(self, objs: list, receipt_timestamp: float):
+        """
+        The trades of a message, see Feed.callback_batch
+        """
+        for obj in objs:
+            await self._append(obj, receipt_timestamp)
+
+
 class RenkoFixed(AggregateCallback):
     """
     Aggregate trades into Renko bricks with fixed size
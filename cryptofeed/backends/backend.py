@@ -6,21 +6,53 @@ associated with this software.
 """
 
 import asyncio
+import time
 from asyncio.queues import Queue
 from contextlib import asynccontextmanager
-from multiprocessing import Pipe, Process
+from multiprocessing import Pipe, Process, RawValue
+
+from cryptofeed.metrics import GAUGE, REGISTRY
+from cryptofeed.types import Buffer
+from cryptofeed.util.time import to_ns, to_seconds
 
 SHUTDOWN_SENTINEL = "STOP"
 
 
 class BackendQueue:
+    pool = None
+
+    def use_pool(self, pool):
+        """
+        pool: WriterPool
+            send the updates to a writer pool shared by all feed workers (see
+            cryptofeed.backends.pool) instead of a writer task / process of this backend.
+            The backend must implement prepare.
+        """
+        if type(self).prepare is BackendQueue.prepare:
+            raise ValueError(
+                f"{type(self).__name__} does not support writing through a WriterPool"
+            )
+        self.pool = pool
+
+    def prepare(self, data):
+        """
+        Convert an update into the item written by the sink of a WriterPool
+        """
+        raise NotImplementedError
+
     def start(self, loop: asyncio.AbstractEventLoop, multiprocess=False):
         if hasattr(self, "started") and self.started:
             # prevent a backend callback from starting more than 1 writer and creating more than 1 queue
             return
+        if self.pool is not None:
+            self.started = True
+            return
         self.multiprocess = multiprocess
         if self.multiprocess:
             self.queue = Pipe(duplex=False)
+            # updates sent to the writer process, and written by it (shared memory)
+            self.sent = 0
+            self.written = RawValue("q", 0)
             self.worker = Process(
                 target=BackendQueue.worker, args=(self.writer,), daemon=True
             )
@@ -28,10 +60,58 @@ class BackendQueue:
         else:
             self.queue = Queue()
             self.worker = loop.create_task(self.writer())
+            REGISTRY.register(self)
         self.started = True
 
-    async def stop(self):
+    def collect(self):
+        yield (
+            "cryptofeed_backend_queue_depth",
+            GAUGE,
+            "Updates waiting to be written by the backend",
+            {"backend": type(self).__name__},
+            self.queue.qsize(),
+        )
+
+    def queue_depth(self) -> int:
+        """
+        Number of updates waiting to be written: in the queue, or sent to the writer process
+        and not written yet
+        """
+        if not getattr(self, "started", False) or self.pool is not None:
+            return 0
         if self.multiprocess:
+            return self.sent - self.written.value
+        return self.queue.qsize()
+
+    def _written(self, updates: list, start: float):
+        """
+        Records how long the writer took to write the updates, and how long after their
+        receipt they were written (acknowledged by the store)
+        """
+        if not hasattr(self, "flush_time"):
+            backend = type(self).__name__
+            self.flush_time = REGISTRY.histogram(
+                "cryptofeed_backend_flush_seconds",
+                "Time to write a batch of updates",
+                backend=backend,
+            )
+            self.write_latency = REGISTRY.histogram(
+                "cryptofeed_backend_write_latency_seconds",
+                "Time between the receipt of an update and its write",
+                backend=backend,
+            )
+        now = time.time()
+        self.flush_time.observe(time.perf_counter() - start)
+        for update in updates:
+            if isinstance(update, dict) and update.get("receipt_timestamp"):
+                self.write_latency.observe(
+                    now - to_seconds(update["receipt_timestamp"])
+                )
+
+    async def stop(self):
+        if self.pool is not None:
+            self.pool.flush()
+        elif self.multiprocess:
             self.queue[1].send(SHUTDOWN_SENTINEL)
             self.worker.join()
         else:
@@ -50,80 +130,164 @@ class BackendQueue:
         raise NotImplementedError
 
     async def write(self, data):
-        if self.multiprocess:
+        if self.pool is not None:
+            self.pool.submit(
+                (self.key, data["exchange"], data["symbol"]), self.prepare(data)
+            )
+        elif self.multiprocess:
+            self.sent += 1
             self.queue[1].send(data)
         else:
             await self.queue.put(data)
 
+    async def write_many(self, updates: list):
+        """
+        Same as write for several updates, with a single message to the writer process
+        """
+        if self.pool is not None:
+            for data in updates:
+                self.pool.submit(
+                    (self.key, data["exchange"], data["symbol"]), self.prepare(data)
+                )
+        elif self.multiprocess:
+            self.sent += len(updates)
+            self.queue[1].send(updates)
+        else:
+            for data in updates:
+                self.queue.put_nowait(data)
+
     @asynccontextmanager
     async def read_queue(self) -> list:
+        count = 0
         if self.multiprocess:
             msg = self.queue[0].recv()
             if msg == SHUTDOWN_SENTINEL:
                 self.running = False
-                yield []
+                updates = []
             else:
-                yield [msg]
+                # a list is a batch sent by write_many
+                updates = msg if isinstance(msg, list) else [msg]
         else:
             current_depth = self.queue.qsize()
             if current_depth == 0:
                 update = await self.queue.get()
-                if update == SHUTDOWN_SENTINEL:
-                    yield []
-                else:
-                    yield [update]
-                self.queue.task_done()
+                count = 1
+                updates = [] if update == SHUTDOWN_SENTINEL else [update]
             else:
-                ret = []
-                count = 0
+                updates = []
                 while current_depth > count:
                     update = await self.queue.get()
                     count += 1
                     if update == SHUTDOWN_SENTINEL:
                         self.running = False
                         break
-                    ret.append(update)
+                    updates.append(update)
+
+        start = time.perf_counter()
+        yield updates
+        if updates:
+            self._written(updates, start)
+            if self.multiprocess:
+                self.written.value += len(updates)
+
+        for _ in range(count):
+            self.queue.task_done()
 
-                yield ret
 
-                for _ in range(count):
-                    self.queue.task_done()
+def _set_timestamps(backend, data: dict, timestamp, receipt_timestamp):
+    if not timestamp:
+        data["timestamp"] = float(receipt_timestamp)
+    # integer nanoseconds if the backend was created with timestamp_ns, float seconds
+    # otherwise (a ReceiptTimestamp is not serializable as is)
+    data["receipt_timestamp"] = (
+        to_ns(receipt_timestamp) if backend.timestamp_ns else float(receipt_timestamp)
+    )
+
+
+def _serialized(backend, dtype, receipt_timestamp, **kwargs) -> dict:
+    """
+    The update of a binary backend: the MessagePack serialization of dtype (see
+    cryptofeed.types.Buffer) in data, with the fields the writers need besides it
+    """
+    receipt_timestamp = (
+        to_ns(receipt_timestamp) if backend.timestamp_ns else float(receipt_timestamp)
+    )
+    if backend.buffer is None:
+        backend.buffer = Buffer()
+    return {
+        "exchange": dtype.exchange,
+        "symbol": dtype.symbol,
+        "receipt_timestamp": receipt_timestamp,
+        "data": dtype.serialize(receipt_timestamp, backend.buffer, **kwargs),
+    }
 
 
 class BackendCallback:
+    timestamp_ns = False
+    # write the serialization of the updates (see _serialized) rather than their dicts
+    binary = False
+    buffer = None
+
     async def __call__(self, dtype, receipt_timestamp: float):
+        if self.binary:
+            await self.write(_serialized(self, dtype, receipt_timestamp))
+            return
         data = dtype.to_dict(numeric_type=self.numeric_type, none_to=self.none_to)
-        if not dtype.timestamp:
-            data["timestamp"] = receipt_timestamp
-        data["receipt_timestamp"] = receipt_timestamp
+        _set_timestamps(self, data, dtype.timestamp, receipt_timestamp)
         await self.write(data)
 
+    async def batch(self, dtypes: list, receipt_timestamp: float):
+        """
+        Writes the updates of a message at once if the backend implements write_many
+        """
+        updates = []
+        for dtype in dtypes:
+            if self.binary:
+                updates.append(_serialized(self, dtype, receipt_timestamp))
+                continue
+            data = dtype.to_dict(numeric_type=self.numeric_type, none_to=self.none_to)
+            _set_timestamps(self, data, dtype.timestamp, receipt_timestamp)
+            updates.append(data)
+        if hasattr(self, "write_many"):
+            await self.write_many(updates)
+        else:
+            for data in updates:
+                await self.write(data)
+
 
 class BackendBookCallback:
+    timestamp_ns = False
+    binary = False
+    buffer = None
+
     async def _write_snapshot(self, book, receipt_timestamp: float):
+        if self.binary:
+            await self.write(_serialized(self, book, receipt_timestamp))
+            return
         data = book.to_dict(numeric_type=self.numeric_type, none_to=self.none_to)
         del data["delta"]
-        if not book.timestamp:
-            data["timestamp"] = receipt_timestamp
-        data["receipt_timestamp"] = receipt_timestamp
+        _set_timestamps(self, data, book.timestamp, receipt_timestamp)
         await self.write(data)
 
     async def __call__(self, book, receipt_timestamp: float):
         if self.snapshots_only:
             await self._write_snapshot(book, receipt_timestamp)
         else:
-            data = book.to_dict(
-                delta=book.delta is not None,
-                numeric_type=self.numeric_type,
-                none_to=self.none_to,
-            )
-            if not book.timestamp:
-                data["timestamp"] = receipt_timestamp
-            data["receipt_timestamp"] = receipt_timestamp
-
-            if book.delta is None:
-                del data["delta"]
+            if self.binary:
+                data = _serialized(
+                    self, book, receipt_timestamp, delta=book.delta is not None
+                )
             else:
+                data = book.to_dict(
+                    delta=book.delta is not None,
+                    numeric_type=self.numeric_type,
+                    none_to=self.none_to,
+                )
+                _set_timestamps(self, data, book.timestamp, receipt_timestamp)
+                if book.delta is None:
+                    del data["delta"]
+
+            if book.delta is not None:
                 self.snapshot_count[book.symbol] += 1
             await self.write(data)
             if (
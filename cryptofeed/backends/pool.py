@@ -0,0 +1,281 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import zlib
+from collections import defaultdict
+from multiprocessing.connection import Client, Listener, wait
+
+from cryptofeed.backends.backend import SHUTDOWN_SENTINEL
+from cryptofeed.metrics import REGISTRY, start_metrics
+
+LOG = logging.getLogger("feedhandler")
+
+
+class _Inbox:
+    """
+    The receiving end of a pool member: every process submitting to the member (each feed
+    worker) connects to it with its own connection, so a producer killed in the middle of
+    a send only breaks its own connection.
+    """
+
+    def __init__(self, address: str):
+        if os.path.exists(address):
+            # left by the previous process of this member
+            os.unlink(address)
+        self.listener = Listener(address, family="AF_UNIX")
+        self.conns = []
+        self.lock = threading.Lock()
+        self.wake_r, self.wake_w = multiprocessing.Pipe(duplex=False)
+        threading.Thread(target=self._accept, name="accept", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.conns.append(conn)
+            self.wake_w.send(None)
+
+    def get(self, timeout: float = None) -> list:
+        """
+        Returns the messages received (at most one per connection), waits up to timeout
+        seconds for one. Returns an empty list on timeout.
+        """
+        while True:
+            with self.lock:
+                conns = list(self.conns)
+            ready = wait(conns + [self.wake_r], timeout=timeout)
+            messages = []
+            for conn in ready:
+                if conn is self.wake_r:
+                    conn.recv()
+                    continue
+                try:
+                    messages.append(conn.recv())
+                except (EOFError, OSError):
+                    # the producer exited or was killed, maybe in the middle of a message
+                    with self.lock:
+                        self.conns.remove(conn)
+                    conn.close()
+            if messages or timeout is not None:
+                return messages
+
+    def close(self):
+        self.listener.close()
+        with self.lock:
+            for conn in self.conns:
+                conn.close()
+
+
+async def _drain(address: str, sink, max_batch: int, metrics: dict = None):
+    loop = asyncio.get_running_loop()
+    server = start_metrics(loop, **metrics) if metrics else None
+    flush_time = REGISTRY.histogram(
+        "cryptofeed_backend_flush_seconds",
+        "Time to write a batch of updates",
+        backend=type(sink).__name__,
+    )
+    inbox = _Inbox(address)
+    await sink.open()
+    running = True
+    while running:
+        batches = await loop.run_in_executor(None, inbox.get)
+        items = []
+        while batches:
+            for batch in batches:
+                if batch == SHUTDOWN_SENTINEL:
+                    running = False
+                else:
+                    items.extend(batch)
+            # after the sentinel, write everything the stopped workers sent
+            if len(items) >= max_batch and running:
+                break
+            batches = inbox.get(timeout=0)
+        if items:
+            try:
+                start = time.perf_counter()
+                await sink.write(items)
+                flush_time.observe(time.perf_counter() - start)
+            except Exception:
+                LOG.error(
+                    "WriterPool: failed to write %d updates", len(items), exc_info=True
+                )
+    inbox.close()
+    await sink.close()
+    if server is not None:
+        server.stop()
+
+
+def _run_member(address: str, sink, max_batch: int, metrics: dict = None):
+    # on ctrl-c keep writing until the feeds have flushed and the sentinel arrives
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(_drain(address, sink, max_batch, metrics))
+
+
+class WriterPool:
+    """
+    A fixed set of writer processes shared by the backends of all feed workers of a host,
+    in place of a writer process (and connection) per backend per worker.
+
+    Backends attached to the pool (BackendQueue.use_pool) prepare their updates in the feed
+    worker and submit them, routed by (data type, exchange, symbol) so the updates of a
+    symbol stay in order. The updates submitted during one event loop iteration are sent
+    to each member as a single batch, and each member writes everything it receives,
+    whatever the data type, in one batch through its sink (for example one redis pipeline
+    on one connection, see RedisStreamSink).
+
+    Each feed worker sends to each member over its own connection (a unix socket), so a
+    worker killed in the middle of a send (by the supervisor, when hung) does not block
+    the other workers, as a lock shared by all of them would.
+    """
+
+    def __init__(
+        self, sink, size: int = 2, max_batch: int = 1000, metrics: dict = None
+    ):
+        """
+        sink: object
+            writes the prepared updates, with async open(), write(items) and close()
+        size: int
+            number of writer processes
+        max_batch: int
+            maximum number of updates a member writes at once
+        metrics: dict
+            host and port of the metrics endpoints of the members (see
+            cryptofeed.metrics.start_metrics), member i serves on port + i
+        """
+        self.sink = sink
+        self.size = size
+        self.max_batch = max_batch
+        self.metrics = metrics
+        self.directory = tempfile.mkdtemp(prefix="cryptofeed-writers-")
+        self.addresses = [
+            os.path.join(self.directory, f"writer-{index}.sock")
+            for index in range(size)
+        ]
+        self.processes = [None] * size
+        # client side, in the feed workers
+        self.pid = os.getpid()
+        self.conns = {}
+        self.buffers = defaultdict(list)
+        self.flush_scheduled = False
+
+    def __getstate__(self):
+        # pickled to the feed workers (forkserver / spawn), which only connect to the members
+        state = dict(self.__dict__)
+        state["processes"] = [None] * self.size
+        state["conns"] = {}
+        return state
+
+    def _start_member(self, index: int):
+        metrics = None
+        if self.metrics:
+            metrics = {**self.metrics, "port": self.metrics.get("port", 9100) + index}
+        process = multiprocessing.Process(
+            target=_run_member,
+            args=(self.addresses[index], self.sink, self.max_batch, metrics),
+            name=f"writer-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(self.size):
+            self._start_member(index)
+        LOG.info("WriterPool: started %d writer processes", self.size)
+
+    def on_tick(self, supervisor=None):
+        """
+        Restart the members that died
+        """
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                LOG.error(
+                    "WriterPool: writer %d exited with code %s - restarting it",
+                    index,
+                    process.exitcode,
+                )
+                self._start_member(index)
+
+    def stop(self, timeout: float = 30):
+        for index, address in enumerate(self.addresses):
+            if self.processes[index] is None:
+                continue
+            try:
+                with Client(address, family="AF_UNIX") as conn:
+                    conn.send(SHUTDOWN_SENTINEL)
+            except OSError:
+                LOG.warning("WriterPool: writer %d is not running", index)
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                LOG.warning("WriterPool: writer %d did not stop - killing it", index)
+                process.kill()
+                process.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        LOG.info("WriterPool: stopped")
+
+    def submit(self, route: tuple, item):
+        """
+        route: tuple
+            (data type, exchange, symbol), updates with the same route are written in order
+        item: object
+            an update prepared for the sink
+        """
+        index = zlib.crc32("|".join(map(str, route)).encode()) % self.size
+        self.buffers[index].append(item)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_event_loop().call_soon(self.flush)
+
+    def _send(self, index: int, items: list) -> bool:
+        if self.pid != os.getpid():
+            # forked from the process that made these connections
+            self.pid = os.getpid()
+            self.conns = {}
+        # a connection broken by a restart of the member is made again once
+        for _ in range(2):
+            try:
+                if index not in self.conns:
+                    self.conns[index] = Client(self.addresses[index], family="AF_UNIX")
+                self.conns[index].send(items)
+                return True
+            except OSError:
+                conn = self.conns.pop(index, None)
+                if conn is not None:
+                    conn.close()
+        return False
+
+    def flush(self):
+        self.flush_scheduled = False
+        buffers, self.buffers = self.buffers, defaultdict(list)
+        for index, items in buffers.items():
+            if not self._send(index, items):
+                # the member is restarting, keep the updates for the next flush
+                LOG.warning(
+                    "WriterPool: writer %d is not reachable, retrying %d updates",
+                    index,
+                    len(items),
+                )
+                self.buffers[index][:0] = items
+        if self.buffers and not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_event_loop().call_later(1, self.flush)
@@ -17,6 +17,8 @@ from cryptofeed.backends.backend import (
     BackendCallback,
     BackendQueue,
 )
+from cryptofeed.metrics import REGISTRY
+from cryptofeed.util.time import to_seconds
 from redis import asyncio as aioredis
 
 
@@ -29,8 +31,13 @@ class RedisCallback(BackendQueue):
         key=None,
         none_to="None",
         numeric_type=float,
+        timestamp_ns=False,
         **kwargs,
     ):
+        """
+        timestamp_ns: bool
+            write the receipt timestamps in integer nanoseconds instead of float seconds
+        """
         self.host = os.getenv("REDIS_HOST", host)
         self.port = os.getenv("REDIS_PORT", port)
         """
@@ -47,6 +54,7 @@ class RedisCallback(BackendQueue):
         self.key = key if key else self.default_key
         self.numeric_type = numeric_type
         self.none_to = none_to
+        self.timestamp_ns = timestamp_ns
         self.running = True
 
 
@@ -96,6 +104,45 @@ class RedisZSetCallback(RedisCallback):
 
 
 class RedisStreamCallback(RedisCallback):
+    def __init__(self, *args, maxlen: int = None, binary: bool = False, **kwargs):
+        """
+        maxlen: int
+            approximate number of entries kept per stream, defaults to 100 for trades and 1
+            for everything else
+        binary: bool
+            write the updates serialized in MessagePack (see cryptofeed.types.Buffer) in the
+            data field of the entries, next to their receipt_timestamp, rather than a field
+            per key of their dicts. numeric_type and none_to do not apply.
+        """
+        self.maxlen = maxlen
+        self.binary = binary
+        super().__init__(*args, **kwargs)
+
+    def prepare(self, update: dict) -> tuple:
+        """
+        Returns the stream, fields and maximum length of the stream for an update
+        """
+        key = f'{self.key}-{update["exchange"]}-{update["symbol"]}'
+        maxlen = self.maxlen if self.maxlen else (100 if self.key == "trades" else 1)
+        if self.binary:
+            fields = {
+                "receipt_timestamp": update["receipt_timestamp"],
+                "data": update["data"],
+            }
+            return "{real-time}-" + key, fields, maxlen
+
+        if "delta" in update:
+            update["delta"] = json.dumps(update["delta"])
+        elif "book" in update:
+            update["book"] = json.dumps(update["book"])
+        elif "closed" in update:
+            update["closed"] = str(update["closed"])
+
+        if isinstance(update["timestamp"], datetime.datetime):
+            # keeps the fraction of the second, unlike mktime(timetuple())
+            update["timestamp"] = update["timestamp"].timestamp()
+        return "{real-time}-" + key, update, maxlen
+
     async def writer(self):
         # ssl=True needed for serverless Elasticache
         conn = aioredis.Redis(host=self.host, port=self.port, decode_responses=True)
@@ -104,23 +151,11 @@ class RedisStreamCallback(RedisCallback):
             async with self.read_queue() as updates:
                 async with conn.pipeline(transaction=False) as pipe:
                     for update in updates:
-                        if "delta" in update:
-                            update["delta"] = json.dumps(update["delta"])
-                        elif "book" in update:
-                            update["book"] = json.dumps(update["book"])
-                        elif "closed" in update:
-                            update["closed"] = str(update["closed"])
-
-                        if isinstance(update["timestamp"], datetime.datetime):
-                            update["timestamp"] = time.mktime(
-                                update["timestamp"].timetuple()
-                            )
-                        key = f'{self.key}-{update["exchange"]}-{update["symbol"]}'
-
+                        stream, update, maxlen = self.prepare(update)
                         pipe = pipe.xadd(
-                            "{real-time}-" + key,
+                            stream,
                             update,
-                            maxlen=100 if self.key == "trades" else 1,
+                            maxlen=maxlen,
                             approximate=True,
                         )
                     await pipe.execute()
@@ -129,6 +164,43 @@ class RedisStreamCallback(RedisCallback):
         await conn.connection_pool.disconnect()
 
 
+class RedisStreamSink:
+    """
+    Writes the updates prepared by RedisStreamCallback backends for a WriterPool: everything
+    a pool member receives goes into a single pipeline, on the member's single connection.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379):
+        self.host = os.getenv("REDIS_HOST", host)
+        self.port = os.getenv("REDIS_PORT", port)
+        self.conn = None
+        self.write_latency = None
+
+    async def open(self):
+        self.conn = aioredis.Redis(
+            host=self.host, port=self.port, decode_responses=True
+        )
+        # in the pool member, see WriterPool
+        self.write_latency = REGISTRY.histogram(
+            "cryptofeed_backend_write_latency_seconds",
+            "Time between the receipt of an update and its write",
+            backend=type(self).__name__,
+        )
+
+    async def write(self, items: list):
+        async with self.conn.pipeline(transaction=False) as pipe:
+            for stream, update, maxlen in items:
+                pipe.xadd(stream, update, maxlen=maxlen, approximate=True)
+            await pipe.execute()
+        now = time.time()
+        for _, update, _ in items:
+            self.write_latency.observe(now - to_seconds(update["receipt_timestamp"]))
+
+    async def close(self):
+        await self.conn.close()
+        await self.conn.connection_pool.disconnect()
+
+
 class RedisKeyCallback(RedisCallback):
 
     async def writer(self):
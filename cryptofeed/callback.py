@@ -23,6 +23,24 @@ class Callback:
             loop = asyncio.get_event_loop()
             await loop.run_in_executor(None, self.callback, (obj, receipt_timestamp))
 
+    async def batch(self, objs: list, receipt_timestamp):
+        """
+        Delivers the updates of a message at once: a coroutine callback is awaited for each
+        of them, a sync callback is called for all of them in a single executor job
+        """
+        if self.callback is None:
+            return
+        elif self.is_async:
+            for obj in objs:
+                await self.callback(obj, receipt_timestamp)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._call_each, objs, receipt_timestamp)
+
+    def _call_each(self, objs: list, receipt_timestamp):
+        for obj in objs:
+            self.callback((obj, receipt_timestamp))
+
 
 class TradeCallback(Callback):
     pass
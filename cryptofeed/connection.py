@@ -24,6 +24,7 @@ from yapic import json as json_parser
 
 from cryptofeed.exceptions import ConnectionClosed
 from cryptofeed.symbols import str_to_symbol
+from cryptofeed.util.time import time_ns
 
 LOG = logging.getLogger("feedhandler")
 
@@ -82,7 +83,12 @@ class AsyncConnection(Connection):
         self.id: str = conn_id
         self.received: int = 0
         self.sent: int = 0
+        # cumulative over reconnects, unlike received/sent
+        self.received_messages: int = 0
+        self.received_bytes: int = 0
+        # receipt time of the last message, in seconds and in nanoseconds (see time_ns)
         self.last_message = None
+        self.last_message_ns = None
         self.authentication = authentication
         self.subscription = subscription
         self.conn: Union[websockets.WebSocketClientProtocol, aiohttp.ClientSession] = (
@@ -159,6 +165,7 @@ class HTTPAsyncConn(AsyncConnection):
             self.sent = 0
             self.received = 0
             self.last_message = None
+            self.last_message_ns = None
 
     async def read(
         self,
@@ -178,7 +185,8 @@ class HTTPAsyncConn(AsyncConnection):
                 address, headers=header, params=params, proxy=self.proxy
             ) as response:
                 data = await response.text()
-                self.last_message = time.time()
+                self.last_message_ns = time_ns()
+                self.last_message = self.last_message_ns / 1e9
                 self.received += 1
                 if self.raw_data_callback:
                     await self.raw_data_callback(
@@ -292,7 +300,9 @@ class HTTPPoll(HTTPAsyncConn):
             ) as response:
                 data = await response.text()
                 self.received += 1
-                self.last_message = time.time()
+                self.received_messages += 1
+                self.last_message_ns = time_ns()
+                self.last_message = self.last_message_ns / 1e9
                 if self.raw_data_callback:
                     await self.raw_data_callback(
                         data, self.last_message, self.id, endpoint=address
@@ -375,6 +385,9 @@ class WSAsyncConn(AsyncConnection):
             subscription=subscription,
         )
         self.ws_kwargs = kwargs
+        # set by the ConnectionHandler, see cryptofeed.admission
+        self.admission = None
+        self.priority = 0
 
     @property
     def is_open(self) -> bool:
@@ -394,12 +407,15 @@ class WSAsyncConn(AsyncConnection):
                     self.address, self.ws_kwargs
                 )
 
+            if self.admission:
+                await self.admission.connect(self.priority)
             self.conn = await websockets.connect(
                 self.address, **self.ws_kwargs, open_timeout=30
             )
         self.sent = 0
         self.received = 0
         self.last_message = None
+        self.last_message_ns = None
 
     async def read(self) -> AsyncIterable:
         if not self.is_open:
@@ -408,19 +424,27 @@ class WSAsyncConn(AsyncConnection):
         if self.raw_data_callback:
             async for data in self.conn:
                 self.received += 1
-                self.last_message = time.time()
+                self.received_messages += 1
+                self.received_bytes += len(data)
+                self.last_message_ns = time_ns()
+                self.last_message = self.last_message_ns / 1e9
                 await self.raw_data_callback(data, self.last_message, self.id)
                 yield data
         else:
             async for data in self.conn:
                 self.received += 1
-                self.last_message = time.time()
+                self.received_messages += 1
+                self.received_bytes += len(data)
+                self.last_message_ns = time_ns()
+                self.last_message = self.last_message_ns / 1e9
                 yield data
 
     async def write(self, data: str):
         if not self.is_open:
             raise ConnectionClosed
 
+        if self.admission:
+            await self.admission.send(self.priority)
         if self.raw_data_callback:
             await self.raw_data_callback(data, time.time(), self.id, send=self.address)
         await self.conn.send(data)
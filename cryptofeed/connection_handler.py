@@ -11,14 +11,20 @@ import random
 import time
 import zlib
 from socket import error as socket_error
-from typing import Awaitable
+from typing import Awaitable, Callable
 
 from websockets import ConnectionClosed
 from websockets.exceptions import InvalidStatusCode
 
-from cryptofeed.connection import AsyncConnection
+from cryptofeed.admission import AdmissionController
+from cryptofeed.connection import AsyncConnection, WSAsyncConn
+from cryptofeed.decode import DecodeStage
 from cryptofeed.defines import HUOBI, HUOBI_DM, HUOBI_SWAP, OKCOIN, OKX
 from cryptofeed.exceptions import ExhaustedRetries
+from cryptofeed.ingress import IngressQueue
+from cryptofeed.metrics import COUNTER, GAUGE, REGISTRY
+from cryptofeed.util.time import ReceiptTimestamp
+from cryptofeed.watchdog import Watchdog
 
 LOG = logging.getLogger("feedhandler")
 
@@ -36,7 +42,45 @@ class ConnectionHandler:
         exceptions=None,
         log_on_error=False,
         start_delay=0,
+        on_connect: Callable = None,
+        on_disconnect: Callable = None,
+        admission: AdmissionController = None,
+        priority: int = 0,
+        ingress: dict = None,
+        resync: Callable = None,
+        coalesce_key: Callable = None,
+        decode_stage: DecodeStage = None,
+        timestamp_ns: bool = False,
     ):
+        """
+        timeout: int
+            seconds without messages after which the connection is restarted, -1 to disable
+        timeout_interval: int
+            unused, timeouts are tracked by the shared Watchdog of the loop
+        on_connect: callable
+            called with the connection once it is subscribed
+        on_disconnect: callable
+            called with the connection when it is closed
+        admission: AdmissionController
+            connect / message budgets and reconnect backoff shared with the other
+            connections to the exchange. If None, reconnects back off exponentially.
+        priority: int
+            connections with a lower priority are (re)connected first
+        ingress: dict
+            keyword arguments of an IngressQueue buffering the messages between the reads
+            and the handler (size, policy, max_lag). If None, messages are handled as they
+            are read.
+        resync: coroutine function
+            called with the connection when the ingress queue dropped messages
+        coalesce_key: callable
+            coalescing key of a raw message for the ingress queue, see IngressQueue
+        decode_stage: DecodeStage
+            decodes the messages in a pool before they are handled, in batches taken from
+            the ingress queue (created with the default settings if ingress is None)
+        timestamp_ns: bool
+            pass the receipt timestamps to the handler as ReceiptTimestamp, which keeps
+            their integer nanoseconds, rather than as float
+        """
         self.conn = conn
         self.subscribe = subscribe
         self.handler = handler
@@ -48,27 +92,123 @@ class ConnectionHandler:
         self.timeout_interval = timeout_interval
         self.running = True
         self.start_delay = start_delay
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.admission = admission
+        self.ingress = ingress
+        self.resync = resync
+        self.coalesce_key = coalesce_key
+        self.decode_stage = decode_stage
+        self.timestamp_ns = timestamp_ns
+        if decode_stage and ingress is None:
+            self.ingress = {}
+        self.ingress_queue = None
+        if isinstance(conn, WSAsyncConn):
+            conn.admission = admission
+            conn.priority = priority
+        self.exchange = conn.uuid.split(".")[0]
+        channels = conn.subscription if isinstance(conn.subscription, dict) else {}
+        self.handler_time = REGISTRY.histogram(
+            "cryptofeed_handler_seconds",
+            "Time to handle a message, callbacks included",
+            exchange=self.exchange,
+            channel=",".join(sorted(channels)),
+        )
+        REGISTRY.register(self)
+
+    def collect(self):
+        labels = {"exchange": self.exchange, "connection": self.conn.uuid}
+        yield (
+            "cryptofeed_connection_messages_total",
+            COUNTER,
+            "Messages received",
+            labels,
+            self.conn.received_messages,
+        )
+        yield (
+            "cryptofeed_connection_bytes_total",
+            COUNTER,
+            "Bytes received (websockets)",
+            labels,
+            self.conn.received_bytes,
+        )
+        yield (
+            "cryptofeed_connection_open",
+            GAUGE,
+            "1 if the connection is open",
+            labels,
+            1 if self.running and self.conn.is_open else 0,
+        )
+        ingress = self.ingress_queue
+        if ingress is not None:
+            yield (
+                "cryptofeed_ingress_depth",
+                GAUGE,
+                "Messages buffered between the reads and the handler",
+                labels,
+                len(ingress),
+            )
+            yield (
+                "cryptofeed_ingress_lag_seconds",
+                GAUGE,
+                "Time the last handled message waited in the ingress queue",
+                labels,
+                ingress.lag,
+            )
+            yield (
+                "cryptofeed_ingress_dropped_total",
+                COUNTER,
+                "Messages dropped by the ingress queue",
+                labels,
+                ingress.dropped,
+            )
+
+    def _receipt_timestamp(self):
+        # taken by the connection when the frame arrived
+        if self.timestamp_ns:
+            return ReceiptTimestamp(self.conn.last_message_ns)
+        return self.conn.last_message
 
     def start(self, loop: asyncio.AbstractEventLoop):
         loop.create_task(self._create_connection())
 
-    async def _watcher(self):
-        while self.conn.is_open and self.running:
-            if self.conn.last_message:
-                if time.time() - self.conn.last_message > self.timeout:
-                    LOG.warning(
-                        "%s: received no messages within timeout, restarting connection",
-                        self.conn.uuid,
-                    )
-                    await self.conn.close()
-                    break
-            await asyncio.sleep(self.timeout_interval)
+    def _backoff(self, retries: int) -> float:
+        if self.admission:
+            return self.admission.backoff(retries + 1)
+        return 2**retries
+
+    async def _timed_out(self):
+        if not self.running:
+            return
+        LOG.warning(
+            "%s: received no messages within timeout, restarting connection",
+            self.conn.uuid,
+        )
+        await self.conn.close()
+
+    async def _run(self, connection):
+        watch = None
+        if self.timeout != -1:
+            watch = Watchdog.get().watch(
+                lambda: self.conn.last_message,
+                self.timeout,
+                self._timed_out,
+                name=self.conn.uuid,
+            )
+        if self.on_connect:
+            self.on_connect(self.conn)
+        try:
+            await self._handler(connection, self.handler)
+        finally:
+            if watch:
+                watch.cancel()
+            if self.on_disconnect:
+                self.on_disconnect(self.conn)
 
     async def _create_connection(self):
         await asyncio.sleep(self.start_delay)
         retries = 0
         rate_limited = 1
-        delay = 1
         while (retries <= self.retries or self.retries == -1) and self.running:
             try:
                 async with self.conn.connect() as connection:
@@ -76,18 +216,15 @@ class ConnectionHandler:
                     await self.subscribe(connection)
                     # connection was successful, reset retry count and delay
                     retries = 0
-                    rate_limited = 0
-                    delay = 1
-                    if self.timeout != -1:
-                        loop = asyncio.get_running_loop()
-                        loop.create_task(self._watcher())
-                    await self._handler(connection, self.handler)
+                    rate_limited = 1
+                    await self._run(connection)
             except (
                 ConnectionClosed,
                 ConnectionAbortedError,
                 ConnectionResetError,
                 socket_error,
             ) as e:
+                delay = self._backoff(retries)
                 if self.exceptions:
                     for ex in self.exceptions:
                         if isinstance(e, ex):
@@ -106,7 +243,6 @@ class ConnectionHandler:
                 )
                 await asyncio.sleep(delay)
                 retries += 1
-                delay *= 2
             except InvalidStatusCode as e:
                 if self.exceptions:
                     for ex in self.exceptions:
@@ -117,7 +253,11 @@ class ConnectionHandler:
                                 str(e),
                             )
                             raise
-                if e.status_code == 429:
+                if e.status_code == 429 and self.admission:
+                    # pauses the connects of the whole exchange, _open waits for it
+                    self.admission.rate_limited(rate_limited)
+                    rate_limited += 1
+                elif e.status_code == 429:
                     rand = random.uniform(1.0, 3.0)
                     LOG.warning(
                         "%s: Rate Limited - waiting %d seconds to reconnect",
@@ -127,6 +267,7 @@ class ConnectionHandler:
                     await asyncio.sleep(rate_limited * 60 * rand)
                     rate_limited += 1
                 else:
+                    delay = self._backoff(retries)
                     LOG.warning(
                         "%s: encountered connection issue %s - reconnecting in %.1f seconds...",
                         self.conn.uuid,
@@ -136,8 +277,8 @@ class ConnectionHandler:
                     )
                     await asyncio.sleep(delay)
                     retries += 1
-                    delay *= 2
             except Exception as e:
+                delay = self._backoff(retries)
                 if self.exceptions:
                     for ex in self.exceptions:
                         if isinstance(e, ex):
@@ -155,7 +296,6 @@ class ConnectionHandler:
                 )
                 await asyncio.sleep(delay)
                 retries += 1
-                delay *= 2
 
         if not self.running:
             LOG.info(
@@ -171,21 +311,86 @@ class ConnectionHandler:
             raise ExhaustedRetries()
 
     async def _handler(self, connection, handler):
+        if self.ingress is not None:
+            return await self._buffered_handler(connection, handler)
         try:
             async for message in connection.read():
                 if not self.running:
                     await connection.close()
                     return
-                await handler(message, connection, self.conn.last_message)
+                start = time.perf_counter()
+                await handler(message, connection, self._receipt_timestamp())
+                self.handler_time.observe(time.perf_counter() - start)
         except Exception:
             if not self.running:
                 return
             if self.log_on_error:
-                if connection.uuid in {HUOBI, HUOBI_DM, HUOBI_SWAP}:
-                    message = zlib.decompress(message, 16 + zlib.MAX_WBITS)
-                elif connection.uuid in {OKCOIN, OKX}:
-                    message = zlib.decompress(message, -15)
-                LOG.error("%s: error handling message %s", connection.uuid, message)
+                self._log_message(connection, message)
             # exception will be logged with traceback when connection handler
             # retries the connection
             raise
+
+    def _log_message(self, connection, message):
+        if connection.uuid in {HUOBI, HUOBI_DM, HUOBI_SWAP}:
+            message = zlib.decompress(message, 16 + zlib.MAX_WBITS)
+        elif connection.uuid in {OKCOIN, OKX}:
+            message = zlib.decompress(message, -15)
+        LOG.error("%s: error handling message %s", connection.uuid, message)
+
+    async def _read(self, connection, ingress: IngressQueue):
+        try:
+            async for message in connection.read():
+                if not self.running:
+                    await connection.close()
+                    return
+                await ingress.put(message, self._receipt_timestamp())
+        finally:
+            ingress.close()
+
+    async def _consume(self, connection, handler, ingress: IngressQueue):
+        while True:
+            if self.decode_stage:
+                batch = await ingress.get_batch(self.decode_stage.batch)
+            else:
+                item = await ingress.get()
+                batch = [item] if item is not None else None
+            if batch is None:
+                return
+            if batch[0][2]:
+                if self.resync is None:
+                    await connection.close()
+                    return
+                await self.resync(self.conn)
+            messages = [message for message, _, _ in batch]
+            if self.decode_stage:
+                messages = await self.decode_stage.decode(messages)
+            for message, (raw, timestamp, _) in zip(messages, batch):
+                try:
+                    start = time.perf_counter()
+                    await handler(message, connection, timestamp)
+                    self.handler_time.observe(time.perf_counter() - start)
+                except Exception:
+                    if self.running and self.log_on_error:
+                        self._log_message(connection, raw)
+                    raise
+
+    async def _buffered_handler(self, connection, handler):
+        ingress = IngressQueue(
+            **self.ingress, coalesce_key=self.coalesce_key, name=self.conn.uuid
+        )
+        self.ingress_queue = ingress
+        reader = asyncio.create_task(self._read(connection, ingress))
+        consumer = asyncio.create_task(self._consume(connection, handler, ingress))
+        try:
+            # the consumer returns once the reader is done and the buffer is drained
+            await asyncio.wait({reader, consumer}, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in (reader, consumer):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(reader, consumer, return_exceptions=True)
+        if not self.running:
+            return
+        for task in (reader, consumer):
+            if not task.cancelled() and task.exception():
+                raise task.exception()
@@ -0,0 +1,156 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Runs the shards of an aggregator (see MarketDataAggregator in main.py) on several hosts,
+coordinated through the leases of cryptofeed.lease.
+"""
+
+import logging
+import math
+import time
+
+from redis.exceptions import RedisError
+from yapic import json
+
+from cryptofeed.lease import LeaseRegistry
+from cryptofeed.supervisor import WorkerSupervisor
+
+LOG = logging.getLogger("feedhandler")
+
+
+class ShardCoordinator:
+    """
+    Runs in the supervisor when several hosts share the work. The pairs are split into shards
+    once for the whole cluster (the first host publishes the plan in redis), and each host
+    claims up to its fair share of the shards through expiring leases. The leases are renewed
+    while the host is alive. When a host dies its leases expire and the remaining hosts pick
+    up its shards; when a host joins, the others hand shards over until the load is even.
+    """
+
+    def __init__(self, aggregator, shards: int = None, **registry_kwargs):
+        """
+        aggregator: MarketDataAggregator
+            splits the pairs into shards and runs them (run_process)
+        shards: int
+            number of shards for the whole cluster, only used by the host publishing the plan
+        registry_kwargs:
+            keyword arguments for LeaseRegistry
+        """
+        self.aggregator = aggregator
+        self.registry = LeaseRegistry(**registry_kwargs)
+        self.slots = aggregator.cpu_amount
+        self.shards = self._load_plan(shards)
+        # shard index -> worker running it
+        self.held = dict()
+        self.last_renew = 0
+        self.last_success = time.time()
+        self.ready = False
+        LOG.info(
+            "Coordinator: node %s, %d shards in the cluster, up to %d on this host",
+            self.registry.node_id,
+            len(self.shards),
+            self.slots,
+        )
+
+    def _load_plan(self, shards: int) -> list:
+        key = self.registry.key("plan")
+        plan = self.aggregator.break_down_pairs_per_cpu(shards)
+        encoded = json.dumps(plan)
+        ttl = int(self.registry.ttl * 1000)
+        # the published plan can expire or be deleted between the set and the get
+        for _ in range(3):
+            if self.registry.redis.set(key, encoded, nx=True, px=ttl):
+                return json.loads(encoded)
+            published = self.registry.redis.get(key)
+            if published is not None:
+                LOG.info("Coordinator: using the shard plan published by another node")
+                return json.loads(published)
+        LOG.warning("Coordinator: unable to read the published shard plan, using ours")
+        return json.loads(encoded)
+
+    @staticmethod
+    def _lease(index: int) -> str:
+        return f"shard:{index}"
+
+    def _start(self, supervisor: WorkerSupervisor, index: int):
+        LOG.info("Coordinator: claimed shard %d", index)
+        self.held[index] = supervisor.add_worker(
+            self.aggregator.run_process, args=(self.shards[index], index)
+        )
+
+    def _stop(self, supervisor: WorkerSupervisor, index: int, release: bool = True):
+        supervisor.remove_worker(self.held.pop(index))
+        if release:
+            self.registry.release(self._lease(index))
+
+    def on_tick(self, supervisor: WorkerSupervisor):
+        now = time.time()
+        if now - self.last_renew < self.registry.ttl / 3:
+            return
+        self.last_renew = now
+        try:
+            self._renew(supervisor)
+            self.last_success = now
+        except RedisError:
+            LOG.error("Coordinator: unable to reach the lease registry", exc_info=True)
+            if now - self.last_success > self.registry.ttl:
+                # our leases have expired, other nodes may be running these shards by now
+                LOG.error("Coordinator: leases expired, stopping all shards")
+                for index in list(self.held):
+                    self._stop(supervisor, index, release=False)
+
+    def _renew(self, supervisor: WorkerSupervisor):
+        self.registry.heartbeat()
+        self.registry.redis.pexpire(
+            self.registry.key("plan"), int(self.registry.ttl * 1000)
+        )
+        for index in list(self.held):
+            if not self.registry.renew(self._lease(index)):
+                LOG.error("Coordinator: lost the lease of shard %d, stopping it", index)
+                self._stop(supervisor, index, release=False)
+
+        if not self.ready:
+            # give the other nodes started at the same time one round to register, so
+            # the first node does not claim everything
+            self.ready = True
+            return
+
+        nodes = self.registry.nodes()
+        fair_share = min(self.slots, math.ceil(len(self.shards) / max(1, len(nodes))))
+        if len(self.held) > fair_share:
+            index = max(self.held)
+            LOG.info(
+                "Coordinator: %d nodes in the cluster, handing shard %d over",
+                len(nodes),
+                index,
+            )
+            self._stop(supervisor, index)
+            return
+
+        leases = [self._lease(index) for index in range(len(self.shards))]
+        owners = self.registry.owners(leases)
+        for index, lease in enumerate(leases):
+            if len(self.held) >= fair_share:
+                break
+            if owners[lease] is None and self.registry.acquire(lease):
+                self._start(supervisor, index)
+        unowned = [
+            index
+            for index, lease in enumerate(leases)
+            if owners[lease] is None and index not in self.held
+        ]
+        if unowned and len(self.held) >= self.slots:
+            LOG.warning(
+                "Coordinator: shards %s are not running, the cluster needs more processes",
+                unowned,
+            )
+
+    def close(self):
+        for index in list(self.held):
+            self.registry.release(self._lease(index))
+        self.held.clear()
+        self.registry.close()
@@ -0,0 +1,196 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Decoding (decompressing and parsing) of raw websocket messages. Exchanges opt in by
+setting Feed.message_decoder to the settings of their JSONDecoder and by parsing their
+messages with Feed.decoder, which users can switch to another JSON backend or to
+field-selective conversion with the decoder keyword argument of the feed. The decoders can
+also run off the event loop, in a thread or process pool (see DecodeStage).
+"""
+
+import asyncio
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+from typing import Callable, Iterable, List
+
+from yapic import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+THREAD = "thread"
+PROCESS = "process"
+
+_executors = {}
+
+
+def _number(value) -> bool:
+    return isinstance(value, (float, int)) and not isinstance(value, bool)
+
+
+def _decimal(value) -> Decimal:
+    # repr is the shortest string that round trips, i.e. the number as the exchange sent it
+    return Decimal(repr(value) if isinstance(value, float) else value)
+
+
+def _to_decimal(obj, fields: frozenset, nested: bool = False):
+    """
+    Converts in place the values of the keys in fields to Decimal: numbers and numeric
+    strings, and the numbers nested in lists or objects under them (e.g. the price levels
+    of a book)
+    """
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in fields and (_number(value) or isinstance(value, str)):
+                obj[key] = _decimal(value)
+            elif nested and _number(value):
+                obj[key] = _decimal(value)
+            elif isinstance(value, (dict, list)):
+                _to_decimal(value, fields, nested or key in fields)
+    elif isinstance(obj, list):
+        for i, value in enumerate(obj):
+            if nested and _number(value):
+                obj[i] = _decimal(value)
+            elif isinstance(value, (dict, list)):
+                _to_decimal(value, fields, nested)
+
+
+class JSONDecoder:
+    """
+    Decodes a raw JSON message: decompression, parsing by the backend of the subclass and
+    conversion of selected fields. Decoders are picklable, so they can be used by a
+    DecodeStage with a process pool.
+    """
+
+    backend = None
+
+    def __init__(self, gzip: bool = False, decimal_fields: Iterable[str] = None):
+        """
+        gzip: bool
+            messages are gzip compressed
+        decimal_fields: list of str
+            keys whose values (numbers, numeric strings or nested lists of them) are
+            converted to Decimal after parsing, for backends that parse numbers as float
+        """
+        self.gzip = gzip
+        self.decimal_fields = frozenset(decimal_fields) if decimal_fields else None
+
+    def parse(self, msg):
+        raise NotImplementedError
+
+    def __call__(self, msg):
+        if self.gzip:
+            msg = zlib.decompress(msg, 16 + zlib.MAX_WBITS)
+        msg = self.parse(msg)
+        if self.decimal_fields:
+            _to_decimal(msg, self.decimal_fields)
+        return msg
+
+
+class YapicDecoder(JSONDecoder):
+    """
+    yapic.json, the default: numbers with a fraction are parsed as Decimal, and ISO 8601
+    timestamps as datetime
+    """
+
+    backend = "yapic"
+
+    def parse(self, msg):
+        return json.loads(msg, parse_float=Decimal)
+
+
+class OrjsonDecoder(JSONDecoder):
+    """
+    orjson: faster, numbers are parsed as float and timestamps are left as strings. Exact
+    for exchanges sending prices and sizes as strings, otherwise list them in
+    decimal_fields.
+    """
+
+    backend = "orjson"
+
+    def __init__(self, **kwargs):
+        if orjson is None:
+            raise ImportError("The orjson decoder requires the orjson package")
+        super().__init__(**kwargs)
+
+    def parse(self, msg):
+        return orjson.loads(msg)
+
+
+DECODERS = {decoder.backend: decoder for decoder in (YapicDecoder, OrjsonDecoder)}
+
+
+def get_decoder(backend: str = YapicDecoder.backend, **kwargs) -> JSONDecoder:
+    """
+    backend: str
+        yapic or orjson
+    kwargs:
+        see JSONDecoder
+    """
+    if backend not in DECODERS:
+        raise ValueError(
+            f"Invalid JSON decoder {backend!r}, expected one of {tuple(DECODERS)}"
+        )
+    return DECODERS[backend](**kwargs)
+
+
+def decode_batch(decoder: Callable, messages: list) -> list:
+    return [decoder(msg) for msg in messages]
+
+
+def get_executor(executor: str = THREAD, workers: int = None) -> Executor:
+    """
+    The pool shared by the decode stages of a process
+    """
+    key = (executor, workers)
+    if key not in _executors:
+        if executor == THREAD:
+            _executors[key] = ThreadPoolExecutor(workers, thread_name_prefix="decode")
+        elif executor == PROCESS:
+            _executors[key] = ProcessPoolExecutor(workers)
+        else:
+            raise ValueError(f"Invalid decode executor {executor!r}")
+    return _executors[key]
+
+
+class DecodeStage:
+    """
+    Decodes the messages of a connection in batches in a pool. The batches of a connection
+    are decoded one after the other, so its messages are handled in order, while the
+    batches of different connections are decoded in parallel.
+    """
+
+    def __init__(
+        self,
+        decoder: Callable,
+        executor: str = THREAD,
+        workers: int = None,
+        batch: int = 100,
+    ):
+        """
+        decoder: callable
+            decodes a raw message, a JSONDecoder or a module level function with a process
+            pool
+        executor: str
+            thread (zlib releases the GIL while decompressing, JSON parsing does not) or
+            process
+        workers: int
+            size of the pool, defaults to the executor's default
+        batch: int
+            maximum number of messages decoded at once
+        """
+        self.decoder = decoder
+        self.executor = get_executor(executor, workers)
+        self.batch = batch
+
+    async def decode(self, messages: list) -> List:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, decode_batch, self.decoder, messages
+        )
@@ -6,13 +6,16 @@ associated with this software.
 """
 
 import asyncio
+import functools
 import logging
 from datetime import datetime as dt, timezone
 from decimal import Decimal
 from typing import AsyncGenerator, Dict, List, Optional, Tuple, Union
 
+from yapic import json as json_parser
+
 from cryptofeed.config import Config
-from cryptofeed.connection import HTTPSync, RestEndpoint
+from cryptofeed.connection import HTTPAsyncConn, HTTPSync, RestEndpoint
 from cryptofeed.defines import (
     CANDLES,
     FUNDING,
@@ -44,6 +47,8 @@ class Exchange:
     _parse_symbol_data = NotImplemented
     websocket_channels = NotImplemented
     request_limit = NotImplemented
+    # overrides of AdmissionController.defaults (websocket connects / messages per second)
+    websocket_limits = {}
     valid_candle_intervals = NotImplemented
     candle_interval_map = NotImplemented
     http_sync = HTTPSync()
@@ -109,41 +114,146 @@ class Exchange:
         """
         return ep.route("instruments")
 
+    @classmethod
+    def _fetch_symbol_data(cls, headers: dict = None) -> Union[List, Dict]:
+        """
+        override if a specific exchange needs to query its symbol information differently
+        """
+        data = []
+        for ep in cls.rest_endpoints:
+            addr = cls._symbol_endpoint_prepare(ep)
+            if isinstance(addr, list):
+                for ep in addr:
+                    LOG.debug("%s: reading symbol information from %s", cls.id, ep)
+                    data.append(
+                        cls.http_sync.read(ep, json=True, headers=headers, uuid=cls.id)
+                    )
+            else:
+                LOG.debug("%s: reading symbol information from %s", cls.id, addr)
+                data.append(
+                    cls.http_sync.read(addr, json=True, headers=headers, uuid=cls.id)
+                )
+        return data if len(data) > 1 else data[0]
+
+    @classmethod
+    def _symbol_headers(cls, config=None) -> Optional[dict]:
+        """
+        override if a specific exchange needs headers (e.g. authentication) to query its symbol information
+        """
+        return None
+
+    @classmethod
+    def _load_cached_symbols(cls, max_age: float = None) -> Optional[Dict]:
+        cached = Symbols.load_cache(cls.id, max_age=max_age)
+        if not cached:
+            return None
+        Symbols.set(cls.id, *cached)
+        return cached[0]
+
+    @classmethod
+    def _set_symbol_data(cls, data: Union[List, Dict]) -> Dict:
+        syms, info = cls._parse_symbol_data(data)
+        Symbols.set(cls.id, syms, info)
+        Symbols.save_cache(cls.id)
+        return syms
+
+    @classmethod
+    def _symbol_fetch_failed(cls, e: Exception) -> Optional[Dict]:
+        """
+        Falls back to the cached symbols, if any, when they could not be fetched
+        """
+        syms = cls._load_cached_symbols()
+        if syms is not None:
+            LOG.warning(
+                "%s: Failed to refresh symbol information (%s), using cached symbols from %s",
+                cls.id,
+                str(e),
+                dt.fromtimestamp(
+                    Symbols.data[cls.id]["timestamp"], tz=timezone.utc
+                ).isoformat(),
+            )
+            return syms
+        LOG.error(
+            "%s: Failed to parse symbol information: %s",
+            cls.id,
+            str(e),
+            exc_info=True,
+        )
+        return None
+
     @classmethod
     def symbol_mapping(cls, refresh=False, headers: dict = None) -> Dict:
         if Symbols.populated(cls.id) and not refresh:
             return Symbols.get(cls.id)[0]
+        if not refresh:
+            syms = cls._load_cached_symbols(max_age=Symbols.cache_ttl)
+            if syms is not None:
+                return syms
+        if headers is None:
+            headers = cls._symbol_headers()
+        try:
+            return cls._set_symbol_data(cls._fetch_symbol_data(headers=headers))
+        except Exception as e:
+            syms = cls._symbol_fetch_failed(e)
+            if syms is None:
+                raise
+            return syms
+
+    @classmethod
+    async def symbol_mapping_async(
+        cls, conn: HTTPAsyncConn, refresh=False, config=None
+    ) -> Dict:
+        """
+        Asynchronous version of symbol_mapping, used to load the symbols of many exchanges
+        concurrently (see Symbols.load_all_async). Requests to the exchange are spaced
+        according to its request_limit.
+
+        conn: HTTPAsyncConn
+            connection (session) shared by all exchanges being loaded
+        config: Config
+            only needed by exchanges that require authentication to query symbols
+        """
+        if Symbols.populated(cls.id) and not refresh:
+            return Symbols.get(cls.id)[0]
+        if not refresh:
+            syms = cls._load_cached_symbols(max_age=Symbols.cache_ttl)
+            if syms is not None:
+                return syms
+        headers = cls._symbol_headers(config)
         try:
-            data = []
-            for ep in cls.rest_endpoints:
-                addr = cls._symbol_endpoint_prepare(ep)
-                if isinstance(addr, list):
-                    for ep in addr:
-                        LOG.debug("%s: reading symbol information from %s", cls.id, ep)
+            if (
+                cls._fetch_symbol_data.__func__
+                is not Exchange._fetch_symbol_data.__func__
+                or cls._symbol_endpoint_prepare.__func__
+                is not Exchange._symbol_endpoint_prepare.__func__
+            ):
+                # exchange specific (blocking) requests, keep them off the event loop
+                data = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(cls._fetch_symbol_data, headers=headers)
+                )
+            else:
+                data = []
+                for ep in cls.rest_endpoints:
+                    addrs = ep.route("instruments")
+                    for addr in addrs if isinstance(addrs, list) else [addrs]:
+                        if data and cls.request_limit is not NotImplemented:
+                            await asyncio.sleep(1 / cls.request_limit)
+                        LOG.debug(
+                            "%s: reading symbol information from %s", cls.id, addr
+                        )
                         data.append(
-                            cls.http_sync.read(
-                                ep, json=True, headers=headers, uuid=cls.id
+                            json_parser.loads(
+                                await conn.read(addr, header=headers),
+                                parse_float=Decimal,
                             )
                         )
-                else:
-                    LOG.debug("%s: reading symbol information from %s", cls.id, addr)
-                    data.append(
-                        cls.http_sync.read(
-                            addr, json=True, headers=headers, uuid=cls.id
-                        )
-                    )
-
-            syms, info = cls._parse_symbol_data(data if len(data) > 1 else data[0])
-            Symbols.set(cls.id, syms, info)
-            return syms
+                data = data if len(data) > 1 else data[0]
+            return cls._set_symbol_data(data)
         except Exception as e:
-            LOG.error(
-                "%s: Failed to parse symbol information: %s",
-                cls.id,
-                str(e),
-                exc_info=True,
-            )
-            raise
+            syms = cls._symbol_fetch_failed(e)
+            if syms is None:
+                raise
+            return syms
 
     @classmethod
     def std_channel_to_exchange(cls, channel: str) -> str:
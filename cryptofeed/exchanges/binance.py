@@ -114,6 +114,14 @@ class Binance(Feed, BinanceRestMixin):
         ORDER_INFO: ORDER_INFO,
     }
     request_limit = 20
+    # 300 connections per 5 minutes per IP, 5 incoming messages per second per connection
+    websocket_limits = {"connect_rate": 1, "message_rate": 5, "message_burst": 5}
+
+    @staticmethod
+    def coalesce_key(msg: str):
+        # {"stream":"btcusdt@bookTicker","data":{...}}, only the latest ticker of a pair matters
+        stream = msg[11 : msg.find('"', 11)]
+        return stream if stream.endswith("@bookTicker") else None
 
     @classmethod
     def timestamp_normalize(cls, ts: float) -> float:
@@ -11,7 +11,7 @@ from decimal import Decimal
 from functools import partial
 from typing import Dict, Tuple
 
-from cryptofeed.types import Ticker, Trade, OrderBook
+from cryptofeed.types import L3Book, Ticker, Trade, OrderBook
 from yapic import json
 
 from cryptofeed.connection import (
@@ -81,6 +81,8 @@ class Bitfinex(Feed, BitfinexRestMixin):
         TICKER: "ticker",
     }
     request_limit = 1
+    # SEQ_ALL numbers the messages of a connection, not of a symbol
+    connection_sequence_numbers = True
     valid_candle_intervals = {
         "1m",
         "5m",
@@ -172,7 +174,6 @@ class Bitfinex(Feed, BitfinexRestMixin):
                         )
 
         self.handlers = {}  # maps a channel id (int) to a function
-        self.order_map = defaultdict(dict)
         self.seq_no = defaultdict(int)
 
     def __reset(self, conn: AsyncConnection):
@@ -193,9 +194,6 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 if std_pair in self._l3_book:
                     del self._l3_book[std_pair]
 
-                if std_pair in self.order_map:
-                    del self.order_map[std_pair]
-
     async def _ticker(self, pair: str, msg: list, timestamp: float):
         if msg[1] == "hb":
             return  # ignore heartbeats
@@ -317,25 +315,14 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 LOG.warning("%s: Unexpected book L3 msg %s", self.id, msg)
             return
 
-        def add_to_book(side, price, order_id, amount):
-            if price in self._l3_book[pair].book[side]:
-                self._l3_book[pair].book[side][price][order_id] = amount
-            else:
-                self._l3_book[pair].book[side][price] = {order_id: amount}
-
-        def remove_from_book(side, order_id):
-            price = self.order_map[pair][side][order_id]["price"]
-            del self._l3_book[pair].book[side][price][order_id]
-            if len(self._l3_book[pair].book[side][price]) == 0:
-                del self._l3_book[pair].book[side][price]
-
         delta = {BID: [], ASK: []}
 
         if isinstance(msg[1][0], list):
             # snapshot so clear orders
-            self.order_map[pair][BID] = {}
-            self.order_map[pair][ASK] = {}
-            self._l3_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth)
+            self._l3_book[pair] = OrderBook(
+                self.id, pair, book=L3Book(max_depth=self.max_depth)
+            )
+            orders = self._l3_book[pair].book
 
             for update in msg[1]:
                 order_id, price, amount = update
@@ -348,13 +335,10 @@ class Bitfinex(Feed, BitfinexRestMixin):
                     side = ASK
                     amount = -amount
 
-                self.order_map[pair][side][order_id] = {
-                    "price": price,
-                    "amount": amount,
-                }
-                add_to_book(side, price, order_id, amount)
+                orders.add(order_id, side, price, amount)
         else:
             # book update
+            orders = self._l3_book[pair].book
             order_id, price, amount = msg[1]
             price = Decimal(price)
             amount = Decimal(amount)
@@ -366,24 +350,15 @@ class Bitfinex(Feed, BitfinexRestMixin):
                 amount = abs(amount)
 
             if price == 0:
-                price = self.order_map[pair][side][order_id]["price"]
-                remove_from_book(side, order_id)
-                del self.order_map[pair][side][order_id]
+                _, price, _ = orders.remove(order_id)
                 delta[side].append((order_id, price, 0))
             else:
-                if order_id in self.order_map[pair][side]:
-                    del_price = self.order_map[pair][side][order_id]["price"]
-                    delta[side].append((order_id, del_price, 0))
+                if order_id in orders:
                     # remove existing order before adding new one
-                    delta[side].append((order_id, price, amount))
-                    remove_from_book(side, order_id)
-                else:
-                    delta[side].append((order_id, price, amount))
-                add_to_book(side, price, order_id, amount)
-                self.order_map[pair][side][order_id] = {
-                    "price": price,
-                    "amount": amount,
-                }
+                    _, del_price, _ = orders.remove(order_id)
+                    delta[side].append((order_id, del_price, 0))
+                delta[side].append((order_id, price, amount))
+                orders.add(order_id, side, price, amount)
 
         await self.book_callback(
             L3_BOOK,
@@ -15,6 +15,7 @@ from decimal import Decimal
 from typing import Dict, Tuple
 
 from cryptofeed.types import (
+    L3Book,
     OrderBook,
     Trade,
     Ticker,
@@ -127,11 +128,16 @@ class Bitmex(Feed, BitmexRestMixin):
 
     def _reset(self):
         self.partial_received = defaultdict(bool)
-        self.order_id = {}
+        # BitMEX identifies the price levels of the book by id, the levels of a symbol are
+        # kept in an L3Book (of one order per level) and its L2 book is the L2 view of it
+        self._levels = {}
         self.open_orders = {}
         for pair in self.normalized_symbols:
-            self._l2_book[pair] = OrderBook(self.id, pair, max_depth=self.max_depth)
-            self.order_id[pair] = defaultdict(dict)
+            self._reset_book(pair)
+
+    def _reset_book(self, pair: str):
+        self._levels[pair] = L3Book(max_depth=self.max_depth)
+        self._l2_book[pair] = OrderBook(self.id, pair, book=self._levels[pair].l2)
 
     @staticmethod
     def normalize_order_status(status):
@@ -446,15 +452,15 @@ class Bitmex(Feed, BitmexRestMixin):
             self.partial_received[pair] = True
 
         if msg["action"] == "partial":
+            self._reset_book(pair)
+            levels = self._levels[pair]
             for data in msg["data"]:
                 side = BID if data["side"] == "Buy" else ASK
-                price = Decimal(data["price"])
-                size = Decimal(data["size"])
-                order_id = data["id"]
-
-                self._l2_book[pair].book[side][price] = size
-                self.order_id[pair][side][order_id] = price
+                levels.add(
+                    data["id"], side, Decimal(data["price"]), Decimal(data["size"])
+                )
         elif msg["action"] == "insert":
+            levels = self._levels[pair]
             delta = {BID: [], ASK: []}
             for data in msg["data"]:
                 side = BID if data["side"] == "Buy" else ASK
@@ -462,30 +468,24 @@ class Bitmex(Feed, BitmexRestMixin):
                 size = Decimal(data["size"])
                 order_id = data["id"]
 
-                self._l2_book[pair].book[side][price] = size
-                self.order_id[pair][side][order_id] = price
+                if order_id in levels:
+                    levels.remove(order_id)
+                levels.add(order_id, side, price, size)
                 delta[side].append((price, size))
         elif msg["action"] == "update":
+            levels = self._levels[pair]
             delta = {BID: [], ASK: []}
             for data in msg["data"]:
                 side = BID if data["side"] == "Buy" else ASK
                 update_size = Decimal(data["size"])
-                order_id = data["id"]
-
-                price = self.order_id[pair][side][order_id]
 
-                self._l2_book[pair].book[side][price] = update_size
-                self.order_id[pair][side][order_id] = price
+                price = levels.modify(data["id"], update_size)
                 delta[side].append((price, update_size))
         elif msg["action"] == "delete":
+            levels = self._levels[pair]
             delta = {BID: [], ASK: []}
             for data in msg["data"]:
-                side = BID if data["side"] == "Buy" else ASK
-                order_id = data["id"]
-
-                delete_price = self.order_id[pair][side][order_id]
-                del self.order_id[pair][side][order_id]
-                del self._l2_book[pair].book[side][delete_price]
+                side, delete_price, _ = levels.remove(data["id"])
                 delta[side].append((delete_price, 0))
 
         else:
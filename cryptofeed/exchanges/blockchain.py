@@ -46,6 +46,8 @@ class Blockchain(Feed):
         L2_BOOK: "l2",
         TRADES: "trades",
     }
+    # seqnum numbers the messages of a connection, not of a symbol
+    connection_sequence_numbers = True
 
     @classmethod
     def _parse_symbol_data(cls, data: dict) -> Tuple[Dict, Dict]:
@@ -8,6 +8,7 @@ associated with this software.
 import datetime
 import hashlib
 import hmac
+import itertools
 import logging
 import time
 from collections import defaultdict
@@ -86,6 +87,21 @@ class Coinbase(Feed, CoinbaseRestMixin):
         TRADES: "market_trades",
     }
     request_limit = 10
+    incremental_subscriptions = True
+    message_decoder = {"backend": "yapic"}
+    fixed_point_supported = True
+    _symbol_config = None
+
+    @classmethod
+    def timestamp_normalize(cls, ts) -> float:
+        # ISO 8601 timestamps are datetimes with the yapic decoder, strings with orjson
+        if isinstance(ts, str):
+            seconds, _, fraction = ts.rstrip("Z").partition(".")
+            seconds = datetime.datetime.fromisoformat(seconds)
+            return seconds.replace(tzinfo=datetime.timezone.utc).timestamp() + (
+                float("0." + fraction) if fraction else 0.0
+            )
+        return super().timestamp_normalize(ts)
 
     @classmethod
     def _parse_symbol_data(cls, data: list) -> Tuple[Dict, Dict]:
@@ -95,12 +111,13 @@ class Coinbase(Feed, CoinbaseRestMixin):
         for entry in data["products"]:
             sym = Symbol(entry["base_currency_id"], entry["quote_currency_id"])
             info["tick_size"][sym.normalized] = entry["quote_increment"]
+            info["lot_size"][sym.normalized] = entry["base_increment"]
             info["instrument_type"][sym.normalized] = sym.type
             ret[sym.normalized] = entry["product_id"]
         return ret, info
 
     @classmethod
-    def symbols(cls, config: dict = None, refresh=False) -> list:
+    def _check_symbol_config(cls, config) -> Config:
         config = Config(config)
         if (
             "coinbase" not in config
@@ -110,17 +127,37 @@ class Coinbase(Feed, CoinbaseRestMixin):
             raise ValueError(
                 "You must provide key_id and key_secret in config to retrieve symbols from Coinbase."
             )
-        headers = get_private_parameters(config, rest_api=True, endpoint="products")
-        return list(cls.symbol_mapping(refresh=refresh, headers=headers).keys())
+        return config
+
+    @classmethod
+    def symbols(cls, config: dict = None, refresh=False) -> list:
+        cls._symbol_config = cls._check_symbol_config(config)
+        return list(cls.symbol_mapping(refresh=refresh).keys())
+
+    @classmethod
+    def _symbol_headers(cls, config=None) -> dict:
+        if config is not None:
+            cls._symbol_config = cls._check_symbol_config(config)
+        if cls._symbol_config is None:
+            return None
+        # the signed headers expire quickly, so they are generated for every request. This
+        # also lets the symbols be refreshed in the background.
+        return get_private_parameters(
+            cls._symbol_config, rest_api=True, endpoint="products"
+        )
 
     def __init__(self, callbacks=None, **kwargs):
         super().__init__(callbacks=callbacks, **kwargs)
         self.__reset()
 
-    def __reset(self):
-        self._l2_book = {}
+    def __reset(self, pairs: list = None):
+        if pairs is None:
+            self._l2_book = {}
+        else:
+            for pair in pairs:
+                self._l2_book.pop(self.exchange_symbol_to_std_symbol(pair), None)
 
-    async def _trade_update(self, msg: dict, timestamp: float):
+    def _trade(self, msg: dict) -> Trade:
         """
         {
             'trade_id': 43736593
@@ -134,36 +171,81 @@ class Coinbase(Feed, CoinbaseRestMixin):
         pair = self.exchange_symbol_to_std_symbol(msg["product_id"])
         ts = self.timestamp_normalize(msg["time"])
         order_type = "market"
-        t = Trade(
+        fixed_point = self.fixed_point_of(pair)
+        if fixed_point is not None:
+            try:
+                amount, price = fixed_point.size(msg["size"]), fixed_point.price(
+                    msg["price"]
+                )
+            except ValueError as e:
+                self.fixed_point_failed(pair, e)
+                fixed_point = None
+        if fixed_point is None:
+            amount, price = Decimal(msg["size"]), Decimal(msg["price"])
+        return Trade(
             self.id,
             pair,
             SELL if msg["side"] == "SELL" else BUY,
-            Decimal(msg["size"]),
-            Decimal(msg["price"]),
+            amount,
+            price,
             ts,
             id=str(msg["trade_id"]),
             type=order_type,
             raw=msg,
+            fixed_point=fixed_point,
         )
+
+    async def _trade_update(self, trades: list, timestamp: float):
         if isinstance(timestamp, datetime.datetime):
             timestamp = time.mktime(timestamp.timetuple())
-        await self.callback(TRADES, t, timestamp)
+        # the trades of an event are delivered together
+        await self.callback_batch(
+            TRADES, [self._trade(trade) for trade in trades], timestamp
+        )
+
+    def _levels(self, pair: str, updates: list) -> Tuple[object, list]:
+        """
+        The FixedPoint of the pair, and the (side, price, size) of the updates converted
+        to it, or to Decimal if it has none or they do not fit it
+        """
+        fixed_point = self.fixed_point_of(pair)
+        if fixed_point is not None:
+            try:
+                return fixed_point, [
+                    (
+                        update["side"],
+                        fixed_point.price(update["price_level"]),
+                        fixed_point.size(update["new_quantity"]),
+                    )
+                    for update in updates
+                ]
+            except ValueError as e:
+                self.fixed_point_failed(pair, e)
+                if pair in self._l2_book:
+                    self._l2_book[pair] = self.decimal_book(self._l2_book[pair])
+        return None, [
+            (
+                update["side"],
+                Decimal(update["price_level"]),
+                Decimal(update["new_quantity"]),
+            )
+            for update in updates
+        ]
 
     async def _pair_level2_snapshot(self, msg: dict, timestamp: float):
         pair = self.exchange_symbol_to_std_symbol(msg["product_id"])
-        bids = {
-            Decimal(update["price_level"]): Decimal(update["new_quantity"])
-            for update in msg["updates"]
-            if update["side"] == "bid"
-        }
-        asks = {
-            Decimal(update["price_level"]): Decimal(update["new_quantity"])
-            for update in msg["updates"]
-            if update["side"] == "ask"
-        }
+        fixed_point, levels = self._levels(pair, msg["updates"])
+        bids = {price: size for side, price, size in levels if side == "bid"}
+        asks = {price: size for side, price, size in levels if side == "ask"}
         if pair not in self._l2_book:
             self._l2_book[pair] = OrderBook(
-                self.id, pair, max_depth=self.max_depth, bids=bids, asks=asks
+                self.id,
+                pair,
+                max_depth=self.max_depth,
+                bids=bids,
+                asks=asks,
+                fixed_point=fixed_point,
+                tick_book=self.tick_book and fixed_point is not None,
             )
         else:
             self._l2_book[pair].book.bids = bids
@@ -173,14 +255,12 @@ class Coinbase(Feed, CoinbaseRestMixin):
             timestamp = time.mktime(timestamp.timetuple())
         await self.book_callback(L2_BOOK, self._l2_book[pair], timestamp, raw=msg)
 
-    async def _pair_level2_update(self, msg: dict, timestamp: float, ts: datetime):
+    async def _pair_level2_update(self, msg: dict, timestamp: float, ts):
         pair = self.exchange_symbol_to_std_symbol(msg["product_id"])
         delta = {BID: [], ASK: []}
-        for update in msg["updates"]:
-            side = BID if update["side"] == "bid" else ASK
-            price = Decimal(update["price_level"])
-            amount = Decimal(update["new_quantity"])
-
+        _, levels = self._levels(pair, msg["updates"])
+        for side, price, amount in levels:
+            side = BID if side == "bid" else ASK
             if pair in self._l2_book:
                 if amount == 0:
                     if price in self._l2_book[pair].book[side]:
@@ -192,18 +272,23 @@ class Coinbase(Feed, CoinbaseRestMixin):
 
         if pair in self._l2_book:
             await self.book_callback(
-                L2_BOOK, self._l2_book[pair], timestamp, timestamp=ts, raw=msg, delta=delta
+                L2_BOOK,
+                self._l2_book[pair],
+                timestamp,
+                timestamp=self.timestamp_normalize(ts),
+                raw=msg,
+                delta=delta,
             )
 
     async def message_handler(self, msg: str, conn: AsyncConnection, timestamp: float):
         # PERF perf_start(self.id, 'msg')
-        msg = json.loads(msg, parse_float=Decimal)
+        if isinstance(msg, str):
+            msg = self.decoder(msg)
         if "channel" in msg and "events" in msg:
             for event in msg["events"]:
                 if msg["channel"] == "market_trades":
                     if event.get("type") == "update":
-                        for trade in event["trades"]:
-                            await self._trade_update(trade, timestamp)
+                        await self._trade_update(event["trades"], timestamp)
                     else:
                         pass  # TODO: do we want to implement trades snapshots?
                 elif msg["channel"] == "l2_data":
@@ -220,20 +305,42 @@ class Coinbase(Feed, CoinbaseRestMixin):
                 # PERF perf_end(self.id, 'msg')
                 # PERF perf_log(self.id, 'msg')
 
+    async def _send(
+        self, conn: AsyncConnection, msg_type: str, chan: str, product_ids: list
+    ):
+        params = {"type": msg_type, "product_ids": product_ids, "channel": chan}
+        private_params = get_private_parameters(self.config, chan, product_ids)
+        if private_params:
+            params = {**params, **private_params}
+        await conn.write(json.dumps(params))
+
+    async def subscribe_symbols(
+        self, conn: AsyncConnection, channel: str, symbols: list
+    ):
+        if channel == self.websocket_channels[L2_BOOK]:
+            # the new subscription starts with a snapshot
+            self.__reset(pairs=symbols)
+        await self._send(conn, "subscribe", channel, symbols)
+        await self._send(conn, "subscribe", "heartbeat", symbols)
+
+    async def unsubscribe_symbols(
+        self, conn: AsyncConnection, channel: str, symbols: list
+    ):
+        await self._send(conn, "unsubscribe", channel, symbols)
+        if channel == self.websocket_channels[L2_BOOK]:
+            self.__reset(pairs=symbols)
+        carried = set(itertools.chain(*conn.subscription.values()))
+        unused = [symbol for symbol in symbols if symbol not in carried]
+        if unused:
+            await self._send(conn, "unsubscribe", "heartbeat", unused)
+
     async def subscribe(self, conn: AsyncConnection):
-        self.__reset()
-        all_pairs = list()
-
-        async def _subscribe(chan: str, product_ids: list):
-            params = {"type": "subscribe", "product_ids": product_ids, "channel": chan}
-            private_params = get_private_parameters(self.config, chan, product_ids)
-            if private_params:
-                params = {**params, **private_params}
-            await conn.write(json.dumps(params))
-
-        for channel in self.subscription:
-            all_pairs += self.subscription[channel]
-            await _subscribe(channel, self.subscription[channel])
-        all_pairs = list(dict.fromkeys(all_pairs))
-        await _subscribe("heartbeat", all_pairs)
+        # a feed can be split across several connections, so only the pairs
+        # carried by this connection are (re)subscribed and have their books reset
+        all_pairs = list(dict.fromkeys(itertools.chain(*conn.subscription.values())))
+        self.__reset(pairs=all_pairs)
+
+        for channel in conn.subscription:
+            await self._send(conn, "subscribe", channel, conn.subscription[channel])
+        await self._send(conn, "subscribe", "heartbeat", all_pairs)
         # Implementing heartbeat as per Best Practices doc: https://docs.cloud.coinbase.com/advanced-trade-api/docs/ws-best-practices
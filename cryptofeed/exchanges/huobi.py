@@ -6,7 +6,6 @@ associated with this software.
 """
 
 import logging
-import zlib
 from decimal import Decimal
 from typing import Dict, Tuple
 
@@ -30,6 +29,9 @@ LOG = logging.getLogger("feedhandler")
 class Huobi(Feed):
     id = HUOBI
     websocket_endpoints = [WebsocketEndpoint("wss://api.huobi.pro/ws")]
+    # every message is gzipped, self.decoder decompresses and parses it (off the event loop
+    # with decode)
+    message_decoder = {"gzip": True}
     rest_endpoints = [
         RestEndpoint("https://api.huobi.pro", routes=Routes("/v1/common/symbols"))
     ]
@@ -161,10 +163,11 @@ class Huobi(Feed):
             }
         }
         """
-        for trade in msg["tick"]["data"]:
-            t = Trade(
+        symbol = self.exchange_symbol_to_std_symbol(msg["ch"].split(".")[1])
+        trades = [
+            Trade(
                 self.id,
-                self.exchange_symbol_to_std_symbol(msg["ch"].split(".")[1]),
+                symbol,
                 BUY if trade["direction"] == "buy" else SELL,
                 Decimal(trade["amount"]),
                 Decimal(trade["price"]),
@@ -172,7 +175,9 @@ class Huobi(Feed):
                 id=str(trade["tradeId"]),
                 raw=trade,
             )
-            await self.callback(TRADES, t, timestamp)
+            for trade in msg["tick"]["data"]
+        ]
+        await self.callback_batch(TRADES, trades, timestamp)
 
     async def _candles(self, msg: dict, symbol: str, interval: str, timestamp: float):
         """
@@ -213,9 +218,8 @@ class Huobi(Feed):
         await self.callback(CANDLES, c, timestamp)
 
     async def message_handler(self, msg: str, conn, timestamp: float):
-        # unzip message
-        msg = zlib.decompress(msg, 16 + zlib.MAX_WBITS)
-        msg = json.loads(msg, parse_float=Decimal)
+        if isinstance(msg, bytes):
+            msg = self.decoder(msg)
 
         # Huobi sends a ping evert 5 seconds and will disconnect us if we do not respond to it
         if "ping" in msg:
@@ -6,7 +6,6 @@ associated with this software.
 """
 
 import logging
-import zlib
 from collections import defaultdict
 from decimal import Decimal
 from typing import Dict, Tuple
@@ -30,6 +29,9 @@ LOG = logging.getLogger("feedhandler")
 class HuobiDM(Feed):
     id = HUOBI_DM
     websocket_endpoints = [WebsocketEndpoint("wss://www.hbdm.com/ws")]
+    # every message is gzipped, self.decoder decompresses and parses it (off the event loop
+    # with decode)
+    message_decoder = {"gzip": True}
     rest_endpoints = [
         RestEndpoint(
             "https://www.hbdm.com", routes=Routes("/api/v1/contract_contract_info")
@@ -137,9 +139,8 @@ class HuobiDM(Feed):
 
     async def message_handler(self, msg: str, conn, timestamp: float):
 
-        # unzip message
-        msg = zlib.decompress(msg, 16 + zlib.MAX_WBITS)
-        msg = json.loads(msg, parse_float=Decimal)
+        if isinstance(msg, bytes):
+            msg = self.decoder(msg)
 
         # Huobi sends a ping evert 5 seconds and will disconnect us if we do not respond to it
         if "ping" in msg:
@@ -6,6 +6,7 @@ associated with this software.
 """
 
 import asyncio
+import functools
 import logging
 import time
 from collections import defaultdict
@@ -141,7 +142,8 @@ class HuobiSwap(HuobiDM):
 
     async def subscribe(self, conn: AsyncConnection):
         if FUNDING in self.subscription:
-            loop = asyncio.get_event_loop()
-            loop.create_task(self._funding(self.subscription[FUNDING]))
+            self.start_poller(
+                FUNDING, functools.partial(self._funding, self.subscription[FUNDING])
+            )
 
         await super().subscribe(conn)
@@ -7,6 +7,7 @@ associated with this software.
 
 import asyncio
 import base64
+import functools
 import hmac
 import logging
 import time
@@ -607,7 +608,10 @@ class OKX(Feed, OKXRestMixin):
         channels = []
         for chan in self.subscription:
             if chan == LIQUIDATIONS:
-                asyncio.create_task(self._liquidations(self.subscription[chan]))
+                self.start_poller(
+                    LIQUIDATIONS,
+                    functools.partial(self._liquidations, self.subscription[chan]),
+                )
                 continue
             for pair in self.subscription[chan]:
                 channels.append(self.build_subscription(chan, pair))
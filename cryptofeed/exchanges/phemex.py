@@ -34,7 +34,7 @@ from cryptofeed.defines import (
     PERPETUAL,
 )
 from cryptofeed.feed import Feed
-from cryptofeed.symbols import Symbol
+from cryptofeed.symbols import Symbol, Symbols
 
 LOG = logging.getLogger("feedhandler")
 
@@ -51,7 +51,6 @@ class Phemex(Feed):
             "https://api.phemex.com", routes=Routes("/exchange/public/cfg/v2/products")
         )
     ]
-    price_scale = {}
     valid_candle_intervals = (
         "1m",
         "5m",
@@ -116,7 +115,7 @@ class Phemex(Feed):
             # the price scale for spot symbols is not reported via the API but it is documented
             # here in the API docs: https://github.com/phemex/phemex-api-docs/blob/master/Public-Spot-API-en.md#spot-currency-and-symbols
             # the default value for spot is 10^8
-            cls.price_scale[s.normalized] = 10 ** entry.get("priceScale", 8)
+            info["price_scale"][s.normalized] = 10 ** entry.get("priceScale", 8)
         return ret, info
 
     def __init__(self, **kwargs):
@@ -126,6 +125,9 @@ class Phemex(Feed):
             raise ValueError(
                 f"{self.id} only allows a maximum of 100 symbol/channel subscriptions"
             )
+        # the price scales are kept with the symbol info so they are also restored
+        # when the symbols are loaded from the symbol cache
+        self.price_scale = Symbols.get(self.id)[1]["price_scale"]
 
     def __reset(self, conn: AsyncConnection):
         if self.std_channel_to_exchange(L2_BOOK) in conn.subscription:
@@ -6,15 +6,23 @@ associated with this software.
 """
 
 import asyncio
+import functools
+import itertools
 import logging
 from collections import defaultdict
-from typing import Tuple, Callable, List, Union
+from typing import Tuple, Callable, List, Optional, Union
 
 from aiohttp.typedefs import StrOrURL
-from cryptofeed.types import OrderBook
+from cryptofeed.types import FixedPoint, OrderBook
 
+from cryptofeed.admission import AdmissionController
 from cryptofeed.callback import Callback
-from cryptofeed.connection import AsyncConnection, HTTPAsyncConn, WSAsyncConn
+from cryptofeed.connection import (
+    AsyncConnection,
+    HTTPAsyncConn,
+    WebsocketEndpoint,
+    WSAsyncConn,
+)
 from cryptofeed.connection_handler import ConnectionHandler
 from cryptofeed.defines import (
     BALANCES,
@@ -31,13 +39,32 @@ from cryptofeed.defines import (
     TRADES,
     FILLS,
 )
-from cryptofeed.exceptions import BidAskOverlapping
+from cryptofeed.exceptions import BidAskOverlapping, UnsupportedDataFeed
+from cryptofeed.decode import DecodeStage, get_decoder
 from cryptofeed.exchange import Exchange
+from cryptofeed.hedge import Hedge
+from cryptofeed.metrics import REGISTRY, Histogram
+from cryptofeed.symbols import Symbols
+from cryptofeed.watchdog import Watchdog
 
 LOG = logging.getLogger("feedhandler")
 
 
 class Feed(Exchange):
+    # True if the sequence numbers passed to book_callback number the messages of a
+    # connection rather than the updates of a symbol
+    connection_sequence_numbers = False
+    # True if the exchange implements subscribe_symbols / unsubscribe_symbols, see add_symbols
+    incremental_subscriptions = False
+    # function returning the coalescing key of a raw message (or None), see IngressQueue
+    coalesce_key = None
+    # settings of the JSONDecoder of the feed (see get_decoder), set by exchanges whose
+    # message_handler parses messages with self.decoder and accepts decoded messages
+    message_decoder = None
+    # True if the handlers build fixed point types and books (see FixedPoint) for feeds
+    # created with fixed_point
+    fixed_point_supported = False
+
     def __init__(
         self,
         candle_interval="1m",
@@ -56,6 +83,16 @@ class Feed(Exchange):
         log_message_on_error=False,
         delay_start=0,
         http_proxy: StrOrURL = None,
+        stale_after: dict = None,
+        priority: int = 0,
+        redundancy: int = 1,
+        redundant_addresses: list = None,
+        ingress: dict = None,
+        decode: dict = None,
+        decoder: dict = None,
+        timestamp_ns: bool = False,
+        fixed_point: bool = False,
+        tick_book: bool = False,
         **kwargs,
     ):
         """
@@ -92,6 +129,46 @@ class Feed(Exchange):
             on a single exchange, you may encounter 429s. You can use this to stagger the starts.
         http_proxy: str
             URL of proxy server. Passed to HTTPPoll and HTTPAsyncConn. Only used for HTTP GET requests.
+        stale_after: dict
+            Maximum time, in seconds, between updates of a symbol per channel, e.g. {L2_BOOK: 60}. A symbol that goes
+            quiet for longer is resubscribed (or its connection restarted if the exchange can not resubscribe a single
+            symbol), even though the connection is still receiving messages for other symbols.
+        priority: int
+            After an outage, the connections of the feeds of an exchange are reestablished at the rate allowed by its
+            AdmissionController (see Exchange.websocket_limits and the admission config key), lower priorities first.
+        redundancy: int
+            Number of independent copies (replicas) of the feed, each with its own websocket connections and book
+            state. The first replica to deliver an update wins and the copies from the others are dropped (see Hedge),
+            so the feed stays live while one replica stalls or reconnects. The replicas are feeds of the exchange
+            created with the same arguments, which the caller adds with add_replica (see
+            MarketDataAggregator.create_feeds).
+        redundant_addresses: list of str
+            websocket address of each additional replica (redundancy - 1 addresses), defaults to the feed's address.
+        ingress: dict
+            Buffer the messages of each connection in a bounded IngressQueue between the reads and the message
+            handler, e.g. {"size": 10000, "policy": "drop", "max_lag": 5}. With the drop policy, a connection that
+            falls behind drops its backlog and is resynced (see resync). By default messages are handled as they are
+            read.
+        decode: dict
+            Decode (decompress and parse) the messages in a thread or process pool instead of on the event loop, e.g.
+            {"executor": "thread", "workers": 2, "batch": 100}, see DecodeStage. Only for exchanges that set
+            message_decoder.
+        decoder: dict
+            Overrides of the exchange's JSON decoder settings, e.g. {"backend": "orjson"} or
+            {"backend": "orjson", "decimal_fields": ["price", "amount", "bids", "asks"]}, see get_decoder. Only for
+            exchanges that set message_decoder.
+        timestamp_ns: bool
+            Deliver the receipt timestamps of websocket messages as ReceiptTimestamp: still float seconds, but also
+            carrying the exact integer nanoseconds at which the frame arrived (ns), which backends created with
+            timestamp_ns write instead of the float.
+        fixed_point: bool
+            Represent prices and sizes as integers scaled by the tick and lot size of the symbol (see FixedPoint
+            and fixed_point_of) in trades, tickers and books, rather than as Decimal. to_dict converts them back
+            exactly, so callbacks receiving dicts are unaffected, while those reading the attributes (e.g. NBBO or
+            the aggregate callbacks) get the integers. Only for exchanges that set fixed_point_supported.
+        tick_book: bool
+            Keep the L2 books in TickBooks, arrays of levels indexed by the distance of the price in ticks, rather
+            than in sorted dicts. Requires fixed_point, and is not available with checksum_validation.
         """
         super().__init__(**kwargs)
         self.log_on_error = log_message_on_error
@@ -114,6 +191,54 @@ class Feed(Exchange):
         self.candle_interval = candle_interval
         self.candle_closed_only = candle_closed_only
         self._sequence_no = {}
+        self._pollers = {}
+        self.stale_after = stale_after if stale_after else {}
+        self._last_update = {}
+        # (channel, symbol) -> asyncio.Event set by its first update, see expect_updates
+        self._expected = {}
+        self._subscription_watches = defaultdict(dict)
+        self._latencies = {}
+        self.priority = priority
+        self.ingress = ingress
+        self.decode = decode
+        self.timestamp_ns = timestamp_ns
+        self.decoder = None
+        if self.message_decoder is not None:
+            self.decoder = get_decoder(**{**self.message_decoder, **(decoder or {})})
+        else:
+            if decode:
+                LOG.warning(
+                    "%s: off loop decoding is not supported, ignoring decode", self.id
+                )
+                self.decode = None
+            if decoder:
+                LOG.warning(
+                    "%s: pluggable decoding is not supported, ignoring decoder", self.id
+                )
+        self.fixed_point = fixed_point
+        if fixed_point and not self.fixed_point_supported:
+            LOG.warning(
+                "%s: fixed point prices and sizes are not supported, ignoring fixed_point",
+                self.id,
+            )
+            self.fixed_point = False
+        self._fixed_points = {}
+        self.tick_book = tick_book
+        if tick_book and (not self.fixed_point or checksum_validation):
+            LOG.warning(
+                "%s: tick books require fixed_point and no checksum_validation, ignoring tick_book",
+                self.id,
+            )
+            self.tick_book = False
+        self.redundancy = redundancy
+        self.redundant_addresses = redundant_addresses
+        self.replicas = []
+        self._replica_index = 0
+        self._hedge = (
+            Hedge(sequenced=not self.connection_sequence_numbers)
+            if redundancy > 1
+            else None
+        )
 
         if self.valid_candle_intervals != NotImplemented:
             if candle_interval not in self.valid_candle_intervals:
@@ -203,7 +328,7 @@ class Feed(Exchange):
         return []
 
     def connect(
-        self,
+        self, subscription: dict = None, endpoints: list = None
     ) -> List[
         Tuple[AsyncConnection, Callable[[None], None], Callable[[str, float], None]]
     ]:
@@ -217,6 +342,12 @@ class Feed(Exchange):
         2. the subscribe function pointer associated with this connection
         3. the message handler for this connection
         4. The authentication method for this connection
+
+        subscription: dict
+            (exchange) channel -> (exchange) symbols to connect for, instead of the whole subscription
+            of the feed. Only the websocket connections are created. Used by add_symbols.
+        endpoints: list of WebsocketEndpoint
+            the endpoints to connect to, instead of all of them
         """
 
         def limit_sub(subscription: dict, limit: int, auth, options: dict):
@@ -261,8 +392,9 @@ class Feed(Exchange):
                 )
             return ret
 
-        ret = self._connect_rest()
-        for endpoint in self.websocket_endpoints:
+        ret = self._connect_rest() if subscription is None else []
+        subscription = self.subscription if subscription is None else subscription
+        for endpoint in endpoints if endpoints else self.websocket_endpoints:
             auth = None
             if endpoint.authentication:
                 # if a class has an endpoint with the authentication flag set to true, this
@@ -280,7 +412,7 @@ class Feed(Exchange):
             # while in the context of the class
             temp_sub = {
                 chan: [self.exchange_symbol_to_std_symbol(s) for s in symbols]
-                for chan, symbols in self.subscription.items()
+                for chan, symbols in subscription.items()
             }
             filtered_sub = {
                 chan: [self.std_symbol_to_exchange_symbol(s) for s in symbols]
@@ -301,7 +433,11 @@ class Feed(Exchange):
                                     add,
                                     self.id,
                                     authentication=auth,
-                                    subscription=filtered_sub,
+                                    # each its own, add_symbols updates one of them
+                                    subscription={
+                                        chan: list(symbols)
+                                        for chan, symbols in filtered_sub.items()
+                                    },
                                     **endpoint.options,
                                 ),
                                 self.subscribe,
@@ -379,10 +515,165 @@ class Feed(Exchange):
                     f"{self.id} - {data.symbol}: best bid {best_bid} >= best ask {best_ask}"
                 )
 
+    def fixed_point_of(self, symbol: str) -> Optional[FixedPoint]:
+        """
+        The FixedPoint of a (standard) symbol, from the tick_size and lot_size of the
+        exchange's symbol information, or None if the feed was not created with
+        fixed_point
+        """
+        if not self.fixed_point:
+            return None
+        if symbol not in self._fixed_points:
+            info = Symbols.get(self.id)[1]
+            tick_size = info.get("tick_size", {}).get(symbol)
+            if tick_size is None:
+                raise ValueError(f"{self.id}: no tick size for {symbol}")
+            self._fixed_points[symbol] = FixedPoint.from_increments(
+                tick_size, info.get("lot_size", {}).get(symbol)
+            )
+        return self._fixed_points[symbol]
+
+    def fixed_point_failed(self, symbol: str, error: ValueError):
+        """
+        Called by the handlers when a price or size of a symbol has more decimals than its
+        FixedPoint (e.g. the exchange changed its tick size): the symbol is delivered in
+        Decimal from then on (fixed_point_of returns None), see decimal_book.
+        """
+        LOG.error(
+            "%s: %s does not fit its fixed point (%s), using Decimal for it",
+            self.id,
+            symbol,
+            str(error),
+        )
+        self._fixed_points[symbol] = None
+
+    def decimal_book(self, book: OrderBook) -> OrderBook:
+        """
+        A copy of a fixed point book, with Decimal prices and sizes
+        """
+        fp = book.fixed_point
+        return OrderBook(
+            self.id,
+            book.symbol,
+            max_depth=self.max_depth,
+            bids={
+                fp.to_price(p): fp.to_size(s)
+                for p, s in book.book.bids.to_dict().items()
+            },
+            asks={
+                fp.to_price(p): fp.to_size(s)
+                for p, s in book.book.asks.to_dict().items()
+            },
+        )
+
+    def _latency(self, data_type) -> Histogram:
+        if data_type not in self._latencies:
+            self._latencies[data_type] = REGISTRY.histogram(
+                "cryptofeed_receipt_latency_seconds",
+                "Time between the exchange timestamp of an update and its receipt",
+                exchange=self.id,
+                channel=data_type,
+            )
+        return self._latencies[data_type]
+
+    def _first_update(self, data_type, obj):
+        # a book counts with its snapshot, the deltas before it (if any) are not usable
+        if getattr(obj, "delta", None) is not None:
+            return
+        event = self._expected.pop((data_type, obj.symbol), None)
+        if event is not None:
+            event.set()
+
+    def expect_updates(self, channel: str, symbols: list):
+        """
+        Track the first update of the symbols of the channel from now on, see wait_updates
+        """
+        for symbol in symbols:
+            self._expected[(channel, symbol)] = asyncio.Event()
+
+    async def wait_updates(self, symbols: list, timeout: float) -> bool:
+        """
+        Wait until each of the symbols had its first update since expect_updates (called by
+        add_symbols): its snapshot on every book channel of the feed, or an update on any
+        channel if the feed has no book channel.
+
+        Returns False if they did not within timeout seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        for symbol in symbols:
+            events = {
+                channel: event
+                for (channel, s), event in self._expected.items()
+                if s == symbol
+            }
+            if not events:
+                continue
+            books = [e for c, e in events.items() if c in (L2_BOOK, L3_BOOK)]
+            waits = [asyncio.ensure_future(e.wait()) for e in books or events.values()]
+            done, pending = await asyncio.wait(
+                waits,
+                timeout=max(0.0, deadline - loop.time()),
+                return_when=(
+                    asyncio.ALL_COMPLETED if books else asyncio.FIRST_COMPLETED
+                ),
+            )
+            for wait in pending:
+                wait.cancel()
+            if not done or (books and pending):
+                return False
+        return True
+
     async def callback(self, data_type, obj, receipt_timestamp):
+        if self.stale_after:
+            self._last_update[(data_type, obj.symbol)] = receipt_timestamp
+        if self._expected:
+            self._first_update(data_type, obj)
+        if self._hedge is not None and not self._hedge.first(
+            self._replica_index, data_type, obj
+        ):
+            return
+        timestamp = getattr(obj, "timestamp", None)
+        if timestamp:
+            # clocks are not synchronized, updates seemingly from the future count as 0
+            self._latency(data_type).observe(max(0.0, receipt_timestamp - timestamp))
         for cb in self.callbacks[data_type]:
             await cb(obj, receipt_timestamp)
 
+    async def callback_batch(self, data_type, objs: list, receipt_timestamp):
+        """
+        Delivers the updates of a message (e.g. the trades of a frame) at once: callbacks
+        with a batch method (Callback, backend callbacks) get a single call with all of
+        them, the others a call per update. The updates must not be modified afterwards,
+        which is why books, updated in place, go through book_callback one at a time.
+        """
+        if self.stale_after:
+            for obj in objs:
+                self._last_update[(data_type, obj.symbol)] = receipt_timestamp
+        if self._expected:
+            for obj in objs:
+                self._first_update(data_type, obj)
+        if self._hedge is not None:
+            objs = [
+                obj
+                for obj in objs
+                if self._hedge.first(self._replica_index, data_type, obj)
+            ]
+        if not objs:
+            return
+        latency = self._latency(data_type)
+        for obj in objs:
+            timestamp = getattr(obj, "timestamp", None)
+            if timestamp:
+                latency.observe(max(0.0, receipt_timestamp - timestamp))
+        for cb in self.callbacks[data_type]:
+            batch = getattr(cb, "batch", None)
+            if batch is not None:
+                await batch(objs, receipt_timestamp)
+            else:
+                for obj in objs:
+                    await cb(obj, receipt_timestamp)
+
     async def message_handler(self, msg: str, conn: AsyncConnection, timestamp: float):
         raise NotImplementedError
 
@@ -392,17 +683,290 @@ class Feed(Exchange):
     async def authenticate(self, connection: AsyncConnection):
         pass
 
-    async def shutdown(self):
+    async def subscribe_symbols(
+        self, connection: AsyncConnection, channel: str, symbols: list
+    ):
+        """
+        Subscribe to more (exchange) symbols of an (exchange) channel on an open connection.
+        Implemented by the exchanges that set incremental_subscriptions.
+        """
+        raise NotImplementedError
+
+    async def unsubscribe_symbols(
+        self, connection: AsyncConnection, channel: str, symbols: list
+    ):
+        """
+        Unsubscribe from (exchange) symbols of an (exchange) channel on an open connection,
+        and drop their state. Implemented by the exchanges that set incremental_subscriptions.
+        """
+        raise NotImplementedError
+
+    async def resubscribe(
+        self, connection: AsyncConnection, channel: str, symbols: list
+    ) -> bool:
+        """
+        Resubscribe to (exchange) symbols of an (exchange) channel on an open connection.
+        Returns False if the exchange does not support it, the connection is then restarted.
+        """
+        if not self.incremental_subscriptions:
+            return False
+        await self.unsubscribe_symbols(connection, channel, symbols)
+        await self.subscribe_symbols(connection, channel, symbols)
+        return True
+
+    async def resync(self, connection: AsyncConnection):
+        """
+        Rebuild the state (books) of a connection after messages were dropped: resubscribe
+        to everything it carries when the exchange supports it, otherwise restart it
+        """
+        LOG.warning("%s: resyncing after dropped messages", connection.uuid)
+        if self.incremental_subscriptions and isinstance(connection.subscription, dict):
+            for chan, symbols in connection.subscription.items():
+                await self.resubscribe(connection, chan, list(symbols))
+        else:
+            await connection.close()
+
+    def _update_subscription(self, channel: str, symbols: list, add: bool):
+        chan = self.std_channel_to_exchange(channel)
+        exchange_symbols = [self.std_symbol_to_exchange_symbol(s) for s in symbols]
+        # the symbol lists of the channels may be one shared list, so they are replaced
+        if add:
+            self.subscription[chan] = type(self.subscription.get(chan, []))(
+                [*self.subscription.get(chan, []), *exchange_symbols]
+            )
+            self._feed_config[channel] = [*self._feed_config.get(channel, []), *symbols]
+        else:
+            self.subscription[chan] = type(self.subscription[chan])(
+                [s for s in self.subscription[chan] if s not in exchange_symbols]
+            )
+            self._feed_config[channel] = [
+                s for s in self._feed_config[channel] if s not in symbols
+            ]
+        self.normalized_symbols = list(
+            dict.fromkeys(itertools.chain(*self._feed_config.values()))
+        )
+
+    def _endpoint(self, conn: AsyncConnection) -> Optional[WebsocketEndpoint]:
+        for endpoint in self.websocket_endpoints:
+            address = endpoint.get_address(self.sandbox)
+            if conn.address == address or (
+                isinstance(address, list) and conn.address in address
+            ):
+                return endpoint
+        return None
+
+    async def add_symbols(self, channel: str, symbols: list) -> bool:
+        """
+        Subscribe to more symbols of a channel while the feed is running, on its open
+        connections as far as the endpoint limits allow, and on new connections beyond them.
+        The other symbols are not interrupted.
+
+        channel: str
+            a (standard) channel the feed is subscribed to
+        symbols: list of str
+            (standard) symbols
+
+        Returns False if the exchange does not support incremental subscriptions, in which
+        case the feed has to be replaced by a new one.
+        """
+        if not self.incremental_subscriptions:
+            return False
+        symbols = [s for s in symbols if s not in self._feed_config.get(channel, [])]
+        if not symbols:
+            return True
+        self._update_subscription(channel, symbols, add=True)
+        self.expect_updates(channel, symbols)
+        chan = self.std_channel_to_exchange(channel)
+
+        for endpoint in self.websocket_endpoints:
+            pending = [
+                self.std_symbol_to_exchange_symbol(s)
+                for s in endpoint.subscription_filter({chan: symbols}).get(chan, [])
+            ]
+            for handler in self.connection_handlers:
+                conn = handler.conn
+                if not pending:
+                    break
+                if (
+                    not handler.running
+                    or not isinstance(conn, WSAsyncConn)
+                    or self._endpoint(conn) is not endpoint
+                ):
+                    continue
+                room = len(pending)
+                if endpoint.limit:
+                    room = endpoint.limit - sum(map(len, conn.subscription.values()))
+                if room <= 0:
+                    continue
+                added, pending = pending[:room], pending[room:]
+                conn.subscription[chan] = [*conn.subscription.get(chan, []), *added]
+                # a closed connection subscribes to them when it reconnects
+                if conn.is_open:
+                    await self.subscribe_symbols(conn, chan, added)
+                    if channel in self.stale_after:
+                        for symbol in added:
+                            self._watch_subscription(
+                                conn, channel, symbol, self.stale_after[channel]
+                            )
+            if pending:
+                self._start_connections(
+                    asyncio.get_running_loop(),
+                    subscription={chan: pending},
+                    endpoints=[endpoint],
+                )
+
+        for replica in self.replicas:
+            await replica.add_symbols(channel, symbols)
+        return True
+
+    async def remove_symbols(self, channel: str, symbols: list) -> bool:
+        """
+        Unsubscribe from symbols of a channel while the feed is running. Connections left
+        without any subscription are closed, the others are not interrupted.
+
+        Returns False if the exchange does not support incremental subscriptions.
+        """
+        if not self.incremental_subscriptions:
+            return False
+        symbols = [s for s in symbols if s in self._feed_config.get(channel, [])]
+        if not symbols:
+            return True
+        chan = self.std_channel_to_exchange(channel)
+        exchange_symbols = {self.std_symbol_to_exchange_symbol(s) for s in symbols}
+
+        for handler in list(self.connection_handlers):
+            conn = handler.conn
+            if not isinstance(conn.subscription, dict) or chan not in conn.subscription:
+                continue
+            removed = [s for s in conn.subscription[chan] if s in exchange_symbols]
+            if not removed:
+                continue
+            remaining = [
+                s for s in conn.subscription[chan] if s not in exchange_symbols
+            ]
+            if remaining:
+                conn.subscription[chan] = remaining
+            else:
+                del conn.subscription[chan]
+            watches = self._subscription_watches.get(conn.uuid, {})
+            for symbol in removed:
+                key = (channel, self.exchange_symbol_to_std_symbol(symbol))
+                if key in watches:
+                    watches.pop(key).cancel()
+            if not conn.subscription:
+                handler.running = False
+                self.connection_handlers.remove(handler)
+                await conn.close()
+            elif conn.is_open:
+                await self.unsubscribe_symbols(conn, chan, removed)
+
+        self._update_subscription(channel, symbols, add=False)
+        for symbol in symbols:
+            self._last_update.pop((channel, symbol), None)
+            self._expected.pop((channel, symbol), None)
+        for replica in self.replicas:
+            await replica.remove_symbols(channel, symbols)
+        return True
+
+    def _watch_subscriptions(self, conn: AsyncConnection):
+        if not self.stale_after or not isinstance(conn.subscription, dict):
+            return
+        for channel, timeout in self.stale_after.items():
+            try:
+                exchange_channel = self.std_channel_to_exchange(channel)
+            except UnsupportedDataFeed:
+                continue
+            for symbol in conn.subscription.get(exchange_channel, []):
+                self._watch_subscription(conn, channel, symbol, timeout)
+
+    def _watch_subscription(
+        self, conn: AsyncConnection, channel: str, symbol: str, timeout: float
+    ):
+        key = (channel, self.exchange_symbol_to_std_symbol(symbol))
+        self._subscription_watches[conn.uuid][key] = Watchdog.get().watch(
+            lambda: self._last_update.get(key),
+            timeout,
+            functools.partial(self._subscription_stale, conn, channel, symbol, timeout),
+            name=f"{conn.uuid} {channel} {symbol}",
+        )
+
+    def _unwatch_subscriptions(self, conn: AsyncConnection):
+        for watch in self._subscription_watches.pop(conn.uuid, {}).values():
+            watch.cancel()
+
+    async def _subscription_stale(
+        self, conn: AsyncConnection, channel: str, symbol: str, timeout: float
+    ):
+        if not conn.is_open:
+            return
+        LOG.warning(
+            "%s: no %s updates for %s within %s seconds, resubscribing",
+            conn.uuid,
+            channel,
+            symbol,
+            timeout,
+        )
+        try:
+            resubscribed = await self.resubscribe(
+                conn, self.std_channel_to_exchange(channel), [symbol]
+            )
+        except Exception:
+            LOG.error(
+                "%s: failed to resubscribe to %s", conn.uuid, symbol, exc_info=True
+            )
+            resubscribed = False
+        if resubscribed:
+            self._watch_subscription(conn, channel, symbol, timeout)
+        else:
+            LOG.warning("%s: restarting connection", conn.uuid)
+            await conn.close()
+
+    def start_poller(self, name: str, coro_factory: Callable):
+        """
+        Start a REST polling loop, at most once per feed (subscribe runs on every reconnect).
+        If a lease registry is configured (config key lease, see cryptofeed.lease), the poller
+        runs on a single node of the cluster, and another node takes it over if that one dies.
+
+        name: str
+            name of the poller, unique per exchange
+        coro_factory: callable
+            called without arguments to create the polling coroutine
+        """
+        if name in self._pollers and not self._pollers[name].done():
+            return
+        if self.config.lease:
+            from cryptofeed.lease import SingletonLease
+
+            coro = SingletonLease(**self.config.lease).run(
+                f"{self.id}:{name}", coro_factory
+            )
+        else:
+            coro = coro_factory()
+        self._pollers[name] = asyncio.get_event_loop().create_task(coro)
+
+    async def shutdown(self, stop_callbacks=True):
+        """
+        stop_callbacks: bool
+            if False, the backends are left running. Use this when removing a feed whose
+            backends are shared with other feeds.
+        """
         LOG.info("%s: feed shutdown starting...", self.id)
+        for poller in self._pollers.values():
+            poller.cancel()
         await self.http_conn.close()
+        for replica in self.replicas:
+            await replica.shutdown(stop_callbacks=False)
 
-        for callbacks in self.callbacks.values():
-            for callback in callbacks:
-                if hasattr(callback, "stop"):
-                    LOG.info(
-                        "%s: stopping backend %s", self.id, self.backend_name(callback)
-                    )
-                    await callback.stop()
+        if stop_callbacks:
+            for callbacks in self.callbacks.values():
+                for callback in callbacks:
+                    if hasattr(callback, "stop"):
+                        LOG.info(
+                            "%s: stopping backend %s",
+                            self.id,
+                            self.backend_name(callback),
+                        )
+                        await callback.stop()
         for c in self.connection_handlers:
             await c.conn.close()
         LOG.info("%s: feed shutdown completed", self.id)
@@ -410,27 +974,39 @@ class Feed(Exchange):
     def stop(self):
         for c in self.connection_handlers:
             c.running = False
+        for replica in self.replicas:
+            replica.stop()
+
+    def add_replica(self, replica: "Feed"):
+        """
+        Add a replica to a feed created with redundancy: a feed of the same exchange, created
+        with the same arguments but without callbacks and redundancy. It is started and
+        stopped with this feed, and subscribed to the symbols added to / removed from it.
+        """
+        index = len(self.replicas) + 1
+        # the replicas deliver to the backends of this feed, through its Hedge
+        replica.callbacks = self.callbacks
+        replica._hedge = self._hedge
+        replica._replica_index = index
+        if self.redundant_addresses:
+            address = self.redundant_addresses[index - 1]
+            replica._address = lambda: address
+        self.replicas.append(replica)
 
     def start(self, loop: asyncio.AbstractEventLoop):
         """
         Create tasks for exchange interfaces and backends
         """
-        for conn, sub, handler, auth in self.connect():
-            self.connection_handlers.append(
-                ConnectionHandler(
-                    conn,
-                    sub,
-                    handler,
-                    auth,
-                    self.retries,
-                    timeout=self.timeout,
-                    timeout_interval=self.timeout_interval,
-                    exceptions=self.exceptions,
-                    log_on_error=self.log_on_error,
-                    start_delay=self.start_delay,
-                )
+        self._start_connections(loop)
+        if len(self.replicas) != self.redundancy - 1:
+            LOG.warning(
+                "%s: created with redundancy %d but %d replicas were added",
+                self.id,
+                self.redundancy,
+                len(self.replicas),
             )
-            self.connection_handlers[-1].start(loop)
+        for replica in self.replicas:
+            replica._start_connections(loop)
 
         for callbacks in self.callbacks.values():
             for callback in callbacks:
@@ -446,6 +1022,47 @@ class Feed(Exchange):
                         loop, multiprocess=self.config.backend_multiprocessing
                     )
 
+    def _start_connections(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        subscription: dict = None,
+        endpoints: list = None,
+    ):
+        admission = None
+        if self.config.admission is not False:
+            admission = AdmissionController.get(
+                self.id, loop, **{**self.websocket_limits, **self.config.admission}
+            )
+        for conn, sub, handler, auth in self.connect(subscription, endpoints):
+            self.connection_handlers.append(
+                ConnectionHandler(
+                    conn,
+                    sub,
+                    handler,
+                    auth,
+                    self.retries,
+                    timeout=self.timeout,
+                    timeout_interval=self.timeout_interval,
+                    exceptions=self.exceptions,
+                    log_on_error=self.log_on_error,
+                    start_delay=self.start_delay,
+                    on_connect=self._watch_subscriptions,
+                    on_disconnect=self._unwatch_subscriptions,
+                    admission=admission,
+                    priority=self.priority,
+                    ingress=self.ingress,
+                    resync=self.resync,
+                    coalesce_key=self.coalesce_key,
+                    decode_stage=(
+                        DecodeStage(self.decoder, **self.decode)
+                        if self.decode
+                        else None
+                    ),
+                    timestamp_ns=self.timestamp_ns,
+                )
+            )
+            self.connection_handlers[-1].start(loop)
+
     def backend_name(self, callback):
         if hasattr(callback, "__class__"):
             if hasattr(callback, "handler"):
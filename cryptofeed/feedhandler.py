@@ -6,6 +6,7 @@ associated with this software.
 """
 
 import asyncio
+import functools
 import logging
 import signal
 import sys
@@ -28,7 +29,9 @@ from cryptofeed.config import Config
 from cryptofeed.defines import L2_BOOK
 from cryptofeed.feed import Feed
 from cryptofeed.log import get_logger
+from cryptofeed.metrics import start_metrics
 from cryptofeed.nbbo import NBBO
+from cryptofeed.symbols import Symbols
 from cryptofeed.exchanges import EXCHANGE_MAP
 
 
@@ -53,16 +56,22 @@ def setup_signal_handlers(loop):
 
 
 class FeedHandler:
-    def __init__(self, config=None, raw_data_collection=None):
+    def __init__(self, config=None, raw_data_collection=None, metrics: dict = None):
         """
         config: str, dict or None
             if str, absolute path (including file name) of the config file. If not provided, config can also be a dictionary of values, or
             can be None, which will default options. See docs/config.md for more information.
         raw_data_collection: callback (see AsyncFileCallback) or None
             if set, enables collection of raw data from exchanges. ALL https/wss traffic from the exchanges will be collected.
+        metrics: dict or None
+            if set, serves the metrics of the process (see cryptofeed.metrics) in the Prometheus text format while
+            running, e.g. {"host": "127.0.0.1", "port": 9100, "loop_interval": 0.1}. Defaults to the metrics key of
+            the config.
         """
         self.feeds = []
         self.config = Config(config=config)
+        self.metrics = metrics if metrics else self.config.metrics
+        self.metrics_server = None
         self.raw_data_collection = None
         self.running = False
         if raw_data_collection:
@@ -75,6 +84,9 @@ class FeedHandler:
         if self.config.log_msg:
             LOG.info(self.config.log_msg)
 
+        if self.config.symbol_cache:
+            Symbols.enable_cache(**self.config.symbol_cache)
+
         if self.config.uvloop:
             try:
                 import uvloop
@@ -112,6 +124,18 @@ class FeedHandler:
 
             self.feeds[-1].start(loop)
 
+    async def remove_feed(self, feed):
+        """
+        feed: Feed
+            a feed previously added to the handler
+
+        Stops the feed's connections while the handler keeps running. Its backends are not
+        stopped, since they may be shared with other feeds.
+        """
+        self.feeds.remove(feed)
+        feed.stop()
+        await feed.shutdown(stop_callbacks=False)
+
     def add_nbbo(self, feeds: List[Feed], symbols: List[str], callback, config=None):
         """
         feeds: list of feed classes
@@ -162,6 +186,12 @@ class FeedHandler:
         for feed in self.feeds:
             feed.start(loop)
 
+        if self.metrics:
+            self.metrics_server = start_metrics(loop, **self.metrics)
+
+        if Symbols.refresh_interval:
+            loop.create_task(self._refresh_symbols(Symbols.refresh_interval))
+
         if not start_loop:
             return
 
@@ -179,6 +209,29 @@ class FeedHandler:
 
         LOG.info("FH: leaving run()")
 
+    async def _refresh_symbols(self, interval: float):
+        """
+        Periodically refresh the symbols of the exchanges in use, so the symbol cache stays
+        fresh. If another process already refreshed the cache it is reused.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            for exchange in {type(feed) for feed in self.feeds}:
+                cached = Symbols.load_cache(exchange.id, max_age=interval)
+                if cached:
+                    Symbols.set(exchange.id, *cached)
+                    continue
+                try:
+                    # symbol requests are blocking, keep them off the event loop
+                    await loop.run_in_executor(
+                        None, functools.partial(exchange.symbol_mapping, refresh=True)
+                    )
+                except Exception:
+                    LOG.warning(
+                        "FH: unable to refresh symbols for %s", exchange.id, exc_info=True
+                    )
+
     def _stop(self, loop=None):
         self.running = False
         if not loop:
@@ -188,6 +241,10 @@ class FeedHandler:
         for feed in self.feeds:
             feed.stop()
 
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
         if self.raw_data_collection:
             LOG.info("FH: shutting down raw data collection")
             self.raw_data_collection.stop()
@@ -0,0 +1,87 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+
+import time
+from collections import deque
+
+from cryptofeed.defines import TRADES
+
+
+class Hedge:
+    """
+    Merges the updates of the replicas of a redundant feed (see Feed redundancy): each
+    replica has its own connections and book state, the first replica to deliver an update
+    wins and the copies delivered by the other replicas are dropped.
+
+    Updates are matched by their exchange sequence number (books) or id (trades). Updates
+    that have neither (e.g. tickers, or books of exchanges without sequence numbers or
+    whose sequence numbers are per connection, see Feed.connection_sequence_numbers) are
+    taken from one replica, the leader of the symbol, and another replica takes over if the
+    leader stops delivering them for failover_after seconds. The book of the new leader was
+    built independently from the one the consumers rebuilt from the deltas of the previous
+    leader, so its first update after taking over is delivered as a snapshot.
+    """
+
+    def __init__(
+        self, sequenced: bool = True, failover_after: float = 1.0, window: int = 10000
+    ):
+        """
+        sequenced: bool
+            True if book sequence numbers are assigned by the exchange per symbol, and
+            therefore the same on every connection
+        failover_after: float
+            seconds without updates from the leader of a symbol after which another replica
+            takes over
+        window: int
+            number of recent trade ids remembered per symbol
+        """
+        self.sequenced = sequenced
+        self.failover_after = failover_after
+        self.window = window
+        self.sequence = {}
+        self.ids = {}
+        self.leaders = {}
+
+    def first(self, replica: int, data_type: str, obj) -> bool:
+        """
+        Returns True if the update is to be delivered, False if it is a copy of an update
+        already delivered by another replica. A book delta of a replica taking over is
+        turned into a snapshot (its delta is removed).
+        """
+        key = (data_type, obj.symbol)
+        sequence_number = getattr(obj, "sequence_number", None)
+        if self.sequenced and sequence_number is not None:
+            if key in self.sequence and sequence_number <= self.sequence[key]:
+                return False
+            self.sequence[key] = sequence_number
+            return True
+
+        if data_type == TRADES and obj.id is not None:
+            if key not in self.ids:
+                self.ids[key] = (deque(), set())
+            order, seen = self.ids[key]
+            if obj.id in seen:
+                return False
+            order.append(obj.id)
+            seen.add(obj.id)
+            if len(order) > self.window:
+                seen.discard(order.popleft())
+            return True
+
+        now = time.monotonic()
+        leader = self.leaders.get(key)
+        if (
+            leader is None
+            or leader[0] == replica
+            or now - leader[1] > self.failover_after
+        ):
+            self.leaders[key] = (replica, now)
+            if leader is not None and leader[0] != replica:
+                if getattr(obj, "delta", None) is not None:
+                    obj.delta = None
+            return True
+        return False
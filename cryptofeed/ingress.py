@@ -0,0 +1,183 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable
+
+LOG = logging.getLogger("feedhandler")
+
+BLOCK = "block"
+DROP = "drop"
+POLICIES = (BLOCK, DROP)
+
+
+class IngressQueue:
+    """
+    Bounded buffer between the websocket reads of a connection and its message handler.
+
+    When the handler falls behind and the buffer is full, the policy decides:
+        block: stop reading until there is room (the exchange eventually throttles or drops
+            the connection)
+        drop: drop every buffered message and resync the connection (books are rebuilt from
+            a new snapshot), also done when a message waited longer than max_lag
+    With a coalesce key function, a message replaces the buffered message with the same key
+    instead of being queued (for updates where only the latest matters, e.g. tickers).
+    """
+
+    def __init__(
+        self,
+        size: int = 10000,
+        policy: str = BLOCK,
+        max_lag: float = None,
+        coalesce_key: Callable = None,
+        name: str = "",
+    ):
+        """
+        size: int
+            maximum number of buffered messages
+        policy: str
+            block or drop
+        max_lag: float
+            seconds, with the drop policy the connection is resynced when a message waited longer
+        coalesce_key: callable
+            returns the coalescing key of a raw message, or None if it can not be coalesced
+        """
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Invalid ingress policy {policy!r}, expected one of {POLICIES}"
+            )
+        self.size = size
+        self.policy = policy
+        self.max_lag = max_lag
+        self.coalesce_key = coalesce_key
+        self.name = name
+        self.queue = deque()
+        self.keys = {}
+        self.readable = asyncio.Event()
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.closed = False
+        # statistics
+        self.lag = 0.0
+        self.max_seen_lag = 0.0
+        self.dropped = 0
+        self.coalesced = 0
+        self.resyncs = 0
+        self.resync_pending = False
+        self.last_alert = 0.0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def _alert(self, reason: str):
+        now = time.monotonic()
+        if now - self.last_alert > 10:
+            self.last_alert = now
+            LOG.warning(
+                "%s: ingress %s - %d buffered, lag %.3fs, %d dropped, %d coalesced",
+                self.name,
+                reason,
+                len(self.queue),
+                self.lag,
+                self.dropped,
+                self.coalesced,
+            )
+
+    def _drop(self, reason: str):
+        self.dropped += len(self.queue)
+        self.queue.clear()
+        self.keys.clear()
+        self.resync_pending = True
+        self.resyncs += 1
+        self._alert(reason)
+
+    async def put(self, message, timestamp: float):
+        if self.coalesce_key is not None:
+            key = self.coalesce_key(message)
+            if key is not None:
+                entry = self.keys.get(key)
+                if entry is not None:
+                    entry[1] = message
+                    entry[2] = timestamp
+                    self.coalesced += 1
+                    return
+        else:
+            key = None
+
+        if len(self.queue) >= self.size:
+            if self.policy == DROP:
+                self._drop("buffer full, resyncing")
+            else:
+                self._alert("buffer full, blocking reads")
+                self.writable.clear()
+                while len(self.queue) >= self.size and not self.closed:
+                    await self.writable.wait()
+
+        entry = [key, message, timestamp]
+        self.queue.append(entry)
+        if key is not None:
+            self.keys[key] = entry
+        self.readable.set()
+
+    def close(self):
+        """
+        No more messages, get returns None once the buffer is empty
+        """
+        self.closed = True
+        self.readable.set()
+        self.writable.set()
+
+    async def get(self):
+        """
+        Returns (message, timestamp, resync): resync is True if messages were dropped since
+        the previous one and the connection must be resynced before it is handled. Returns
+        None when closed and empty.
+        """
+        while True:
+            while not self.queue:
+                if self.closed:
+                    return None
+                self.readable.clear()
+                await self.readable.wait()
+            item = self._pop()
+            if item is not None:
+                return item
+
+    async def get_batch(self, size: int):
+        """
+        Up to size buffered messages at once, see get. Only the first one can require a resync.
+        """
+        item = await self.get()
+        if item is None:
+            return None
+        batch = [item]
+        while self.queue and len(batch) < size:
+            item = self._pop()
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def _pop(self):
+        key, message, timestamp = self.queue.popleft()
+        if key is not None and self.keys.get(key) is not None:
+            del self.keys[key]
+        if len(self.queue) < self.size:
+            self.writable.set()
+
+        self.lag = time.time() - timestamp if timestamp else 0.0
+        self.max_seen_lag = max(self.max_seen_lag, self.lag)
+        if self.policy == DROP and self.max_lag and self.lag > self.max_lag:
+            self.dropped += 1
+            self._drop(f"lag above {self.max_lag}s, resyncing")
+            return None
+
+        resync, self.resync_pending = self.resync_pending, False
+        return message, timestamp, resync
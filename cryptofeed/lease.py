@@ -0,0 +1,198 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Expiring leases stored in Redis, used to coordinate several hosts: each shard (group of
+exchange pairs) and each singleton poller is owned by the node holding its lease. A node
+renews its leases while it is alive, when it dies they expire and other nodes take over.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import redis
+from redis import asyncio as aioredis
+
+LOG = logging.getLogger("feedhandler")
+
+# only extend / delete the lease if it is still held by this node
+RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class LeaseRegistry:
+    """
+    Blocking lease registry, used by the supervisor process to claim shards
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://127.0.0.1:6379",
+        namespace: str = "cryptofeed",
+        ttl: float = 30,
+        node_id: str = None,
+    ):
+        """
+        url: str
+            url of the redis instance shared by all nodes
+        namespace: str
+            prefix of all keys, lets several clusters share a redis instance
+        ttl: float
+            seconds after which a lease that is not renewed expires
+        node_id: str
+            unique id of this node, defaults to hostname-pid-random
+        """
+        self.url = url
+        self.namespace = namespace
+        self.ttl = ttl
+        self.node_id = node_id if node_id else default_node_id()
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self._renew = self.redis.register_script(RENEW_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+
+    def key(self, name: str) -> str:
+        return f"{self.namespace}:{name}"
+
+    def acquire(self, name: str) -> bool:
+        return bool(
+            self.redis.set(
+                self.key(name), self.node_id, nx=True, px=int(self.ttl * 1000)
+            )
+        )
+
+    def renew(self, name: str) -> bool:
+        """
+        Returns False if the lease was lost (it expired and possibly was claimed by another node)
+        """
+        return bool(
+            self._renew(
+                keys=[self.key(name)], args=[self.node_id, int(self.ttl * 1000)]
+            )
+        )
+
+    def release(self, name: str):
+        self._release(keys=[self.key(name)], args=[self.node_id])
+
+    def owner(self, name: str) -> Optional[str]:
+        return self.redis.get(self.key(name))
+
+    def owners(self, names: List[str]) -> Dict[str, Optional[str]]:
+        if not names:
+            return {}
+        return dict(zip(names, self.redis.mget([self.key(n) for n in names])))
+
+    def heartbeat(self):
+        """
+        Register this node as alive, for ttl seconds
+        """
+        self.redis.set(
+            self.key(f"node:{self.node_id}"), self.node_id, px=int(self.ttl * 1000)
+        )
+
+    def nodes(self) -> List[str]:
+        prefix = self.key("node:")
+        return sorted(
+            key[len(prefix) :] for key in self.redis.scan_iter(match=f"{prefix}*")
+        )
+
+    def close(self):
+        self.redis.delete(self.key(f"node:{self.node_id}"))
+        self.redis.close()
+
+
+class SingletonLease:
+    """
+    Runs a coroutine on exactly one node of the cluster at a time. Every node runs
+    SingletonLease.run for the same name, the node holding the lease runs the coroutine and the
+    others wait to take over if it goes away.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://127.0.0.1:6379",
+        namespace: str = "cryptofeed",
+        ttl: float = 30,
+        node_id: str = None,
+        **kwargs,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.node_id = node_id if node_id else default_node_id()
+        self.redis = aioredis.Redis.from_url(url, decode_responses=True)
+
+    async def run(self, name: str, coro_factory: Callable):
+        """
+        name: str
+            name of the lease, unique in the cluster
+        coro_factory: callable
+            called without arguments to create the coroutine to run while holding the lease
+        """
+        key = f"{self.namespace}:singleton:{name}"
+        ttl_ms = int(self.ttl * 1000)
+        renew = self.redis.register_script(RENEW_SCRIPT)
+        release = self.redis.register_script(RELEASE_SCRIPT)
+        task = None
+        renewed = 0
+        try:
+            while True:
+                try:
+                    if task is None:
+                        if await self.redis.set(key, self.node_id, nx=True, px=ttl_ms):
+                            LOG.info("Lease: %s acquired %s", self.node_id, name)
+                            task = asyncio.create_task(coro_factory())
+                            renewed = time.monotonic()
+                    elif task.done():
+                        # the coroutine failed (or returned), let another node try
+                        if not task.cancelled() and task.exception():
+                            LOG.error(
+                                "Lease: %s failed", name, exc_info=task.exception()
+                            )
+                        task = None
+                        await release(keys=[key], args=[self.node_id])
+                    elif await renew(keys=[key], args=[self.node_id, ttl_ms]):
+                        renewed = time.monotonic()
+                    else:
+                        LOG.warning(
+                            "Lease: %s lost %s, stopping it", self.node_id, name
+                        )
+                        task.cancel()
+                        task = None
+                except redis.RedisError:
+                    LOG.warning(
+                        "Lease: unable to reach redis for %s", name, exc_info=True
+                    )
+                    # the lease may have been taken over by now
+                    if task is not None and time.monotonic() - renewed > self.ttl:
+                        task.cancel()
+                        task = None
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            if task is not None:
+                task.cancel()
+                try:
+                    await release(keys=[key], args=[self.node_id])
+                except Exception:
+                    pass
+            await self.redis.close()
@@ -0,0 +1,333 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Always on, low overhead metrics of a process (event loop lag, handler and write
+latencies, connection and backend queue statistics) exposed in the Prometheus text format
+by MetricsServer. Durations are recorded in HDR style histograms (a couple of list
+operations per observation), everything that already is counted somewhere (e.g. the
+messages of a connection) is read by collectors when the metrics are scraped.
+"""
+
+import asyncio
+import logging
+import math
+import weakref
+from collections import defaultdict
+from typing import Iterable
+
+LOG = logging.getLogger("feedhandler")
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# histogram buckets: every power of two from 2**MIN_EXP (~1us) to 2**MAX_EXP (128s)
+# seconds is split in SUB_BUCKETS linear buckets, so a bucket is at most 25% wide
+MIN_EXP = -20
+MAX_EXP = 7
+SUB_BUCKETS = 4
+
+
+def _bounds() -> list:
+    bounds = [2.0**MIN_EXP]
+    for exp in range(MIN_EXP, MAX_EXP):
+        for sub in range(1, SUB_BUCKETS + 1):
+            bounds.append(2.0**exp * (1 + sub / SUB_BUCKETS))
+    return bounds
+
+
+BOUNDS = _bounds()
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """
+    Log-linear histogram of durations in seconds (see BOUNDS), observations outside of the
+    range go to the first or last bucket
+    """
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value <= BOUNDS[0]:
+            index = 0
+        else:
+            mantissa, exp = math.frexp(value)
+            index = (exp - 1 - MIN_EXP) * SUB_BUCKETS + int(
+                (mantissa * 2 - 1) * SUB_BUCKETS
+            )
+            index = min(index + 1, len(BOUNDS))
+        self.counts[index] += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q quantile
+        """
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return BOUNDS[index] if index < len(BOUNDS) else math.inf
+        return 0.0
+
+
+_TYPES = {COUNTER: Counter, GAUGE: Gauge, HISTOGRAM: Histogram}
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    values = ",".join(
+        '{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for k, v in labels.items()
+    )
+    return "{" + values + "}"
+
+
+def _value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """
+    The metrics of a process. Metrics are created (or found) by name and labels, and
+    collectors are objects with a collect() method yielding (name, type, help, labels,
+    value) samples when the metrics are rendered. Collectors are weakly referenced, they
+    go away with their object.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.help = {}
+        self.collectors = weakref.WeakSet()
+
+    def _get(self, kind: str, name: str, help: str, labels: dict):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            self.help.setdefault(name, (kind, help))
+            metric = self.metrics[key] = _TYPES[kind]()
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(COUNTER, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", **labels) -> Gauge:
+        return self._get(GAUGE, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._get(HISTOGRAM, name, help, labels)
+
+    def register(self, collector):
+        self.collectors.add(collector)
+
+    def unregister(self, collector):
+        self.collectors.discard(collector)
+
+    def _samples(self) -> Iterable:
+        for (name, labels), metric in list(self.metrics.items()):
+            kind, help = self.help[name]
+            yield name, kind, help, dict(labels), metric
+        for collector in list(self.collectors):
+            try:
+                for name, kind, help, labels, value in collector.collect():
+                    yield name, kind, help, labels, value
+            except Exception:
+                LOG.warning("Metrics: collector %r failed", collector, exc_info=True)
+
+    def render(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format
+        """
+        families = defaultdict(list)
+        descriptions = {}
+        for name, kind, help, labels, value in self._samples():
+            descriptions.setdefault(name, (kind, help))
+            families[name].append((labels, value))
+
+        lines = []
+        for name, samples in families.items():
+            kind, help = descriptions[name]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind != HISTOGRAM:
+                    value = (
+                        value.value if isinstance(value, (Counter, Gauge)) else value
+                    )
+                    lines.append(f"{name}{_labels(labels)} {_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(BOUNDS + [math.inf], value.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{_labels({**labels, 'le': _value(bound)})} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_labels(labels)} {_value(value.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class LoopMonitor:
+    """
+    Measures the event loop lag: how late a callback scheduled every interval seconds runs
+    """
+
+    def __init__(self, interval: float = 0.1, registry: Registry = REGISTRY):
+        self.interval = interval
+        self.lag = registry.histogram(
+            "cryptofeed_event_loop_lag_seconds",
+            "Delay of the event loop in running a scheduled callback",
+        )
+        self.max_lag = registry.gauge(
+            "cryptofeed_event_loop_max_lag_seconds",
+            "Largest event loop lag since the previous scrape",
+        )
+        self.loop = None
+        self.handle = None
+        self.expected = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.expected = loop.time() + self.interval
+        self.handle = loop.call_at(self.expected, self._tick)
+
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def _tick(self):
+        now = self.loop.time()
+        lag = max(0.0, now - self.expected)
+        self.lag.observe(lag)
+        self.max_lag.set(max(self.max_lag.value, lag))
+        self.expected = now + self.interval
+        self.handle = self.loop.call_at(self.expected, self._tick)
+
+
+class MetricsServer:
+    """
+    Serves the metrics of the registry on http://host:port/metrics. The server is a
+    minimal HTTP/1.0 responder running on the event loop of the process.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        registry: Registry = REGISTRY,
+        monitor: LoopMonitor = None,
+    ):
+        """
+        monitor: LoopMonitor
+            the event loop monitor of the process, stopped with the server. Its maximum lag
+            is reset by every scrape.
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.monitor = monitor
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        LOG.info("Metrics: serving on http://%s:%d/metrics", self.host, self.port)
+
+    def stop(self):
+        if self.monitor is not None:
+            self.monitor.stop()
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (
+                b"\r\n",
+                b"\n",
+                b"",
+            ):
+                pass
+            parts = request.decode("latin-1").split()
+            if (
+                len(parts) >= 2
+                and parts[0] == "GET"
+                and parts[1].startswith("/metrics")
+            ):
+                body = self.registry.render()
+                if self.monitor is not None:
+                    self.monitor.max_lag.set(0.0)
+                status, content_type = "200 OK", "text/plain; version=0.0.4"
+            else:
+                body, status, content_type = (
+                    "not found\n",
+                    "404 Not Found",
+                    "text/plain",
+                )
+            body = body.encode()
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def start_metrics(
+    loop: asyncio.AbstractEventLoop,
+    host: str = "127.0.0.1",
+    port: int = 9100,
+    loop_interval: float = 0.1,
+    registry: Registry = REGISTRY,
+) -> MetricsServer:
+    """
+    Starts the event loop monitor and the metrics server of the process on loop
+    """
+    monitor = LoopMonitor(loop_interval, registry)
+    monitor.start(loop)
+    server = MetricsServer(host, port, registry, monitor)
+    loop.create_task(server.start())
+    return server
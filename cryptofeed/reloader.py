@@ -0,0 +1,200 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Applies the changes of a topology file (see cryptofeed.topology) to the running workers
+of an aggregator (see MarketDataAggregator in main.py).
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptofeed.coordinator import ShardCoordinator
+from cryptofeed.exchanges import EXCHANGE_MAP
+from cryptofeed.shards import (
+    ACK,
+    ADD_PAIRS,
+    REMOVE_PAIRS,
+    SET_CHANNELS,
+    ShardRebalancer,
+    message_ids,
+    update_worker_markets,
+)
+from cryptofeed.supervisor import WorkerSupervisor
+from cryptofeed.topology import Topology
+
+LOG = logging.getLogger("feedhandler")
+
+
+class TopologyReloader:
+    """
+    Runs in the supervisor: watches the topology file and applies changes to the running
+    workers. Added pairs go to the worker with the fewest pairs, removed pairs are
+    removed from the workers carrying them, and channel / backend changes are sent to
+    every worker. Workers whose pairs did not change are left untouched. The markets are
+    loaded (from the exchanges) in a thread, and applied on a later tick, so the supervisor
+    keeps handling heartbeats and leases meanwhile. Settings that
+    only take effect when the workers start (see cryptofeed.topology.RESTART_KEYS) are
+    reported but not applied.
+    """
+
+    def __init__(
+        self,
+        aggregator,
+        interval: float,
+        rebalancer: ShardRebalancer = None,
+        coordinator: ShardCoordinator = None,
+        default_channels: dict = None,
+    ):
+        """
+        aggregator: MarketDataAggregator
+            the aggregator of the workers, created from the topology file
+        interval: float
+            seconds between two checks of the topology file
+        rebalancer: ShardRebalancer
+            the pairs are not changed while it moves pairs
+        coordinator: ShardCoordinator
+            with several hosts, only the channels and feed config are reloaded
+        default_channels: dict
+            channels of a topology that has none
+        """
+        self.aggregator = aggregator
+        self.path = aggregator.topology_file
+        self.interval = interval
+        self.rebalancer = rebalancer
+        self.coordinator = coordinator
+        self.default_channels = default_channels if default_channels else {}
+        self.topology = Topology(self.path)
+        self.mtime = os.path.getmtime(self.path)
+        self.last_check = time.time()
+        self.pending = dict()
+        # Future of the markets of the last topology, see _apply
+        self.loading = None
+
+    def on_message(self, worker, msg: dict):
+        if msg.get("type") != ACK or msg["id"] not in self.pending:
+            return
+        command = self.pending.pop(msg["id"])
+        if not msg["ok"]:
+            LOG.error("Topology: worker %d did not apply %s", worker.id, command)
+
+    def _send(self, worker, msg_type: str, **kwargs):
+        msg_id = next(message_ids)
+        self.pending[msg_id] = msg_type
+        worker.send({"type": msg_type, "id": msg_id, **kwargs})
+
+    def on_tick(self, supervisor: WorkerSupervisor):
+        if self.loading is not None:
+            self._apply_loaded(supervisor)
+            return
+        now = time.time()
+        if now - self.last_check < self.interval:
+            return
+        self.last_check = now
+        if self.rebalancer is not None and self.rebalancer.move is not None:
+            # wait for the move to complete, both change the pairs of the workers
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self.mtime:
+                return
+            self.mtime = mtime
+            topology = Topology(self.path)
+        except Exception:
+            LOG.error("Topology: unable to load %s", self.path, exc_info=True)
+            return
+        LOG.info("Topology: %s changed, applying it", self.path)
+        restart = self.topology.restart_required(topology)
+        if restart:
+            LOG.warning("Topology: changes to %s require a restart", restart)
+        self._apply(supervisor, topology)
+        self.topology = topology
+
+    def _apply(self, supervisor: WorkerSupervisor, topology: Topology):
+        aggregator = self.aggregator
+        kwargs = topology.aggregator_kwargs()
+        aggregator.feed_config = kwargs["feed_config"]
+
+        if self.coordinator is not None:
+            LOG.warning(
+                "Topology: pairs are not reloaded on multiple hosts, the shard plan is shared"
+            )
+        else:
+            aggregator.exchanges = (
+                {exchange: EXCHANGE_MAP[exchange] for exchange in kwargs["exchanges"]}
+                if kwargs["exchanges"]
+                else EXCHANGE_MAP
+            )
+            aggregator.pairs = kwargs["pairs"]
+            aggregator.ref_currency = kwargs["ref_currency"]
+            aggregator.exchange_filters = kwargs["exchange_filters"]
+            # get_markets may fetch the instruments of every exchange
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="topology")
+            self.loading = executor.submit(aggregator.get_markets)
+            executor.shutdown(wait=False)
+
+        channels = kwargs["channels"] if kwargs["channels"] else self.default_channels
+        if channels != aggregator.channels:
+            aggregator.channels = channels
+            for worker in supervisor.workers:
+                if worker.is_alive:
+                    self._send(worker, SET_CHANNELS, channels=channels)
+
+    def _apply_loaded(self, supervisor: WorkerSupervisor):
+        if not self.loading.done():
+            return
+        if self.rebalancer is not None and self.rebalancer.move is not None:
+            return
+        loading, self.loading = self.loading, None
+        try:
+            markets = loading.result()
+        except Exception:
+            LOG.error("Topology: unable to load the markets", exc_info=True)
+            return
+        self._apply_markets(supervisor, markets)
+
+    def _apply_markets(self, supervisor: WorkerSupervisor, markets: dict):
+        self.aggregator.markets = markets
+        wanted = {(e, p) for e, pairs in markets.items() for p in pairs}
+        running = {
+            (e, p): worker
+            for worker in supervisor.workers
+            for e, pairs in worker.args[0].items()
+            for p in pairs
+        }
+
+        removed = defaultdict(lambda: defaultdict(list))
+        for (exchange, pair), worker in running.items():
+            if (exchange, pair) not in wanted:
+                removed[worker][exchange].append(pair)
+        for worker, worker_markets in removed.items():
+            LOG.info(
+                "Topology: removing %s from worker %d", dict(worker_markets), worker.id
+            )
+            update_worker_markets(worker, worker_markets, add=False)
+            self._send(worker, REMOVE_PAIRS, markets=dict(worker_markets))
+
+        added = sorted(wanted - set(running))
+        if not added or not supervisor.workers:
+            return
+        counts = {
+            worker: sum(len(pairs) for pairs in worker.args[0].values())
+            for worker in supervisor.workers
+        }
+        assigned = defaultdict(lambda: defaultdict(list))
+        for exchange, pair in added:
+            worker = min(counts, key=lambda w: (counts[w], w.id))
+            assigned[worker][exchange].append(pair)
+            counts[worker] += 1
+        for worker, worker_markets in assigned.items():
+            LOG.info(
+                "Topology: adding %s to worker %d", dict(worker_markets), worker.id
+            )
+            update_worker_markets(worker, worker_markets, add=True)
+            self._send(worker, ADD_PAIRS, markets=dict(worker_markets))
@@ -0,0 +1,423 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+The worker side of a sharded aggregator (see MarketDataAggregator in main.py): a
+ShardWorker runs the feeds of a shard (a group of exchange pairs) in a worker process,
+and adds or removes pairs while running on commands of the supervisor. The commands are
+sent by the ShardRebalancer, which moves pairs away from overloaded workers, and by the
+TopologyReloader (see cryptofeed.reloader).
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import defaultdict
+
+from cryptofeed.feedhandler import FeedHandler
+from cryptofeed.supervisor import WorkerSupervisor, heartbeat
+from cryptofeed.topology import backend_spec
+from cryptofeed.util.rates import RateProfile, RateRecorder
+
+LOG = logging.getLogger("feedhandler")
+
+# commands sent by the supervisor to the workers, acknowledged with ACK
+ADD_PAIRS = "add_pairs"
+REMOVE_PAIRS = "remove_pairs"
+SET_CHANNELS = "set_channels"
+ACK = "ack"
+
+# ids of the commands sent to the workers, shared by everything sending commands
+message_ids = itertools.count()
+
+
+def update_worker_markets(worker, markets: dict, add: bool):
+    """
+    Record pairs added to / removed from a worker in its arguments, so it is restarted
+    with them
+    """
+    current = {exchange: list(pairs) for exchange, pairs in worker.args[0].items()}
+    for exchange, pairs in markets.items():
+        if add:
+            current.setdefault(exchange, list()).extend(pairs)
+        else:
+            current[exchange] = [p for p in current.get(exchange, []) if p not in pairs]
+            if not current[exchange]:
+                del current[exchange]
+    worker.args = (current, *worker.args[1:])
+
+
+class ShardWorker:
+    """
+    Runs in a worker process: owns the FeedHandler and the feeds of the shard, and
+    adds or removes pairs while running when told to by the supervisor.
+    """
+
+    def __init__(
+        self,
+        aggregator,
+        markets: dict,
+        worker_id: int,
+        ready_timeout: float = 30,
+    ):
+        """
+        aggregator: MarketDataAggregator
+            creates the feeds and the backend callbacks of the worker
+        markets: dict
+            exchange -> pairs of the shard
+        worker_id: int
+            index of the worker, numbers its metrics endpoint and rate profile
+        ready_timeout: float
+            seconds added pairs are given to have their first update, see add_markets
+        """
+        self.aggregator = aggregator
+        self.ready_timeout = ready_timeout
+        self.feedhandler = FeedHandler(metrics=aggregator.metrics_config(worker_id))
+        self.callbacks = aggregator.get_callbacks()
+        self.lock = asyncio.Lock()
+        self.recorder = (
+            RateRecorder(os.path.join(aggregator.rate_profile, f"{worker_id}.json"))
+            if aggregator.rate_profile
+            else None
+        )
+        for feed in aggregator.create_feeds(markets, self.callbacks):
+            self._add_feed(feed)
+
+    def _add_feed(self, feed):
+        if self.recorder:
+            self.recorder.instrument(feed)
+        self.feedhandler.add_feed(feed)
+
+    async def _remove_feed(self, feed):
+        if self.recorder:
+            self.recorder.forget(feed)
+        await self.feedhandler.remove_feed(feed)
+
+    async def _wait_ready(self, added: list) -> bool:
+        """
+        Wait until the pairs added to the feeds had their first update (their book snapshot,
+        see Feed.wait_updates), the connections receiving data is not enough
+
+        added: list of (feed, pairs)
+        """
+        deadline = time.time() + self.ready_timeout
+        for feed, pairs in added:
+            timeout = deadline - time.time()
+            if timeout <= 0 or not await feed.wait_updates(pairs, timeout):
+                return False
+        return True
+
+    async def _start_feeds(self, markets: dict) -> bool:
+        feeds = self.aggregator.create_feeds(markets, self.callbacks)
+        for feed in feeds:
+            for channel, pairs in feed._feed_config.items():
+                feed.expect_updates(channel, pairs)
+            self._add_feed(feed)
+        return await self._wait_ready(
+            [(feed, list(feed.normalized_symbols)) for feed in feeds]
+        )
+
+    def _incremental_feed(self, exchange: str):
+        """
+        A running feed of the exchange that pairs can be added to, see Feed.add_symbols
+        """
+        if not self.aggregator.pack_pairs:
+            return None
+        for feed in self.feedhandler.feeds:
+            if feed.id == exchange and feed.incremental_subscriptions:
+                return feed
+        return None
+
+    async def add_markets(self, markets: dict) -> bool:
+        """
+        Pairs are subscribed on the running feed of their exchange when the exchange
+        supports it, without interrupting the other pairs. Otherwise new feeds are started.
+        """
+        added, new_markets = [], {}
+        for exchange, pairs in markets.items():
+            feed = self._incremental_feed(exchange)
+            if feed is None:
+                new_markets[exchange] = pairs
+                continue
+            for channel in list(feed._feed_config):
+                await feed.add_symbols(channel, pairs)
+            added.append((feed, pairs))
+        # the running connections of the feed received data long ago, the pairs are ready
+        # once they had their own updates
+        ready = await self._wait_ready(added)
+        if new_markets:
+            ready &= await self._start_feeds(new_markets)
+        return ready
+
+    async def remove_markets(self, markets: dict) -> bool:
+        """
+        Pairs are unsubscribed on their running feed when the exchange supports it. Otherwise
+        feeds carrying removed pairs are replaced by feeds carrying the remaining pairs,
+        which are started before the old feeds are stopped.
+        """
+        ready = True
+        for exchange, pairs in markets.items():
+            removed = set(pairs)
+            for feed in [
+                feed
+                for feed in self.feedhandler.feeds
+                if feed.id == exchange and removed & set(feed.normalized_symbols)
+            ]:
+                if feed.incremental_subscriptions:
+                    for channel in list(feed._feed_config):
+                        await feed.remove_symbols(channel, pairs)
+                    if not feed.normalized_symbols:
+                        await self._remove_feed(feed)
+                    continue
+                remaining = [p for p in feed.normalized_symbols if p not in removed]
+                if remaining:
+                    ready &= await self._start_feeds({exchange: remaining})
+                await self._remove_feed(feed)
+        return ready
+
+    async def set_channels(self, channels: dict) -> bool:
+        """
+        Switch to a new channel -> backend configuration. Backends whose configuration did not
+        change are kept, and every feed is replaced by a feed subscribed to the new channels,
+        started before the old one is stopped.
+        """
+        previous, previous_callbacks = self.aggregator.channels, self.callbacks
+        self.aggregator.channels = channels
+        self.callbacks = {
+            channel: (
+                previous_callbacks[channel]
+                if channel in previous
+                and backend_spec(previous[channel]) == backend_spec(spec)
+                else self.aggregator.build_callback(spec)
+            )
+            for channel, spec in channels.items()
+        }
+        ready = True
+        for feed in list(self.feedhandler.feeds):
+            ready &= await self._start_feeds({feed.id: list(feed.normalized_symbols)})
+            await self._remove_feed(feed)
+
+        kept = {id(cb) for cb in self.callbacks.values()}
+        for callback in previous_callbacks.values():
+            if id(callback) not in kept and hasattr(callback, "stop"):
+                await callback.stop()
+        return ready
+
+    async def _handle(self, conn, msg: dict):
+        # commands swap feeds, apply them one at a time
+        async with self.lock:
+            if msg["type"] == ADD_PAIRS:
+                ok = await self.add_markets(msg["markets"])
+            elif msg["type"] == REMOVE_PAIRS:
+                ok = await self.remove_markets(msg["markets"])
+            elif msg["type"] == SET_CHANNELS:
+                ok = await self.set_channels(msg["channels"])
+            else:
+                return
+        conn.send({"type": ACK, "id": msg["id"], "ok": ok})
+
+    def _on_readable(self, conn):
+        loop = asyncio.get_event_loop()
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            # supervisor is gone, heartbeat will shut the worker down
+            loop.remove_reader(conn.fileno())
+            return
+        loop.create_task(self._handle(conn, msg))
+
+    def run(self, conn=None):
+        """
+        conn: multiprocessing Connection
+            pipe to the supervisor, used for heartbeats and to receive commands
+        """
+        if conn:
+            loop = asyncio.get_event_loop()
+            loop.create_task(heartbeat(conn, self.feedhandler))
+            loop.add_reader(conn.fileno(), self._on_readable, conn)
+        self.feedhandler.run()
+
+
+class ShardRebalancer:
+    """
+    Runs in the supervisor: moves pairs from a worker whose event loop lags or whose
+    backend queues grow to the least loaded worker. The pairs are first added to the
+    destination, and only removed from the source once the destination receives data
+    for them (make before break), so no updates are lost during the move.
+    """
+
+    def __init__(
+        self,
+        aggregator,
+        max_loop_lag: float = 0.5,
+        max_backend_queue: int = 10000,
+        patience: int = 3,
+        cooldown: float = 300,
+        timeout: float = 120,
+    ):
+        """
+        aggregator: MarketDataAggregator
+            its rate profile weighs the pairs to move
+        max_loop_lag: float
+            a worker whose event loop wakes up later than this (in seconds) is overloaded
+        max_backend_queue: int
+            a worker with more updates waiting in its backend queues is overloaded
+        patience: int
+            number of consecutive overloaded heartbeats before pairs are moved
+        cooldown: float
+            minimum number of seconds between two moves
+        timeout: float
+            seconds to wait for a worker to acknowledge adding or removing pairs
+        """
+        self.aggregator = aggregator
+        self.max_loop_lag = max_loop_lag
+        self.max_backend_queue = max_backend_queue
+        self.patience = patience
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.strikes = defaultdict(int)
+        self.last_heartbeat = dict()
+        self.last_move = 0
+        self.move = None
+
+    def is_overloaded(self, status: dict) -> bool:
+        return (
+            status.get("loop_lag", 0) > self.max_loop_lag
+            or status.get("backend_queue", 0) > self.max_backend_queue
+        )
+
+    def _update_strikes(self, supervisor: WorkerSupervisor):
+        for worker in supervisor.workers:
+            heartbeat_time = worker.status.get("time")
+            if not worker.is_alive or heartbeat_time is None:
+                self.strikes[worker.id] = 0
+                continue
+            if self.last_heartbeat.get(worker.id) == heartbeat_time:
+                continue
+            self.last_heartbeat[worker.id] = heartbeat_time
+            if self.is_overloaded(worker.status):
+                self.strikes[worker.id] += 1
+            else:
+                self.strikes[worker.id] = 0
+
+    def _pairs_to_move(self, source, destination) -> dict:
+        source_pairs = [
+            (exchange, pair)
+            for exchange, pairs in source.args[0].items()
+            for pair in pairs
+        ]
+        destination_pairs = [
+            (exchange, pair)
+            for exchange, pairs in destination.args[0].items()
+            for pair in pairs
+        ]
+        if len(source_pairs) < 2:
+            return {}
+        profile = RateProfile.load(self.aggregator.rate_profile)
+        weights = profile.pair_weights(source_pairs)
+        target = (sum(weights) - sum(profile.pair_weights(destination_pairs))) / 2
+
+        moving = dict()
+        moved = 0.0
+        count = 0
+        for weight, (exchange, pair) in sorted(
+            zip(weights, source_pairs), key=lambda x: x[0], reverse=True
+        ):
+            if count == len(source_pairs) - 1:
+                break
+            if count and moved + weight > target:
+                continue
+            moving.setdefault(exchange, list()).append(pair)
+            moved += weight
+            count += 1
+        return moving
+
+    def _send(self, worker, msg_type: str, markets: dict) -> bool:
+        self.move["id"] = next(message_ids)
+        self.move["stage"] = msg_type
+        self.move["sent"] = time.time()
+        return worker.send(
+            {"type": msg_type, "id": self.move["id"], "markets": markets}
+        )
+
+    def _abort(self, reason: str):
+        LOG.error("Rebalancer: move %s aborted - %s", self.move["markets"], reason)
+        if self.move["stage"] == ADD_PAIRS:
+            # roll back, the source still carries the pairs
+            self.move["destination"].send(
+                {
+                    "type": REMOVE_PAIRS,
+                    "id": next(message_ids),
+                    "markets": self.move["markets"],
+                }
+            )
+        self.move = None
+
+    def on_message(self, worker, msg: dict):
+        if msg.get("type") != ACK or self.move is None or msg["id"] != self.move["id"]:
+            return
+        source, destination = self.move["source"], self.move["destination"]
+        if not msg["ok"]:
+            self._abort(f"worker {worker.id} did not acknowledge {self.move['stage']}")
+        elif self.move["stage"] == ADD_PAIRS:
+            update_worker_markets(destination, self.move["markets"], add=True)
+            update_worker_markets(source, self.move["markets"], add=False)
+            self._send(source, REMOVE_PAIRS, self.move["markets"])
+        else:
+            LOG.info(
+                "Rebalancer: moved %s from worker %d to worker %d",
+                self.move["markets"],
+                source.id,
+                destination.id,
+            )
+            self.move = None
+
+    def on_tick(self, supervisor: WorkerSupervisor):
+        self._update_strikes(supervisor)
+        now = time.time()
+        if self.move is not None:
+            if now - self.move["sent"] > self.timeout:
+                self._abort(f"no acknowledgement within {self.timeout} seconds")
+            return
+        if now - self.last_move < self.cooldown:
+            return
+
+        overloaded = [
+            w for w in supervisor.workers if self.strikes[w.id] >= self.patience
+        ]
+        candidates = [
+            w
+            for w in supervisor.workers
+            if w.is_alive and w.status and not self.is_overloaded(w.status)
+        ]
+        if not overloaded or not candidates:
+            return
+        source = max(overloaded, key=lambda w: w.status.get("loop_lag", 0))
+        destination = min(
+            candidates,
+            key=lambda w: (
+                w.status.get("loop_lag", 0),
+                w.status.get("backend_queue", 0),
+            ),
+        )
+        markets = self._pairs_to_move(source, destination)
+        if not markets:
+            return
+
+        LOG.warning(
+            "Rebalancer: worker %d is overloaded (%s), moving %s to worker %d",
+            source.id,
+            source.status,
+            markets,
+            destination.id,
+        )
+        self.last_move = now
+        self.strikes[source.id] = 0
+        self.move = {"source": source, "destination": destination, "markets": markets}
+        if not self._send(destination, ADD_PAIRS, markets):
+            self.move = None
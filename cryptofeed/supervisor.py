@@ -0,0 +1,350 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+
+import asyncio
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+from multiprocessing.connection import wait
+from typing import Callable, List
+
+from cryptofeed.symbols import Symbols
+
+LOG = logging.getLogger("feedhandler")
+
+HEARTBEAT = "heartbeat"
+
+
+async def heartbeat(conn, feedhandler, interval: float = 5):
+    """
+    Run in a worker's event loop. Periodically sends the worker status to the supervisor,
+    including the event loop lag (how late the loop wakes up after sleeping) and the number
+    of updates waiting to be written by the backends, in process or in their writer
+    processes (see BackendQueue.queue_depth).
+
+    If the supervisor went away the worker exits, which lets FeedHandler.run shut the
+    feeds and backends down cleanly.
+    """
+    lag = 0.0
+    while True:
+        connections = [
+            c for feed in feedhandler.feeds for c in feed.connection_handlers
+        ]
+        backends = {
+            id(cb): cb
+            for feed in feedhandler.feeds
+            for cbs in feed.callbacks.values()
+            for cb in cbs
+            if hasattr(cb, "queue_depth")
+        }
+        status = {
+            "type": HEARTBEAT,
+            "time": time.time(),
+            "loop_lag": lag,
+            "feeds": len(feedhandler.feeds),
+            "connections": len(connections),
+            "open_connections": sum(1 for c in connections if c.conn.is_open),
+            "backend_queue": sum(cb.queue_depth() for cb in backends.values()),
+        }
+        try:
+            conn.send(status)
+        except (BrokenPipeError, EOFError, OSError):
+            LOG.warning("Worker: supervisor is gone - shutting down")
+            raise SystemExit
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = time.monotonic() - start - interval
+
+
+def _run_worker(target: Callable, args: tuple):
+    # undo the supervisor's signal handlers inherited through fork, the worker
+    # handles (or dies from) the stop signals itself
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)
+    target(*args)
+
+
+class Worker:
+    def __init__(self, worker_id: int, target: Callable, args: tuple, context=None):
+        self.id = worker_id
+        self.target = target
+        self.args = args
+        self.context = context if context else multiprocessing.get_context()
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self.started_at = None
+        self.last_heartbeat = None
+        self.next_start = 0
+        self.status = {}
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.conn = parent_conn
+        self.process = self.context.Process(
+            target=_run_worker,
+            args=(self.target, (*self.args, child_conn)),
+            name=f"worker-{self.id}",
+        )
+        self.process.start()
+        # the child owns its end of the pipe, closing ours lets recv raise EOFError when it dies
+        child_conn.close()
+        self.started_at = time.time()
+        self.last_heartbeat = self.started_at
+        LOG.info("Supervisor: started worker %d (pid %d)", self.id, self.process.pid)
+
+    def send(self, msg: dict) -> bool:
+        """
+        Send a message to the worker, returns False if the worker is not running
+        """
+        if self.process is None:
+            return False
+        try:
+            self.conn.send(msg)
+        except (BrokenPipeError, OSError):
+            return False
+        return True
+
+    def stop(self):
+        """
+        Send SIGTERM, the worker's FeedHandler flushes the backends before exiting
+        """
+        if self.is_alive:
+            self.process.terminate()
+
+    def join(self, timeout: float):
+        if self.process is None:
+            return
+        self.process.join(timeout)
+        if self.process.is_alive():
+            LOG.warning(
+                "Supervisor: worker %d did not stop within %.1f seconds - killing it",
+                self.id,
+                timeout,
+            )
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerSupervisor:
+    def __init__(
+        self,
+        heartbeat_timeout: float = 30,
+        backoff: float = 1,
+        max_backoff: float = 60,
+        stable_after: float = 60,
+        shutdown_timeout: float = 30,
+        status_interval: float = 60,
+        on_message: Callable = None,
+        on_tick: Callable = None,
+        start_method: str = None,
+        preload: list = None,
+        gc_freeze: bool = False,
+    ):
+        """
+        heartbeat_timeout: float
+            seconds without a heartbeat after which a worker is considered hung and restarted
+        backoff: float
+            delay before the first restart of a worker, doubled on each consecutive restart
+        max_backoff: float
+            maximum delay between restarts
+        stable_after: float
+            a worker running longer than this has its restart delay reset
+        shutdown_timeout: float
+            seconds a worker is given to flush its backends on shutdown before being killed
+        status_interval: float
+            seconds between logging the status of all workers
+        on_message: callable
+            invoked as on_message(worker, msg) for every message from a worker that
+            is not a heartbeat
+        on_tick: callable
+            invoked as on_tick(supervisor) on every iteration (about once a second)
+        start_method: str
+            multiprocessing start method of the workers, defaults to the platform's default.
+            With "forkserver" the workers are forked from a template process that has imported
+            the exchange modules and holds the symbols loaded in this process (see
+            cryptofeed.template), rather than from the supervisor itself.
+        preload: list
+            additional modules imported by the template process ("forkserver" only)
+        gc_freeze: bool
+            freeze the objects allocated before the workers are forked (gc.freeze), so
+            garbage collections in the workers do not un-share their memory pages
+        """
+        self.workers: List[Worker] = []
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.shutdown_timeout = shutdown_timeout
+        self.status_interval = status_interval
+        self.on_message = on_message
+        self.on_tick = on_tick
+        self.context = multiprocessing.get_context(start_method)
+        self.preload = preload if preload else []
+        self.gc_freeze = gc_freeze
+        self.snapshot_dir = None
+        self.running = False
+        self._ids = itertools.count()
+
+    def add_worker(self, target: Callable, args: tuple = ()) -> Worker:
+        """
+        target: callable
+            run in the child process as target(*args, conn), where conn is the pipe to send
+            heartbeats on (see heartbeat)
+        """
+        worker = Worker(next(self._ids), target, args, context=self.context)
+        self.workers.append(worker)
+        if self.running:
+            worker.start()
+        return worker
+
+    def remove_worker(self, worker: Worker):
+        """
+        Stop a worker (gracefully, like on shutdown) and stop supervising it
+        """
+        self.workers.remove(worker)
+        worker.stop()
+        worker.join(self.shutdown_timeout)
+        LOG.info("Supervisor: removed worker %d", worker.id)
+
+    def status(self) -> List[dict]:
+        now = time.time()
+        return [
+            {
+                "worker": w.id,
+                "pid": w.process.pid if w.process else None,
+                "alive": w.is_alive,
+                "restarts": w.restarts,
+                "uptime": now - w.started_at if w.is_alive else 0,
+                "last_heartbeat": now - w.last_heartbeat if w.last_heartbeat else None,
+                **{k: v for k, v in w.status.items() if k != "type"},
+            }
+            for w in self.workers
+        ]
+
+    def _handle_stop_signals(self, *args):
+        self.running = False
+
+    def _schedule_restart(self, worker: Worker, reason: str):
+        if time.time() - worker.started_at > self.stable_after:
+            worker.restarts = 0
+        delay = min(self.max_backoff, self.backoff * 2**worker.restarts)
+        worker.restarts += 1
+        worker.next_start = time.time() + delay
+        worker.conn.close()
+        worker.process = None
+        LOG.error(
+            "Supervisor: worker %d %s - restarting in %.1f seconds",
+            worker.id,
+            reason,
+            delay,
+        )
+
+    def _prepare_template(self):
+        if self.context.get_start_method() == "forkserver":
+            from cryptofeed import template
+
+            # the template process is started along with the first worker and inherits this
+            # environment, so it can load the symbols from the snapshot
+            self.snapshot_dir = tempfile.mkdtemp(prefix="cryptofeed-symbols-")
+            try:
+                Symbols.save_snapshot(self.snapshot_dir)
+            except Exception:
+                shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+                self.snapshot_dir = None
+                raise
+            os.environ[template.SNAPSHOT_ENV] = self.snapshot_dir
+            if self.gc_freeze:
+                os.environ[template.GC_FREEZE_ENV] = "1"
+            self.context.set_forkserver_preload(
+                ["__main__", *self.preload, "cryptofeed.template"]
+            )
+        elif self.gc_freeze and self.context.get_start_method() == "fork":
+            gc.collect()
+            gc.freeze()
+
+    def _poll(self, timeout: float):
+        ready = wait(
+            [w.conn for w in self.workers if w.process is not None]
+            + [w.process.sentinel for w in self.workers if w.process is not None],
+            timeout=timeout,
+        )
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            if worker.conn in ready:
+                try:
+                    while worker.conn.poll():
+                        msg = worker.conn.recv()
+                        if msg.get("type") == HEARTBEAT:
+                            worker.status = msg
+                            worker.last_heartbeat = time.time()
+                        elif self.on_message:
+                            self.on_message(worker, msg)
+                except (EOFError, OSError):
+                    pass
+            if worker.process.sentinel in ready or not worker.process.is_alive():
+                worker.process.join()
+                self._schedule_restart(
+                    worker, f"exited with code {worker.process.exitcode}"
+                )
+            elif time.time() - worker.last_heartbeat > self.heartbeat_timeout:
+                worker.process.kill()
+                worker.process.join()
+                self._schedule_restart(worker, "stopped sending heartbeats")
+
+    def run(self):
+        """
+        Start the workers and supervise them until SIGINT/SIGTERM is received, then
+        shut them down gracefully.
+        """
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_stop_signals)
+
+        self._prepare_template()
+        self.running = True
+        for worker in self.workers:
+            worker.start()
+
+        last_status = time.time()
+        while self.running:
+            self._poll(timeout=1)
+            now = time.time()
+            for worker in self.workers:
+                if worker.process is None and now >= worker.next_start:
+                    worker.start()
+            if self.on_tick:
+                self.on_tick(self)
+            if now - last_status >= self.status_interval:
+                for status in self.status():
+                    LOG.info("Supervisor: %s", status)
+                last_status = now
+
+        self.shutdown()
+
+    def shutdown(self):
+        LOG.info("Supervisor: shutting down %d workers", len(self.workers))
+        self.running = False
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(self.shutdown_timeout)
+        if self.snapshot_dir:
+            shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+            self.snapshot_dir = None
+        LOG.info("Supervisor: all workers stopped")
@@ -5,11 +5,24 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 """
 
+import asyncio
+import glob
+import logging
+import os
+import time
+from collections.abc import Mapping
 from datetime import datetime as dt, timezone
-from typing import Dict, Tuple, Union
+from decimal import Decimal
+from typing import Dict, Optional, Tuple, Union
+
+from yapic import json
 
 from cryptofeed.defines import FUTURES, FX, OPTION, PERPETUAL, SPOT, CALL, PUT, CURRENCY
 
+LOG = logging.getLogger("feedhandler")
+
+SYMBOL_CACHE_VERSION = 1
+
 
 class Symbol:
     symbol_sep = "-"
@@ -112,23 +125,185 @@ class Symbol:
         raise ValueError(f"Unsupported symbol type: {self.type}")
 
 
+def _json_default(obj):
+    # the symbol info of most exchanges is a defaultdict, which yapic does not encode
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"{obj!r} is not JSON serializable")
+
+
 class _Symbols:
     def __init__(self):
         self.data = {}
+        self.cache_dir = None
+        self.cache_ttl = None
+        self.refresh_interval = None
 
     def clear(self):
         self.data = {}
 
+    def enable_cache(
+        self, directory: str, ttl: float = 86400, refresh_interval: float = None
+    ):
+        """
+        directory: str
+            directory where the symbol mapping and info of each exchange is cached
+        ttl: float
+            seconds a cached entry is used for before it is fetched again from the exchange. Stale
+            entries are still used if the exchange cannot be reached.
+        refresh_interval: float
+            if set, a running FeedHandler refreshes the symbols of its exchanges in the
+            background at this interval (in seconds)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.cache_dir = directory
+        self.cache_ttl = ttl
+        self.refresh_interval = refresh_interval
+
+    def _cache_file(self, exchange: str) -> str:
+        return os.path.join(self.cache_dir, f"{exchange}.json")
+
+    def load_cache(
+        self, exchange: str, max_age: float = None
+    ) -> Optional[Tuple[Dict, Dict, float]]:
+        """
+        Returns the cached (normalized, info, timestamp) of the exchange, or None if caching is
+        disabled, there is no valid cache entry, or it is older than max_age seconds
+        """
+        if not self.cache_dir:
+            return None
+        data = self._read_entry(self._cache_file(exchange))
+        if data is None:
+            return None
+        timestamp = float(data["timestamp"])
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None
+        return data["normalized"], data["info"], timestamp
+
+    def save_cache(self, exchange: str):
+        """
+        Write the symbols of the exchange to the cache. Failures are logged, the symbols
+        are still used from memory.
+        """
+        if not self.cache_dir:
+            return
+        try:
+            self._write_entry(self._cache_file(exchange), exchange)
+        except Exception as e:
+            LOG.warning("%s: unable to write the symbol cache: %s", exchange, str(e))
+
+    def _read_entry(self, filename: str) -> Optional[dict]:
+        try:
+            with open(filename) as fp:
+                data = json.loads(fp.read(), parse_float=Decimal)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SYMBOL_CACHE_VERSION:
+            return None
+        return data
+
+    def _write_entry(self, filename: str, exchange: str):
+        data = {
+            "version": SYMBOL_CACHE_VERSION,
+            "exchange": exchange,
+            "timestamp": self.data[exchange]["timestamp"],
+            "normalized": self.data[exchange]["normalized"],
+            "info": self.data[exchange]["info"],
+        }
+        # write then rename, so concurrent readers never see a partial file
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as fp:
+                fp.write(json.dumps(data, default=_json_default))
+            os.replace(tmp, filename)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def save_snapshot(self, directory: str):
+        """
+        Write the symbols of every loaded exchange to directory, in the symbol cache format
+        """
+        os.makedirs(directory, exist_ok=True)
+        for exchange in self.data:
+            self._write_entry(os.path.join(directory, f"{exchange}.json"), exchange)
+
+    def load_snapshot(self, directory: str):
+        """
+        Load the symbols of every exchange found in directory (written by save_snapshot or
+        by the symbol cache), regardless of their age
+        """
+        for filename in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            data = self._read_entry(filename)
+            if data is not None:
+                self.set(
+                    data["exchange"],
+                    data["normalized"],
+                    data["info"],
+                    timestamp=float(data["timestamp"]),
+                )
+
     def load_all(self):
         from cryptofeed.exchanges import EXCHANGE_MAP
 
         for _, exchange in EXCHANGE_MAP.items():
             exchange.symbols(refresh=True)
 
-    def set(self, exchange: str, normalized: dict, exchange_info: dict):
+    async def load_all_async(
+        self, exchanges: dict = None, configs: dict = None, refresh=False
+    ) -> Dict[str, Exception]:
+        """
+        Load the symbols of many exchanges concurrently, sharing a single HTTP session.
+        Requests to the same exchange are still made one at a time, spaced according to the
+        exchange's request_limit.
+
+        exchanges: dict
+            exchange id -> exchange class, defaults to all supported exchanges
+        configs: dict
+            exchange id -> config, for exchanges that need credentials to query their symbols
+
+        Returns the exchanges whose symbols could not be loaded, with the error raised.
+        """
+        from cryptofeed.connection import HTTPAsyncConn
+        from cryptofeed.exchanges import EXCHANGE_MAP
+
+        exchanges = exchanges if exchanges is not None else EXCHANGE_MAP
+        configs = configs if configs else {}
+        conn = HTTPAsyncConn("symbols")
+        try:
+            results = await asyncio.gather(
+                *[
+                    exchange.symbol_mapping_async(
+                        conn, refresh=refresh, config=configs.get(exchange_id)
+                    )
+                    for exchange_id, exchange in exchanges.items()
+                ],
+                return_exceptions=True,
+            )
+        finally:
+            await conn.close()
+
+        errors = {}
+        for exchange_id, result in zip(exchanges, results):
+            if isinstance(result, Exception):
+                LOG.error("%s: unable to load symbols: %s", exchange_id, str(result))
+                errors[exchange_id] = result
+        return errors
+
+    def set(
+        self,
+        exchange: str,
+        normalized: dict,
+        exchange_info: dict,
+        timestamp: float = None,
+    ):
         self.data[exchange] = {}
         self.data[exchange]["normalized"] = normalized
         self.data[exchange]["info"] = exchange_info
+        self.data[exchange]["timestamp"] = timestamp if timestamp else time.time()
 
     def get(self, exchange: str) -> Tuple[Dict, Dict]:
         return self.data[exchange]["normalized"], self.data[exchange]["info"]
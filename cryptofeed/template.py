@@ -0,0 +1,31 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Preloaded by the template (forkserver) process that workers are forked from when the
+WorkerSupervisor uses the "forkserver" start method. It imports every exchange module
+and loads the symbol snapshot written by the supervisor, so all workers share them
+copy-on-write instead of each importing the modules and fetching the symbols again.
+"""
+
+import gc
+import os
+
+import cryptofeed.exchanges  # noqa: F401
+from cryptofeed.symbols import Symbols
+
+SNAPSHOT_ENV = "CRYPTOFEED_SYMBOL_SNAPSHOT"
+GC_FREEZE_ENV = "CRYPTOFEED_GC_FREEZE"
+
+
+if os.environ.get(SNAPSHOT_ENV):
+    Symbols.load_snapshot(os.environ[SNAPSHOT_ENV])
+
+if os.environ.get(GC_FREEZE_ENV):
+    # move everything loaded so far to the permanent generation, so collections in the
+    # workers never write to (and un-share) these pages
+    gc.collect()
+    gc.freeze()
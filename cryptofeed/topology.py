@@ -0,0 +1,163 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Declarative description of what to collect and how to run it: exchanges and their pair
+filters, channels and the backend each one is written to, and how the pairs are split
+between worker processes. Loaded from a yaml file through Config, for example:
+
+    exchanges:
+      COINBASE:
+        decoder: {backend: orjson}
+      BINANCE:
+        ref_currency: USDT
+        pairs: [BTC-USDT, ETH-USDT]
+        redundancy: 2
+        ingress: {size: 10000, policy: drop, max_lag: 5}
+    ref_currency: USD
+    channels:
+      l2_book:
+        backend: redis.BookStream
+        snapshot_interval: 1000
+        stale_after: 3600
+      trades:
+        backend: redis.TradeStream
+        maxlen: 100
+    workers: 4
+    sharding:
+      strategy: load
+      pack_pairs: true
+      rate_profile: rates/
+    writer_pool:
+      size: 2
+    metrics:
+      port: 9100
+    reload_interval: 10
+"""
+
+import importlib
+import os
+from typing import Dict, List
+
+from cryptofeed.config import Config
+
+# settings that only take effect when the worker processes are started
+RESTART_KEYS = (
+    "workers",
+    "sharding",
+    "symbol_cache",
+    "start_method",
+    "gc_freeze",
+    "coordinator",
+    "writer_pool",
+    "metrics",
+)
+# keys of a channel that configure the feeds rather than the backend
+CHANNEL_FEED_KEYS = ("stale_after",)
+
+
+def _plain(value):
+    # Config wraps dicts in AttrDict, which cannot be pickled to the worker processes
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def load_backend(name: str):
+    """
+    name: str
+        a backend class, either relative to cryptofeed.backends (redis.BookStream) or a
+        fully qualified class name (mypackage.backends.MyBackend)
+    """
+    module, _, cls = name.rpartition(".")
+    if not module:
+        raise ValueError(f"Invalid backend {name!r}, expected module.Class")
+    try:
+        module = importlib.import_module(f"cryptofeed.backends.{module}")
+    except ImportError:
+        module = importlib.import_module(module)
+    return getattr(module, cls)
+
+
+def backend_spec(spec: dict) -> dict:
+    """
+    The part of a channel spec that configures its backend
+    """
+    return {k: v for k, v in spec.items() if k not in CHANNEL_FEED_KEYS}
+
+
+def build_callback(spec: dict):
+    """
+    spec: dict
+        backend: the backend class (see load_backend), the other keys are passed to its
+        constructor, except stale_after: the maximum time in seconds between updates of a
+        symbol, after which it is resubscribed (see Feed)
+    """
+    kwargs = {k: v for k, v in backend_spec(spec).items() if k != "backend"}
+    return load_backend(spec["backend"])(**kwargs)
+
+
+class Topology:
+    def __init__(self, config=None):
+        """
+        config: str or dict
+            path to a yaml file, or the topology as a dict
+        """
+        if isinstance(config, str) and not os.path.exists(config):
+            raise FileNotFoundError(f"Topology file {config!r} does not exist")
+        self.config = _plain(Config(config).config)
+        self.exchanges = self._exchanges(self.config.get("exchanges"))
+        self.pairs = self.config.get("pairs")
+        self.ref_currency = self.config.get("ref_currency")
+        self.channels = self.config.get("channels", {})
+        for channel, spec in self.channels.items():
+            if not isinstance(spec, dict) or "backend" not in spec:
+                raise ValueError(f"Channel {channel!r} has no backend")
+        self.feed = self.config.get("feed", {})
+        self.reload_interval = self.config.get("reload_interval", 0)
+
+    @staticmethod
+    def _exchanges(exchanges) -> Dict[str, dict]:
+        if not exchanges:
+            return {}
+        if isinstance(exchanges, list):
+            return {exchange: {} for exchange in exchanges}
+        return {exchange: options or {} for exchange, options in exchanges.items()}
+
+    def aggregator_kwargs(self) -> dict:
+        """
+        Keyword arguments for MarketDataAggregator
+        """
+        sharding = self.config.get("sharding", {})
+        return {
+            "exchanges": list(self.exchanges) or None,
+            "pairs": self.pairs,
+            "ref_currency": self.ref_currency,
+            "exchange_filters": self.exchanges,
+            "channels": self.channels or None,
+            "feed_config": self.feed,
+            "max_cpu_amount": self.config.get("workers"),
+            "sharding": sharding.get("strategy", "load"),
+            "pack_pairs": sharding.get("pack_pairs", True),
+            "rate_profile": sharding.get("rate_profile"),
+            "pinned_pairs": sharding.get("pinned_pairs"),
+            "symbol_cache": self.config.get("symbol_cache"),
+            "start_method": self.config.get("start_method"),
+            "gc_freeze": self.config.get("gc_freeze", False),
+            "coordinator": self.config.get("coordinator"),
+            "writer_pool": self.config.get("writer_pool"),
+            "metrics": self.config.get("metrics"),
+        }
+
+    def restart_required(self, other: "Topology") -> List[str]:
+        """
+        The settings changed in other that can not be applied to running workers
+        """
+        return [
+            key for key in RESTART_KEYS if self.config.get(key) != other.config.get(key)
+        ]
@@ -5,10 +5,21 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 '''
 cimport cython
+from cpython cimport array
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.mem cimport PyMem_Malloc, PyMem_Realloc, PyMem_Free
+from libc.stdint cimport uint8_t, uint64_t
+from libc.math cimport NAN
+from libc.string cimport memcpy
+import array as _array
 from decimal import Decimal
 
-from cryptofeed.defines import BID, ASK
-from order_book import OrderBook as _OrderBook
+from cryptofeed.defines import BID, ASK, BUY
+from order_book import OrderBook as _OrderBook, SortedDict as _SortedDict
+
+
+cdef extern from "Python.h":
+    const char* PyUnicode_AsUTF8AndSize(object unicode, Py_ssize_t *size) except NULL
 
 
 cdef extern from *:
@@ -30,6 +41,306 @@ cdef dict convert_none_values(d: dict, s: str):
     return d
 
 
+# decimals of the sizes of instruments whose lot size is unknown
+DEFAULT_SIZE_DECIMALS = 8
+
+
+cdef long long _scale(object value, int decimals) except? -1:
+    cdef str whole, fraction
+    if isinstance(value, str) and 'e' not in value and 'E' not in value:
+        # the common case, exchanges send prices and sizes as decimal strings
+        whole, _, fraction = value.partition('.')
+        if len(fraction) > decimals:
+            if fraction[decimals:].strip('0'):
+                raise ValueError(f"{value} has more than {decimals} decimals")
+            fraction = fraction[:decimals]
+        return int(whole + fraction + '0' * (decimals - len(fraction)))
+    if isinstance(value, int):
+        return value * 10 ** decimals
+    if isinstance(value, float):
+        value = repr(value)
+    scaled = Decimal(value).scaleb(decimals)
+    ret = int(scaled)
+    if ret != scaled:
+        raise ValueError(f"{value} has more than {decimals} decimals")
+    return ret
+
+
+cdef object _unscale(long long value, int decimals, object unit, object numeric_type):
+    if numeric_type is float:
+        # int / int is correctly rounded, as float(Decimal(...)) is
+        return (<object>value) / unit
+    # 0E-8 is a correct but surprising zero size
+    ret = Decimal(value).scaleb(-decimals) if value else Decimal(0)
+    if numeric_type is None or numeric_type is Decimal:
+        return ret
+    return numeric_type(ret)
+
+
+cdef class FixedPoint:
+    '''
+    Fixed point representation of the prices and sizes of an instrument, as integers
+    (int64) counting price_decimals and size_decimals decimal places: with 2 price
+    decimals, a price of 8506.26 is 850626. Converting a value with more decimal places
+    raises ValueError, so both directions are exact.
+    '''
+    cdef readonly int price_decimals
+    cdef readonly int size_decimals
+    cdef readonly long long tick  # tick size, in fixed point price units
+    cdef object price_unit
+    cdef object size_unit
+    cdef double price_scale
+    cdef double size_scale
+
+    def __init__(self, int price_decimals, int size_decimals=DEFAULT_SIZE_DECIMALS, long long tick=1):
+        assert 0 <= price_decimals <= 18 and 0 <= size_decimals <= 18
+        assert tick > 0
+
+        self.price_decimals = price_decimals
+        self.size_decimals = size_decimals
+        self.tick = tick
+        self.price_unit = 10 ** price_decimals
+        self.size_unit = 10 ** size_decimals
+        self.price_scale = self.price_unit
+        self.size_scale = self.size_unit
+
+    @staticmethod
+    def decimals(increment) -> int:
+        '''
+        Decimal places of a tick or lot size, e.g. 2 for '0.01' or 0.05, 0 for '5'
+        '''
+        exponent = Decimal(repr(increment) if isinstance(increment, float) else increment).normalize().as_tuple().exponent
+        return max(0, -exponent)
+
+    @staticmethod
+    def from_increments(tick_size, lot_size=None) -> FixedPoint:
+        price_decimals = FixedPoint.decimals(tick_size)
+        return FixedPoint(
+            price_decimals,
+            FixedPoint.decimals(lot_size) if lot_size is not None else DEFAULT_SIZE_DECIMALS,
+            _scale(tick_size if not isinstance(tick_size, float) else repr(tick_size), price_decimals)
+        )
+
+    cpdef long long price(self, value) except? -1:
+        '''
+        Fixed point price of a str, Decimal, int or float
+        '''
+        return _scale(value, self.price_decimals)
+
+    cpdef long long size(self, value) except? -1:
+        return _scale(value, self.size_decimals)
+
+    cpdef object to_price(self, long long value, numeric_type=None):
+        '''
+        The price of a fixed point value, as Decimal if numeric_type is None
+        '''
+        return _unscale(value, self.price_decimals, self.price_unit, numeric_type)
+
+    cpdef object to_size(self, long long value, numeric_type=None):
+        return _unscale(value, self.size_decimals, self.size_unit, numeric_type)
+
+    cdef double _price_double(self, long long value):
+        # both are exact doubles below 2**53, so the division is correctly rounded
+        if -9007199254740992 < value < 9007199254740992:
+            return value / self.price_scale
+        return (<object>value) / self.price_unit
+
+    cdef double _size_double(self, long long value):
+        if -9007199254740992 < value < 9007199254740992:
+            return value / self.size_scale
+        return (<object>value) / self.size_unit
+
+    def __repr__(self):
+        return f"FixedPoint(price_decimals={self.price_decimals}, size_decimals={self.size_decimals}, tick={self.tick})"
+
+    def __eq__(self, cmp):
+        return isinstance(cmp, FixedPoint) and self.price_decimals == cmp.price_decimals and self.size_decimals == cmp.size_decimals and self.tick == cmp.tick
+
+    def __hash__(self):
+        return hash((self.price_decimals, self.size_decimals, self.tick))
+
+    def __reduce__(self):
+        return FixedPoint, (self.price_decimals, self.size_decimals, self.tick)
+
+
+cdef class Buffer:
+    """
+    Output buffer of the serialize methods, reused from one message to the next. The
+    updates are serialized in MessagePack: a map of the fields of to_dict(numeric_type=float),
+    with the prices and sizes as float64 (fixed point values are converted exactly, as by
+    to_dict) and None as nil, so they can be read with any MessagePack library.
+    """
+    cdef char *data
+    cdef Py_ssize_t length
+    cdef Py_ssize_t capacity
+
+    def __cinit__(self, Py_ssize_t capacity=1024):
+        self.data = <char *> PyMem_Malloc(capacity)
+        if not self.data:
+            raise MemoryError()
+        self.length = 0
+        self.capacity = capacity
+
+    def __dealloc__(self):
+        PyMem_Free(self.data)
+
+    cdef int _reserve(self, Py_ssize_t size) except -1:
+        cdef Py_ssize_t capacity
+        cdef char *data
+        if self.length + size <= self.capacity:
+            return 0
+        capacity = max(self.capacity * 2, self.length + size)
+        data = <char *> PyMem_Realloc(self.data, capacity)
+        if not data:
+            raise MemoryError()
+        self.data = data
+        self.capacity = capacity
+        return 0
+
+    cdef int _header(self, uint8_t code, uint64_t value, int size) except -1:
+        # code followed by the size bytes of value, big endian
+        cdef int i
+        self._reserve(1 + size)
+        self.data[self.length] = <char> code
+        for i in range(size):
+            self.data[self.length + 1 + i] = <char> ((value >> (8 * (size - 1 - i))) & 0xff)
+        self.length += 1 + size
+        return 0
+
+    cdef int _nil(self) except -1:
+        return self._header(0xc0, 0, 0)
+
+    cdef int _double(self, double value) except -1:
+        cdef uint64_t bits
+        memcpy(&bits, &value, 8)
+        return self._header(0xcb, bits, 8)
+
+    cdef int _number(self, value) except -1:
+        # a price, size, rate... as float64, like numeric_type=float
+        if value is None:
+            return self._nil()
+        return self._double(float(value))
+
+    cdef int _int(self, value) except -1:
+        if 0 <= value < 128:
+            return self._header(value, 0, 0)
+        if -32 <= value < 0:
+            return self._header(<uint8_t> (value & 0xff), 0, 0)
+        if 0 <= value < 2 ** 64:
+            return self._header(0xcf, value, 8)
+        if -2 ** 63 <= value < 0:
+            return self._header(0xd3, <uint64_t> (value & 0xffffffffffffffff), 8)
+        return self._str(str(value))
+
+    cdef int _str(self, str value) except -1:
+        cdef Py_ssize_t size
+        cdef const char *utf8 = PyUnicode_AsUTF8AndSize(value, &size)
+        if size < 32:
+            self._header(0xa0 | size, 0, 0)
+        elif size < 256:
+            self._header(0xd9, size, 1)
+        elif size < 65536:
+            self._header(0xda, size, 2)
+        else:
+            self._header(0xdb, size, 4)
+        self._reserve(size)
+        memcpy(self.data + self.length, utf8, size)
+        self.length += size
+        return 0
+
+    cdef int _bin(self, bytes value) except -1:
+        cdef Py_ssize_t size = len(value)
+        if size < 256:
+            self._header(0xc4, size, 1)
+        elif size < 65536:
+            self._header(0xc5, size, 2)
+        else:
+            self._header(0xc6, size, 4)
+        self._reserve(size)
+        memcpy(self.data + self.length, <const char *> value, size)
+        self.length += size
+        return 0
+
+    cdef int _map(self, Py_ssize_t size) except -1:
+        if size < 16:
+            return self._header(0x80 | size, 0, 0)
+        if size < 65536:
+            return self._header(0xde, size, 2)
+        return self._header(0xdf, size, 4)
+
+    cdef int _array(self, Py_ssize_t size) except -1:
+        if size < 16:
+            return self._header(0x90 | size, 0, 0)
+        if size < 65536:
+            return self._header(0xdc, size, 2)
+        return self._header(0xdd, size, 4)
+
+    cdef int _pack(self, value) except -1:
+        if value is None:
+            return self._nil()
+        if value is True:
+            return self._header(0xc3, 0, 0)
+        if value is False:
+            return self._header(0xc2, 0, 0)
+        if isinstance(value, str):
+            return self._str(value)
+        if isinstance(value, float):
+            return self._double(value)
+        if isinstance(value, int):
+            return self._int(value)
+        if isinstance(value, Decimal):
+            return self._double(float(value))
+        if isinstance(value, bytes):
+            return self._bin(value)
+        if isinstance(value, dict):
+            self._map(len(value))
+            for key, item in value.items():
+                self._pack(key)
+                self._pack(item)
+            return 0
+        if isinstance(value, (list, tuple)):
+            self._array(len(value))
+            for item in value:
+                self._pack(item)
+            return 0
+        return self._str(str(value))
+
+    cdef int _field(self, str key, value) except -1:
+        self._str(key)
+        return self._pack(value)
+
+    cdef int _timestamps(self, timestamp, receipt_timestamp) except -1:
+        # the timestamp defaults to the receipt timestamp (in seconds, an int receipt
+        # timestamp is in nanoseconds), as in the records of the backends
+        if not timestamp and receipt_timestamp is not None:
+            timestamp = float(receipt_timestamp) if isinstance(receipt_timestamp, float) else receipt_timestamp / 1e9
+        self._field('timestamp', timestamp)
+        if receipt_timestamp is not None:
+            self._str('receipt_timestamp')
+            if isinstance(receipt_timestamp, float):
+                self._double(receipt_timestamp)
+            else:
+                self._int(receipt_timestamp)
+        return 0
+
+    cdef int _start(self, Py_ssize_t fields, receipt_timestamp) except -1:
+        self.length = 0
+        return self._map(fields + (receipt_timestamp is not None))
+
+    cdef bytes _take(self):
+        return PyBytes_FromStringAndSize(self.data, self.length)
+
+    def getvalue(self) -> bytes:
+        return self._take()
+
+    def __len__(self):
+        return self.length
+
+
+cdef Buffer _buffer(Buffer buffer):
+    return buffer if buffer is not None else Buffer()
+
+
 @cython.freelist(128)
 cdef class Trade:
     cdef readonly str exchange
@@ -41,10 +352,11 @@ cdef class Trade:
     cdef readonly str type
     cdef readonly double timestamp
     cdef readonly object raw  # can be dict or list
+    cdef readonly FixedPoint fixed_point  # price and amount are fixed point ints if set
 
-    def __init__(self, exchange, symbol, side, amount, price, timestamp, id=None, type=None, raw=None):
-        assert isinstance(price, Decimal)
-        assert isinstance(amount, Decimal)
+    def __init__(self, exchange, symbol, side, amount, price, timestamp, id=None, type=None, raw=None, FixedPoint fixed_point=None):
+        assert isinstance(price, Decimal) if fixed_point is None else isinstance(price, int)
+        assert isinstance(amount, Decimal) if fixed_point is None else isinstance(amount, int)
 
         self.exchange = exchange
         self.symbol = symbol
@@ -55,6 +367,7 @@ cdef class Trade:
         self.id = id
         self.type = type
         self.raw = raw
+        self.fixed_point = fixed_point
 
     @staticmethod
     def from_dict(data: dict) -> Trade:
@@ -70,12 +383,39 @@ cdef class Trade:
         )
 
     cpdef dict to_dict(self, numeric_type=None, none_to=False):
-        if numeric_type is None:
+        if self.fixed_point is not None:
+            data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'amount': self.fixed_point.to_size(self.amount, numeric_type), 'price': self.fixed_point.to_price(self.price, numeric_type), 'id': self.id, 'type': self.type, 'timestamp': self.timestamp}
+        elif numeric_type is None:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'amount': self.amount, 'price': self.price, 'id': self.id, 'type': self.type, 'timestamp': self.timestamp}
         else:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'amount': numeric_type(self.amount), 'price': numeric_type(self.price), 'id': self.id, 'type': self.type, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        """
+        to_dict(numeric_type=float) and the receipt timestamp (if not None) in MessagePack,
+        written in buffer (see Buffer) if given
+        """
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(8, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._field('side', self.side)
+        buf._str('amount')
+        if self.fixed_point is not None:
+            buf._double(self.fixed_point._size_double(self.amount))
+        else:
+            buf._number(self.amount)
+        buf._str('price')
+        if self.fixed_point is not None:
+            buf._double(self.fixed_point._price_double(self.price))
+        else:
+            buf._number(self.price)
+        buf._field('id', self.id)
+        buf._field('type', self.type)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} side: {self.side} amount: {self.amount} price: {self.price} id: {self.id} type: {self.type} timestamp: {self.timestamp}"
 
@@ -93,10 +433,11 @@ cdef class Ticker:
     cdef readonly object ask
     cdef readonly object timestamp
     cdef readonly object raw
+    cdef readonly FixedPoint fixed_point  # bid and ask are fixed point ints if set
 
-    def __init__(self, exchange, symbol, bid, ask, timestamp, raw=None):
-        assert isinstance(bid, Decimal)
-        assert isinstance(ask, Decimal)
+    def __init__(self, exchange, symbol, bid, ask, timestamp, raw=None, FixedPoint fixed_point=None):
+        assert isinstance(bid, Decimal) if fixed_point is None else isinstance(bid, int)
+        assert isinstance(ask, Decimal) if fixed_point is None else isinstance(ask, int)
         assert timestamp is None or isinstance(timestamp, float)
 
         self.exchange = exchange
@@ -105,6 +446,7 @@ cdef class Ticker:
         self.ask = ask
         self.timestamp = timestamp
         self.raw = raw
+        self.fixed_point = fixed_point
 
     @staticmethod
     def from_dict(data: dict) -> Ticker:
@@ -117,12 +459,32 @@ cdef class Ticker:
         )
 
     cpdef dict to_dict(self, numeric_type=None, none_to=False):
-        if numeric_type is None:
+        if self.fixed_point is not None:
+            data = {'exchange': self.exchange, 'symbol': self.symbol, 'bid': self.fixed_point.to_price(self.bid, numeric_type), 'ask': self.fixed_point.to_price(self.ask, numeric_type), 'timestamp': self.timestamp}
+        elif numeric_type is None:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'bid': self.bid, 'ask': self.ask, 'timestamp': self.timestamp}
         else:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'bid': numeric_type(self.bid), 'ask': numeric_type(self.ask), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(5, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        if self.fixed_point is not None:
+            buf._str('bid')
+            buf._double(self.fixed_point._price_double(self.bid))
+            buf._str('ask')
+            buf._double(self.fixed_point._price_double(self.ask))
+        else:
+            buf._str('bid')
+            buf._number(self.bid)
+            buf._str('ask')
+            buf._number(self.ask)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} bid: {self.bid} ask: {self.ask} timestamp: {self.timestamp}"
 
@@ -179,6 +541,21 @@ cdef class Liquidation:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'side': self.side, 'quantity': numeric_type(self.quantity), 'price': numeric_type(self.price), 'id': self.id, 'status': self.status, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(8, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._field('side', self.side)
+        buf._str('quantity')
+        buf._number(self.quantity)
+        buf._str('price')
+        buf._number(self.price)
+        buf._field('id', self.id)
+        buf._field('status', self.status)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} side: {self.side} quantity: {self.quantity} price: {self.price} id: {self.id} status: {self.status} timestamp: {self.timestamp}"
 
@@ -233,6 +610,21 @@ cdef class Funding:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'mark_price': numeric_type(self.mark_price) if self.mark_price else None, 'rate': numeric_type(self.rate), 'next_funding_time': self.next_funding_time, 'predicted_rate': numeric_type(self.predicted_rate) if self.predicted_rate is not None else None, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(7, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._str('mark_price')
+        buf._number(self.mark_price if self.mark_price else None)
+        buf._str('rate')
+        buf._number(self.rate)
+        buf._field('next_funding_time', self.next_funding_time)
+        buf._str('predicted_rate')
+        buf._number(self.predicted_rate)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} mark_price: {self.mark_price} rate: {self.rate} next_funding_time: {self.next_funding_time} predicted_rate: {self.predicted_rate} timestamp: {self.timestamp}"
 
@@ -308,6 +700,29 @@ cdef class Candle:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'start': self.start, 'stop': self.stop, 'interval': self.interval, 'trades': self.trades, 'open': numeric_type(self.open), 'close': numeric_type(self.close), 'high': numeric_type(self.high), 'low': numeric_type(self.low), 'volume': numeric_type(self.volume), 'closed': self.closed, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(13, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._field('start', self.start)
+        buf._field('stop', self.stop)
+        buf._field('interval', self.interval)
+        buf._field('trades', self.trades)
+        buf._str('open')
+        buf._number(self.open)
+        buf._str('close')
+        buf._number(self.close)
+        buf._str('high')
+        buf._number(self.high)
+        buf._str('low')
+        buf._number(self.low)
+        buf._str('volume')
+        buf._number(self.volume)
+        buf._field('closed', self.closed)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} start: {self.start} stop: {self.stop} interval: {self.interval} trades: {self.trades} open: {self.open} close: {self.close} high: {self.high} low: {self.low} volume: {self.volume} closed: {self.closed} timestamp: {self.timestamp}"
 
@@ -341,6 +756,16 @@ cdef class Index:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'price': numeric_type(self.price), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(4, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._str('price')
+        buf._number(self.price)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} price: {self.price} timestamp: {self.timestamp}"
 
@@ -375,6 +800,16 @@ cdef class OpenInterest:
             data = {'exchange': self.exchange, 'symbol': self.symbol, 'open_interest': numeric_type(self.open_interest), 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None):
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(4, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        buf._str('open_interest')
+        buf._number(self.open_interest)
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} open_interest: {self.open_interest} timestamp: {self.timestamp}"
 
@@ -385,6 +820,609 @@ cdef class OpenInterest:
         return hash(self.__repr__())
 
 
+# slots of the window of a TickLadder
+DEFAULT_LADDER_LEVELS = 4096
+# size of an empty slot
+cdef long long EMPTY = -9223372036854775807 - 1
+
+
+cdef class TickLadder:
+    """
+    One side of a TickBook. The sizes are kept in an array indexed by the distance, in
+    ticks, of the price from the bottom of a window of levels slots that always holds the
+    best price. Levels outside of the window (all worse than the window's) are kept in a
+    dict, and moved into the array when the window is recentered: when a price better than
+    the window arrives or when the window empties.
+    """
+    cdef long long *sizes
+    cdef Py_ssize_t levels
+    cdef long long base  # price of slot 0
+    cdef readonly long long tick
+    cdef readonly bint descending  # the best price is the highest (bids)
+    cdef Py_ssize_t best  # slot of the best price, -1 if the book side is empty
+    cdef Py_ssize_t count  # levels in the window
+    cdef dict overflow
+    cdef public int max_depth
+    cdef readonly bint max_depth_strict
+
+    def __cinit__(self, bint descending, long long tick=1, Py_ssize_t levels=DEFAULT_LADDER_LEVELS, int max_depth=0, bint max_depth_strict=False):
+        assert tick > 0 and levels >= 4
+
+        self.sizes = <long long *> PyMem_Malloc(levels * sizeof(long long))
+        if not self.sizes:
+            raise MemoryError()
+        for i in range(levels):
+            self.sizes[i] = EMPTY
+        self.levels = levels
+        self.base = 0
+        self.tick = tick
+        self.descending = descending
+        self.best = -1
+        self.count = 0
+        self.overflow = {}
+        self.max_depth = max_depth
+        self.max_depth_strict = max_depth_strict
+
+    def __dealloc__(self):
+        PyMem_Free(self.sizes)
+
+    cdef inline Py_ssize_t _slot(self, long long price) except -2:
+        # slot of price, -1 if it is outside of the window
+        if price % self.tick:
+            raise ValueError(f"{price} is not a multiple of the tick size {self.tick}")
+        cdef long long offset = (price - self.base) // self.tick
+        return offset if 0 <= offset < self.levels else -1
+
+    cdef inline bint _better(self, Py_ssize_t slot, Py_ssize_t other):
+        return slot > other if self.descending else slot < other
+
+    cdef int _recenter(self, long long price) except -1:
+        # moves the window so that price is a quarter of the window away from its better end
+        cdef Py_ssize_t i, slot
+        for i in range(self.levels):
+            if self.sizes[i] != EMPTY:
+                self.overflow[self.base + i * self.tick] = self.sizes[i]
+                self.sizes[i] = EMPTY
+        self.count = 0
+        self.best = -1
+        self.base = price - ((self.levels - self.levels // 4) if self.descending else self.levels // 4) * self.tick
+        for key in [key for key in self.overflow if self._slot(key) >= 0]:
+            slot = self._slot(key)
+            self.sizes[slot] = self.overflow.pop(key)
+            self.count += 1
+            if self.best == -1 or self._better(slot, self.best):
+                self.best = slot
+        return 0
+
+    cdef int _set(self, long long price, long long size) except -1:
+        cdef Py_ssize_t slot = self._slot(price)
+        if slot < 0:
+            if self.count and (price < self.base if self.descending else price >= self.base + self.levels * self.tick):
+                self.overflow[price] = size
+                self._check_depth()
+                return 0
+            self._recenter(price)
+            slot = self._slot(price)
+        if self.sizes[slot] == EMPTY:
+            self.count += 1
+        self.sizes[slot] = size
+        if self.best == -1 or self._better(slot, self.best):
+            self.best = slot
+        self._check_depth()
+        return 0
+
+    cdef int _check_depth(self) except -1:
+        # drops the worst level of a strict side with too many levels
+        cdef Py_ssize_t i
+        if not self.max_depth_strict or not self.max_depth or self.count + len(self.overflow) <= self.max_depth:
+            return 0
+        if self.overflow:
+            self._delete(min(self.overflow) if self.descending else max(self.overflow))
+            return 0
+        i = 0 if self.descending else self.levels - 1
+        while self.sizes[i] == EMPTY:
+            i += 1 if self.descending else -1
+        self._delete(self.base + i * self.tick)
+        return 0
+
+    cdef int _delete(self, long long price) except -1:
+        cdef Py_ssize_t slot = self._slot(price)
+        cdef Py_ssize_t step = -1 if self.descending else 1
+        if slot < 0 or self.sizes[slot] == EMPTY:
+            if slot >= 0 or price not in self.overflow:
+                raise KeyError(price)
+            del self.overflow[price]
+            return 0
+        self.sizes[slot] = EMPTY
+        self.count -= 1
+        if slot != self.best:
+            return 0
+        if self.count:
+            while self.sizes[slot] == EMPTY:
+                slot += step
+            self.best = slot
+        else:
+            self.best = -1
+            if self.overflow:
+                self._recenter(max(self.overflow) if self.descending else min(self.overflow))
+        return 0
+
+    cdef list _items(self, Py_ssize_t n):
+        # the first n (all if n < 0) levels, from the best price
+        cdef list ret = []
+        cdef Py_ssize_t slot = self.best
+        cdef Py_ssize_t seen = 0
+        cdef Py_ssize_t step = -1 if self.descending else 1
+        if n < 0:
+            n = self.count + len(self.overflow)
+        if slot < 0 or n == 0:
+            return ret
+        while seen < self.count and seen < n:
+            if self.sizes[slot] != EMPTY:
+                ret.append((self.base + slot * self.tick, self.sizes[slot]))
+                seen += 1
+            slot += step
+        if seen < n and self.overflow:
+            for price in sorted(self.overflow, reverse=self.descending)[:n - seen]:
+                ret.append((price, self.overflow[price]))
+        return ret
+
+    cdef int _serialize(self, Buffer buf, FixedPoint fp) except -1:
+        # the levels of to_dict written in buf, see OrderBook.serialize
+        cdef Py_ssize_t n = self.count + len(self.overflow) if self.best >= 0 else 0
+        cdef Py_ssize_t slot = self.best
+        cdef Py_ssize_t seen = 0
+        cdef Py_ssize_t step = -1 if self.descending else 1
+        if self.max_depth and n > self.max_depth:
+            n = self.max_depth
+        buf._map(n)
+        while seen < self.count and seen < n:
+            if self.sizes[slot] != EMPTY:
+                if fp is not None:
+                    buf._double(fp._price_double(self.base + slot * self.tick))
+                    buf._double(fp._size_double(self.sizes[slot]))
+                else:
+                    buf._int(self.base + slot * self.tick)
+                    buf._int(self.sizes[slot])
+                seen += 1
+            slot += step
+        if seen < n:
+            for price, size in self._items(n)[seen:]:
+                if fp is not None:
+                    buf._double(fp._price_double(price))
+                    buf._double(fp._size_double(size))
+                else:
+                    buf._int(price)
+                    buf._int(size)
+        return 0
+
+    cdef dict _dict(self, Py_ssize_t n, object to_type):
+        # same as _items, as a dict
+        cdef dict ret = {}
+        cdef Py_ssize_t slot = self.best
+        cdef Py_ssize_t seen = 0
+        cdef Py_ssize_t step = -1 if self.descending else 1
+        if n < 0:
+            n = self.count + len(self.overflow)
+        if slot < 0 or n == 0:
+            return ret
+        while seen < self.count and seen < n:
+            if self.sizes[slot] != EMPTY:
+                if to_type is None:
+                    ret[self.base + slot * self.tick] = self.sizes[slot]
+                else:
+                    ret[to_type(self.base + slot * self.tick)] = to_type(self.sizes[slot])
+                seen += 1
+            slot += step
+        if seen < n and self.overflow:
+            for price, size in self._items(n)[seen:]:
+                if to_type is None:
+                    ret[price] = size
+                else:
+                    ret[to_type(price)] = to_type(size)
+        return ret
+
+    cdef Py_ssize_t _depth(self):
+        return self.max_depth if self.max_depth else -1
+
+    def update(self, levels):
+        """
+        Replaces the levels with those of a dict (or of a TickLadder)
+        """
+        cdef Py_ssize_t i
+        for i in range(self.levels):
+            self.sizes[i] = EMPTY
+        self.count = 0
+        self.best = -1
+        self.overflow = {}
+        items = levels.to_list() if isinstance(levels, TickLadder) else list(levels.items())
+        if not items:
+            return
+        # the best price first, so that the window is placed once
+        best = max(items) if self.descending else min(items)
+        self._set(best[0], best[1])
+        for price, size in items:
+            self._set(price, size)
+
+    def __getitem__(self, long long price):
+        cdef Py_ssize_t slot = self._slot(price)
+        if slot >= 0 and self.sizes[slot] != EMPTY:
+            return self.sizes[slot]
+        if slot < 0 and price in self.overflow:
+            return self.overflow[price]
+        raise KeyError(price)
+
+    def __setitem__(self, long long price, long long size):
+        self._set(price, size)
+
+    def __delitem__(self, long long price):
+        self._delete(price)
+
+    def __contains__(self, price):
+        cdef Py_ssize_t slot = self._slot(price)
+        if slot >= 0:
+            return self.sizes[slot] != EMPTY
+        return price in self.overflow
+
+    def __len__(self):
+        cdef Py_ssize_t total = self.count + len(self.overflow)
+        return min(total, self.max_depth) if self.max_depth else total
+
+    def __iter__(self):
+        return iter([price for price, _ in self._items(-1)])
+
+    def keys(self) -> tuple:
+        return tuple([price for price, _ in self._items(self._depth())])
+
+    def index(self, Py_ssize_t i) -> tuple:
+        """
+        price, size tuple of the level i, counting from the best price
+        """
+        if i == 0 and self.best >= 0:
+            return (self.base + self.best * self.tick, self.sizes[self.best])
+        return self._items(i + 1 if i >= 0 else -1)[i]
+
+    def to_list(self, n=None) -> list:
+        return self._items(-1 if n is None else n)
+
+    def to_dict(self, to_type=None) -> dict:
+        return self._dict(self._depth(), to_type)
+
+    def truncate(self):
+        """
+        Removes the levels beyond max_depth
+        """
+        if self.max_depth:
+            for price, _ in self._items(-1)[self.max_depth:]:
+                self._delete(price)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+cdef class TickBook:
+    """
+    L2 book of fixed point prices and sizes (see FixedPoint) on a TickLadder per side. It has
+    the interface of order_book.OrderBook used by the exchanges: book[side][price]
+    lookups, updates and deletes, assignment of the bids / asks from dicts and to_dict.
+    """
+    cdef TickLadder _bids
+    cdef TickLadder _asks
+    cdef readonly int max_depth
+
+    def __init__(self, long long tick=1, int max_depth=0, bint max_depth_strict=False, Py_ssize_t levels=DEFAULT_LADDER_LEVELS):
+        self._bids = TickLadder(True, tick, levels, max_depth, max_depth_strict)
+        self._asks = TickLadder(False, tick, levels, max_depth, max_depth_strict)
+        self.max_depth = max_depth
+
+    @property
+    def bids(self) -> TickLadder:
+        return self._bids
+
+    @bids.setter
+    def bids(self, levels):
+        self._bids.update(levels)
+
+    @property
+    def asks(self) -> TickLadder:
+        return self._asks
+
+    @asks.setter
+    def asks(self, levels):
+        self._asks.update(levels)
+
+    def __getitem__(self, side):
+        if side == BID:
+            return self._bids
+        if side == ASK:
+            return self._asks
+        raise KeyError(side)
+
+    def __setitem__(self, side, levels):
+        self[side].update(levels)
+
+    def to_dict(self, to_type=None) -> dict:
+        return {BID: self._bids.to_dict(to_type), ASK: self._asks.to_dict(to_type)}
+
+    def checksum(self):
+        raise NotImplementedError("TickBook does not compute checksums")
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+@cython.freelist(256)
+cdef class PriceLevel:
+    """
+    The orders at a price of an L3Book, oldest first, and their total size. It reads like a
+    dict of order id to size. The first order is held inline and the others in a dict,
+    created by the second order, so a level of a single order (e.g. the id based levels
+    of BitMEX) is a small object.
+    """
+    cdef readonly str side
+    cdef readonly object price
+    cdef readonly object size
+    cdef Py_ssize_t count
+    cdef object first_id
+    cdef object first_size
+    cdef dict rest
+
+    def __init__(self, str side, price):
+        self.side = side
+        self.price = price
+        self.size = 0
+        self.count = 0
+        self.first_id = None
+        self.first_size = None
+        self.rest = None
+
+    cdef int _append(self, order_id, size) except -1:
+        if self.count == 0:
+            self.first_id = order_id
+            self.first_size = size
+        else:
+            if self.rest is None:
+                self.rest = {}
+            self.rest[order_id] = size
+        self.count += 1
+        self.size = self.size + size
+        return 0
+
+    cdef object _set(self, order_id, size):
+        if self.count and self.first_id == order_id:
+            old = self.first_size
+            self.first_size = size
+        else:
+            if self.rest is None or order_id not in self.rest:
+                raise KeyError(order_id)
+            old = self.rest[order_id]
+            self.rest[order_id] = size
+        self.size = self.size - old + size
+        return old
+
+    cdef object _remove(self, order_id):
+        if self.count and self.first_id == order_id:
+            old = self.first_size
+            if self.rest:
+                self.first_id = next(iter(self.rest))
+                self.first_size = self.rest.pop(self.first_id)
+            else:
+                self.first_id = None
+                self.first_size = None
+        else:
+            if self.rest is None or order_id not in self.rest:
+                raise KeyError(order_id)
+            old = self.rest.pop(order_id)
+        self.count -= 1
+        self.size = self.size - old if self.count else 0
+        return old
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, order_id):
+        return (self.count and self.first_id == order_id) or (self.rest is not None and order_id in self.rest)
+
+    def __getitem__(self, order_id):
+        if self.count and self.first_id == order_id:
+            return self.first_size
+        if self.rest is not None and order_id in self.rest:
+            return self.rest[order_id]
+        raise KeyError(order_id)
+
+    def items(self) -> list:
+        if not self.count:
+            return []
+        ret = [(self.first_id, self.first_size)]
+        if self.rest:
+            ret.extend(self.rest.items())
+        return ret
+
+    def keys(self) -> list:
+        return [order_id for order_id, _ in self.items()]
+
+    def values(self) -> list:
+        return [size for _, size in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self, to_type=None) -> dict:
+        if to_type is None:
+            return dict(self.items())
+        return {order_id: to_type(size) for order_id, size in self.items()}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+cdef class L3Book:
+    """
+    Order level book. The orders of each side are grouped in price levels (see PriceLevel),
+    kept in a sorted dict (book.bids[price] is the level), and indexed by order id. Adding,
+    changing and removing an order by id are O(1) besides the creation and removal of
+    levels, and the total sizes of the levels are kept up to date for the L2 view (see l2).
+    """
+    cdef readonly object bids
+    cdef readonly object asks
+    cdef readonly int max_depth
+    cdef dict orders  # order id -> PriceLevel
+    cdef L2View _l2
+
+    def __init__(self, int max_depth=0):
+        depth = {'max_depth': max_depth} if max_depth else {}
+        self.bids = _SortedDict(ordering='DESC', **depth)
+        self.asks = _SortedDict(ordering='ASC', **depth)
+        self.max_depth = max_depth
+        self.orders = {}
+        self._l2 = None
+
+    def __getitem__(self, side):
+        if side == BID:
+            return self.bids
+        if side == ASK:
+            return self.asks
+        raise KeyError(side)
+
+    cpdef add(self, order_id, str side, price, size):
+        """
+        Adds an order at the back of the queue of its price level
+        """
+        cdef PriceLevel level
+        if order_id in self.orders:
+            raise ValueError(f"order {order_id} is already in the book")
+        levels = self.bids if side == BID else self.asks
+        try:
+            level = levels[price]
+        except KeyError:
+            level = PriceLevel(side, price)
+            levels[price] = level
+        level._append(order_id, size)
+        self.orders[order_id] = level
+
+    cpdef object modify(self, order_id, size):
+        """
+        Changes the size of an order, keeping its place in the queue. Returns its price.
+        """
+        cdef PriceLevel level = self.orders[order_id]
+        level._set(order_id, size)
+        return level.price
+
+    cpdef tuple remove(self, order_id):
+        """
+        Removes an order, returns its side, price and size
+        """
+        cdef PriceLevel level = self.orders.pop(order_id)
+        size = level._remove(order_id)
+        if not level.count:
+            del (self.bids if level.side == BID else self.asks)[level.price]
+        return level.side, level.price, size
+
+    def order(self, order_id) -> tuple:
+        """
+        side, price and size of an order
+        """
+        cdef PriceLevel level = self.orders[order_id]
+        return level.side, level.price, level[order_id]
+
+    def __contains__(self, order_id):
+        return order_id in self.orders
+
+    def __len__(self):
+        return len(self.orders)
+
+    @property
+    def l2(self) -> L2View:
+        """
+        Read only L2 book of the total size of the levels
+        """
+        if self._l2 is None:
+            self._l2 = L2View(self)
+        return self._l2
+
+    def to_dict(self, to_type=None) -> dict:
+        if to_type is None:
+            return {side: {price: level.to_dict() for price, level in self[side].to_dict().items()} for side in (BID, ASK)}
+        return {side: {to_type(price): level.to_dict(to_type) for price, level in self[side].to_dict().items()} for side in (BID, ASK)}
+
+    def checksum(self):
+        raise NotImplementedError("L3Book does not compute checksums")
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+cdef class L2Side:
+    """
+    One side of an L2View: the total size of each price level of a side of an L3Book
+    """
+    cdef object levels
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    def __getitem__(self, price):
+        return (<PriceLevel> self.levels[price]).size
+
+    def __contains__(self, price):
+        return price in self.levels
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __iter__(self):
+        return iter(self.levels)
+
+    def keys(self) -> tuple:
+        return self.levels.keys()
+
+    def index(self, i) -> tuple:
+        price, level = self.levels.index(i)
+        return price, (<PriceLevel> level).size
+
+    def to_list(self, n=None) -> list:
+        levels = self.levels.to_list() if n is None else self.levels.to_list(n)
+        return [(price, (<PriceLevel> level).size) for price, level in levels]
+
+    def to_dict(self, to_type=None) -> dict:
+        if to_type is None:
+            return {price: (<PriceLevel> level).size for price, level in self.levels.to_dict().items()}
+        return {to_type(price): to_type((<PriceLevel> level).size) for price, level in self.levels.to_dict().items()}
+
+
+cdef class L2View:
+    """
+    L2 book of an L3Book (see L3Book.l2), with the read interface of order_book.OrderBook.
+    It is updated through the L3Book (l3).
+    """
+    cdef readonly L3Book l3
+    cdef readonly L2Side bids
+    cdef readonly L2Side asks
+    cdef readonly int max_depth
+
+    def __init__(self, L3Book l3):
+        self.l3 = l3
+        self.bids = L2Side(l3.bids)
+        self.asks = L2Side(l3.asks)
+        self.max_depth = l3.max_depth
+
+    def __getitem__(self, side):
+        if side == BID:
+            return self.bids
+        if side == ASK:
+            return self.asks
+        raise KeyError(side)
+
+    def to_dict(self, to_type=None) -> dict:
+        return {BID: self.bids.to_dict(to_type), ASK: self.asks.to_dict(to_type)}
+
+    def checksum(self):
+        raise NotImplementedError("L2View does not compute checksums")
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
 cdef class OrderBook:
     cdef readonly str exchange
     cdef readonly str symbol
@@ -394,11 +1432,27 @@ cdef class OrderBook:
     cdef public object checksum
     cdef public object timestamp
     cdef public object raw  # Can be dict or list
+    cdef readonly FixedPoint fixed_point  # prices and sizes (book and delta) are fixed point ints if set
+
+    def __init__(self, exchange, symbol, bids=None, asks=None, max_depth=0, truncate=False, checksum_format=None, FixedPoint fixed_point=None, tick_book=False, book=None):
+        """
+        tick_book: bool
+            keep the levels in a TickBook rather than an order_book.OrderBook, requires
+            fixed_point and does not compute checksums
+        book: L3Book, L2View
+            the book of the levels, instead of an order_book.OrderBook (max_depth,
+            truncate and checksum_format are then those of the book)
+        """
+        assert not tick_book or (fixed_point is not None and checksum_format is None)
 
-    def __init__(self, exchange, symbol, bids=None, asks=None, max_depth=0, truncate=False, checksum_format=None):
         self.exchange = exchange
         self.symbol = symbol
-        self.book = _OrderBook(max_depth=max_depth, checksum_format=checksum_format, max_depth_strict=truncate)
+        if book is not None:
+            self.book = book
+        elif tick_book:
+            self.book = TickBook(fixed_point.tick, max_depth=max_depth, max_depth_strict=truncate)
+        else:
+            self.book = _OrderBook(max_depth=max_depth, checksum_format=checksum_format, max_depth_strict=truncate)
         if bids:
             self.book.bids = bids
         if asks:
@@ -408,6 +1462,7 @@ cdef class OrderBook:
         self.sequence_number = None
         self.checksum = None
         self.raw = None
+        self.fixed_point = fixed_point
 
     @staticmethod
     def from_dict(data: dict) -> OrderBook:
@@ -418,6 +1473,12 @@ cdef class OrderBook:
         return ob
 
     def _delta(self, numeric_type) -> dict:
+        cdef FixedPoint fp = self.fixed_point
+        if fp is not None:
+            return {
+                side: [(fp.to_price(value[0], numeric_type), fp.to_size(value[1], numeric_type)) + tuple(value[2:]) for value in self.delta[side]]
+                for side in (BID, ASK)
+            }
         return {
             BID: [tuple([numeric_type(v) if isinstance(v, Decimal) else v for v in value]) for value in self.delta[BID]],
             ASK: [tuple([numeric_type(v) if isinstance(v, Decimal) else v for v in value]) for value in self.delta[ASK]]
@@ -434,6 +1495,9 @@ cdef class OrderBook:
             else:
                 return numeric_type(x)
 
+        if self.fixed_point is not None:
+            return self._fixed_point_dict(delta, numeric_type, none_to)
+
         if delta:
             if numeric_type is None:
                 data = {'exchange': self.exchange, 'symbol': self.symbol, 'delta': self.delta, 'timestamp': self.timestamp}
@@ -450,6 +1514,98 @@ cdef class OrderBook:
         data = {'exchange': self.exchange, 'symbol': self.symbol, 'book': book_dict, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
         return data if not none_to else convert_none_values(data, none_to)
 
+    def _fixed_point_dict(self, delta, numeric_type, none_to) -> dict:
+        cdef FixedPoint fp = self.fixed_point
+        if delta:
+            data = {'exchange': self.exchange, 'symbol': self.symbol, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
+            return data if not none_to else convert_none_values(data, none_to)
+
+        book_dict = {
+            side: {fp.to_price(price, numeric_type): fp.to_size(size, numeric_type) for price, size in levels.items()}
+            for side, levels in self.book.to_dict().items()
+        }
+        data = {'exchange': self.exchange, 'symbol': self.symbol, 'book': book_dict, 'delta': self._delta(numeric_type) if self.delta else None, 'timestamp': self.timestamp}
+        return data if not none_to else convert_none_values(data, none_to)
+
+    cdef int _serialize_levels(self, Buffer buf, levels) except -1:
+        # the levels of levels.to_dict(), without building it: len is that of to_dict
+        # (max_depth) while iterating goes through all the levels, from the best price
+        cdef FixedPoint fp = self.fixed_point
+        cdef Py_ssize_t n
+        cdef Py_ssize_t i = 0
+        if isinstance(levels, TickLadder):
+            return (<TickLadder> levels)._serialize(buf, fp)
+        n = len(levels)
+        buf._map(n)
+        for price in levels:
+            if i == n:
+                break
+            i += 1
+            size = levels[price]
+            if fp is not None:
+                buf._double(fp._price_double(price))
+            else:
+                buf._number(price)
+            if isinstance(size, (dict, PriceLevel)):
+                # the orders of an L3 book
+                buf._map(len(size))
+                for order_id, order_size in size.items():
+                    buf._pack(order_id)
+                    buf._number(order_size)
+            elif fp is not None:
+                buf._double(fp._size_double(size))
+            else:
+                buf._number(size)
+        return 0
+
+    cdef int _serialize_delta(self, Buffer buf, list updates) except -1:
+        cdef FixedPoint fp = self.fixed_point
+        buf._array(len(updates))
+        for update in updates:
+            buf._array(len(update))
+            if len(update) == 2 and fp is not None:
+                buf._double(fp._price_double(update[0]))
+                buf._double(fp._size_double(update[1]))
+                continue
+            for value in update:
+                # prices and sizes, and the order ids of L3 updates
+                if isinstance(value, Decimal):
+                    buf._double(float(value))
+                elif len(update) == 2:
+                    buf._number(value)
+                else:
+                    buf._pack(value)
+        return 0
+
+    cpdef bytes serialize(self, receipt_timestamp=None, Buffer buffer=None, delta=False):
+        """
+        to_dict(delta, numeric_type=float) (without the delta of a snapshot) and the receipt
+        timestamp (if not None) in MessagePack, written in buffer (see Buffer) if given
+        """
+        cdef Buffer buf = _buffer(buffer)
+        buf._start(4, receipt_timestamp)
+        buf._field('exchange', self.exchange)
+        buf._field('symbol', self.symbol)
+        if delta:
+            buf._str('delta')
+            if self.delta:
+                buf._map(2)
+                buf._str(BID)
+                self._serialize_delta(buf, self.delta[BID])
+                buf._str(ASK)
+                self._serialize_delta(buf, self.delta[ASK])
+            else:
+                buf._nil()
+        else:
+            buf._str('book')
+            buf._map(2)
+            buf._str(BID)
+            self._serialize_levels(buf, self.book[BID])
+            buf._str(ASK)
+            self._serialize_levels(buf, self.book[ASK])
+        buf._timestamps(self.timestamp, receipt_timestamp)
+        return buf._take()
+
     def __repr__(self):
         return f"exchange: {self.exchange} symbol: {self.symbol} book: {self.book} timestamp: {self.timestamp}"
 
@@ -794,3 +1950,238 @@ cdef class Position:
 
     def __hash__(self):
         return hash(self.__repr__())
+
+
+DEFAULT_BATCH_CAPACITY = 1024
+
+cdef array.array _DOUBLES = _array.array('d')
+cdef array.array _INT64S = _array.array('q')
+cdef array.array _UINT8S = _array.array('B')
+
+
+cdef array.array _grown(array.array column, Py_ssize_t length, Py_ssize_t capacity):
+    # a copy rather than a resize, the views of the old array stay valid
+    cdef array.array grown = array.clone(column, capacity, False)
+    memcpy(grown.data.as_chars, column.data.as_chars, length * column.ob_descr.itemsize)
+    return grown
+
+
+cdef long long _batch_id(str id):
+    # ids are strings, only the (int64) numeric ones fit in the id column
+    if id is not None and 0 < len(id) < 19 and id.isascii() and id.isdigit():
+        return int(id)
+    return -1
+
+
+cdef class _Batch:
+    '''
+    Struct of arrays: each column is an array.array of capacity items, of which the first
+    len(batch) are filled. The columns grow by doubling, into new arrays, so views taken
+    before keep pointing at valid (if no longer current) data.
+    '''
+    cdef readonly str exchange
+    cdef readonly str symbol
+    cdef readonly FixedPoint fixed_point  # prices and sizes are fixed point ints if set
+    cdef readonly Py_ssize_t capacity
+    cdef Py_ssize_t length
+    cdef tuple names
+    cdef list data
+
+    def __init__(self, exchange, symbol, Py_ssize_t capacity, FixedPoint fixed_point, tuple names, tuple templates):
+        assert capacity > 0
+
+        self.exchange = exchange
+        self.symbol = symbol
+        self.fixed_point = fixed_point
+        self.capacity = capacity
+        self.length = 0
+        self.names = names
+        self.data = [array.clone(template, capacity, False) for template in templates]
+
+    cdef void _reserve(self, Py_ssize_t count):
+        cdef Py_ssize_t capacity = self.capacity
+        if self.length + count <= capacity:
+            return
+        while capacity < self.length + count:
+            capacity *= 2
+        self.data = [_grown(column, self.length, capacity) for column in self.data]
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.length
+
+    def clear(self):
+        '''
+        Empties the batch into new arrays of the same capacity, the views of its columns
+        taken before stay valid
+        '''
+        self.data = [array.clone(column, self.capacity, False) for column in self.data]
+        self.length = 0
+
+    def column(self, str name) -> memoryview:
+        '''
+        A zero copy view of the filled part of the column
+        '''
+        return memoryview(self.data[self.names.index(name)])[:self.length]
+
+    def columns(self) -> dict:
+        return {name: memoryview(column)[:self.length] for name, column in zip(self.names, self.data)}
+
+    def to_numpy(self) -> dict:
+        '''
+        The columns as NumPy arrays sharing the memory of the batch
+        '''
+        import numpy as np
+        return {name: np.asarray(view) for name, view in self.columns().items()}
+
+    def __repr__(self):
+        return f'{type(self).__name__}(exchange={self.exchange}, symbol={self.symbol}, length={self.length}, capacity={self.capacity})'
+
+
+cdef class TradeBatch(_Batch):
+    '''
+    The trades of a symbol in columns: timestamp and receipt_timestamp (float seconds, NaN
+    if unknown), side (uint8, 1 for buy and 0 for sell), price and amount (float, or int64
+    fixed point values of fixed_point) and id (int64, -1 if missing or not numeric)
+    '''
+    def __init__(self, exchange, symbol, Py_ssize_t capacity=DEFAULT_BATCH_CAPACITY, FixedPoint fixed_point=None):
+        numbers = _INT64S if fixed_point is not None else _DOUBLES
+        _Batch.__init__(self, exchange, symbol, capacity, fixed_point, ('timestamp', 'receipt_timestamp', 'side', 'price', 'amount', 'id'), (_DOUBLES, _DOUBLES, _UINT8S, numbers, numbers, _INT64S))
+
+    cpdef append(self, trade, receipt_timestamp=None):
+        '''
+        trade: Trade
+            or an object with the same attributes, whose timestamp may be None
+        '''
+        cdef Py_ssize_t i = self.length
+        cdef list data
+        cdef FixedPoint fp = getattr(trade, 'fixed_point', None)
+        timestamp = trade.timestamp
+
+        self._reserve(1)
+        data = self.data
+        (<array.array>data[0]).data.as_doubles[i] = NAN if timestamp is None else timestamp
+        (<array.array>data[1]).data.as_doubles[i] = NAN if receipt_timestamp is None else receipt_timestamp
+        (<array.array>data[2]).data.as_uchars[i] = trade.side == BUY
+        if self.fixed_point is not None:
+            assert fp is self.fixed_point or fp == self.fixed_point
+            (<array.array>data[3]).data.as_longlongs[i] = trade.price
+            (<array.array>data[4]).data.as_longlongs[i] = trade.amount
+        elif fp is not None:
+            (<array.array>data[3]).data.as_doubles[i] = fp._price_double(trade.price)
+            (<array.array>data[4]).data.as_doubles[i] = fp._size_double(trade.amount)
+        else:
+            (<array.array>data[3]).data.as_doubles[i] = trade.price
+            (<array.array>data[4]).data.as_doubles[i] = trade.amount
+        (<array.array>data[5]).data.as_longlongs[i] = _batch_id(trade.id)
+        self.length = i + 1
+
+    def extend(self, trades, receipt_timestamp=None):
+        self._reserve(len(trades))
+        for trade in trades:
+            self.append(trade, receipt_timestamp)
+
+    @property
+    def timestamp(self):
+        return memoryview(self.data[0])[:self.length]
+
+    @property
+    def receipt_timestamp(self):
+        return memoryview(self.data[1])[:self.length]
+
+    @property
+    def side(self):
+        return memoryview(self.data[2])[:self.length]
+
+    @property
+    def price(self):
+        return memoryview(self.data[3])[:self.length]
+
+    @property
+    def amount(self):
+        return memoryview(self.data[4])[:self.length]
+
+    @property
+    def id(self):
+        return memoryview(self.data[5])[:self.length]
+
+
+cdef class BookDeltaBatch(_Batch):
+    '''
+    The levels of the book deltas of a symbol in columns, a row per level: timestamp and
+    receipt_timestamp of the delta (float seconds, NaN if unknown), sequence_number (int64,
+    -1 if unknown), side (uint8, 1 for bid and 0 for ask), price and size (float, or int64
+    fixed point values of fixed_point, size 0 for a removal). The order ids of L3 deltas
+    are left out.
+    '''
+    def __init__(self, exchange, symbol, Py_ssize_t capacity=DEFAULT_BATCH_CAPACITY, FixedPoint fixed_point=None):
+        numbers = _INT64S if fixed_point is not None else _DOUBLES
+        _Batch.__init__(self, exchange, symbol, capacity, fixed_point, ('timestamp', 'receipt_timestamp', 'sequence_number', 'side', 'price', 'size'), (_DOUBLES, _DOUBLES, _INT64S, _UINT8S, numbers, numbers))
+
+    cpdef Py_ssize_t append(self, OrderBook book, receipt_timestamp=None) except -1:
+        '''
+        Adds the levels of the delta of the book, if any (a snapshot adds nothing), and
+        returns their number
+        '''
+        cdef Py_ssize_t i, count
+        cdef list data
+        cdef double timestamp, receipt
+        cdef long long sequence_number
+        cdef bint fixed = self.fixed_point is not None
+        cdef FixedPoint fp = book.fixed_point
+
+        if not book.delta:
+            return 0
+        if fixed:
+            assert fp is self.fixed_point or fp == self.fixed_point
+        count = len(book.delta[BID]) + len(book.delta[ASK])
+        self._reserve(count)
+        data = self.data
+        timestamp = NAN if book.timestamp is None else book.timestamp
+        receipt = NAN if receipt_timestamp is None else receipt_timestamp
+        sequence_number = -1 if book.sequence_number is None else book.sequence_number
+        i = self.length
+        for side in (BID, ASK):
+            for value in book.delta[side]:
+                # L3 deltas are (order id, price, size)
+                price, size = (value[1], value[2]) if len(value) == 3 else (value[0], value[1])
+                (<array.array>data[0]).data.as_doubles[i] = timestamp
+                (<array.array>data[1]).data.as_doubles[i] = receipt
+                (<array.array>data[2]).data.as_longlongs[i] = sequence_number
+                (<array.array>data[3]).data.as_uchars[i] = side == BID
+                if fixed:
+                    (<array.array>data[4]).data.as_longlongs[i] = price
+                    (<array.array>data[5]).data.as_longlongs[i] = size
+                elif fp is not None:
+                    (<array.array>data[4]).data.as_doubles[i] = fp._price_double(price)
+                    (<array.array>data[5]).data.as_doubles[i] = fp._size_double(size)
+                else:
+                    (<array.array>data[4]).data.as_doubles[i] = price
+                    (<array.array>data[5]).data.as_doubles[i] = size
+                i += 1
+        self.length = i
+        return count
+
+    @property
+    def timestamp(self):
+        return memoryview(self.data[0])[:self.length]
+
+    @property
+    def receipt_timestamp(self):
+        return memoryview(self.data[1])[:self.length]
+
+    @property
+    def sequence_number(self):
+        return memoryview(self.data[2])[:self.length]
+
+    @property
+    def side(self):
+        return memoryview(self.data[3])[:self.length]
+
+    @property
+    def price(self):
+        return memoryview(self.data[4])[:self.length]
+
+    @property
+    def size(self):
+        return memoryview(self.data[5])[:self.length]
@@ -0,0 +1,269 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Measured message rates per (exchange, channel, symbol), used to balance
+pairs across worker processes by load instead of by count.
+"""
+
+import asyncio
+import glob
+import logging
+import os
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, Tuple
+
+from yapic import json
+
+LOG = logging.getLogger("feedhandler")
+
+PROFILE_VERSION = 1
+
+
+class RateProfile:
+    """
+    Messages/sec and bytes/sec per (exchange, channel, symbol).
+
+    A profile is persisted as json, either as a single file or as a directory of files (one
+    per worker). When loading a directory the most recently updated entry for each key wins.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        """
+        alpha: float
+            weight given to a new measurement in the exponentially weighted moving average
+        """
+        self.alpha = alpha
+        self.rates: Dict[Tuple[str, str, str], dict] = {}
+
+    def __bool__(self):
+        return len(self.rates) > 0
+
+    def update(
+        self,
+        exchange: str,
+        channel: str,
+        symbol: str,
+        messages: float,
+        nbytes: float,
+        timestamp: float = None,
+    ):
+        key = (exchange, channel, symbol)
+        timestamp = timestamp if timestamp else time.time()
+        if key in self.rates:
+            entry = self.rates[key]
+            entry["messages"] += self.alpha * (messages - entry["messages"])
+            entry["bytes"] += self.alpha * (nbytes - entry["bytes"])
+            entry["updated"] = timestamp
+        else:
+            self.rates[key] = {
+                "messages": messages,
+                "bytes": nbytes,
+                "updated": timestamp,
+            }
+
+    def merge(self, other: "RateProfile"):
+        for key, entry in other.rates.items():
+            if key not in self.rates or self.rates[key]["updated"] < entry["updated"]:
+                self.rates[key] = dict(entry)
+
+    def pair_rates(self) -> Dict[Tuple[str, str], Tuple[float, float]]:
+        """
+        messages/sec and bytes/sec per (exchange, symbol), summed over channels
+        """
+        ret = defaultdict(lambda: [0.0, 0.0])
+        for (exchange, _, symbol), entry in self.rates.items():
+            ret[(exchange, symbol)][0] += entry["messages"]
+            ret[(exchange, symbol)][1] += entry["bytes"]
+        return {key: tuple(value) for key, value in ret.items()}
+
+    def pair_weights(self, pairs: list) -> list:
+        """
+        pairs: list of (exchange, symbol) tuples
+
+        Returns one weight per pair. Message and byte rates are normalized by their totals and
+        summed, so both dimensions count equally. Pairs missing from the profile are given the
+        median weight of the known pairs.
+        """
+        rates = self.pair_rates()
+        total_msgs = sum(r[0] for r in rates.values()) or 1.0
+        total_bytes = sum(r[1] for r in rates.values()) or 1.0
+        known = {
+            key: r[0] / total_msgs + r[1] / total_bytes for key, r in rates.items()
+        }
+        default = statistics.median(known.values()) if known else 1.0
+        return [known.get(pair, default) for pair in pairs]
+
+    def to_dict(self) -> dict:
+        return {
+            "version": PROFILE_VERSION,
+            "rates": [
+                {"exchange": exchange, "channel": channel, "symbol": symbol, **entry}
+                for (exchange, channel, symbol), entry in self.rates.items()
+            ],
+        }
+
+    def save(self, filename: str):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{filename}.tmp"
+        with open(tmp, "w") as fp:
+            fp.write(json.dumps(self.to_dict()))
+        os.replace(tmp, filename)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "RateProfile":
+        """
+        path: str
+            a profile file, or a directory of profile files. Missing or invalid files are ignored.
+        """
+        profile = cls(**kwargs)
+        if not path or not os.path.exists(path):
+            return profile
+        files = (
+            sorted(glob.glob(os.path.join(path, "*.json")))
+            if os.path.isdir(path)
+            else [path]
+        )
+        for filename in files:
+            try:
+                with open(filename) as fp:
+                    data = json.loads(fp.read())
+            except (OSError, ValueError):
+                LOG.warning("RateProfile: unable to read %s, ignoring it", filename)
+                continue
+            if data.get("version") != PROFILE_VERSION:
+                LOG.warning(
+                    "RateProfile: %s has an unsupported version, ignoring it", filename
+                )
+                continue
+            other = cls(**kwargs)
+            for entry in data["rates"]:
+                other.rates[(entry["exchange"], entry["channel"], entry["symbol"])] = {
+                    "messages": entry["messages"],
+                    "bytes": entry["bytes"],
+                    "updated": entry["updated"],
+                }
+            profile.merge(other)
+        return profile
+
+
+class RateCallback:
+    """
+    Per channel callback counting the updates a feed delivers. Created by RateRecorder.instrument
+    """
+
+    def __init__(self, counts: dict, recorder: "RateRecorder", channel: str):
+        self.counts = counts
+        self.recorder = recorder
+        self.channel = channel
+
+    async def __call__(self, obj, receipt_timestamp: float):
+        self.counts[(self.channel, obj.symbol)] += 1
+
+    def start(self, loop: asyncio.AbstractEventLoop, multiprocess=False):
+        self.recorder.start(loop)
+
+    async def stop(self):
+        await self.recorder.stop()
+
+
+class RateRecorder:
+    """
+    Measures the message and byte rates of the feeds of a worker and periodically saves them to
+    a RateProfile file.
+
+    Bytes are counted per websocket connection, so a feed's bytes are attributed to its
+    (channel, symbol) keys in proportion to the number of updates each key delivered.
+    """
+
+    def __init__(self, filename: str, interval: float = 60, alpha: float = 0.3):
+        """
+        filename: str
+            file the profile is saved to. Give each worker its own file in a shared directory,
+            and load the directory with RateProfile.load.
+        interval: float
+            seconds between measurements
+        """
+        self.filename = filename
+        self.interval = interval
+        self.profile = RateProfile.load(filename, alpha=alpha)
+        # feed -> [update counts per (channel, symbol), bytes received at last flush]
+        self.feeds = {}
+        self.last_flush = None
+        self.task = None
+
+    def instrument(self, feed):
+        """
+        Add a counting callback to every channel the feed is subscribed to
+        """
+        counts = defaultdict(int)
+        for channel, symbols in feed._feed_config.items():
+            for symbol in symbols:
+                counts[(channel, str(symbol))] = 0
+            feed.callbacks[channel].append(RateCallback(counts, self, channel))
+        self.feeds[feed] = [counts, 0]
+
+    def forget(self, feed):
+        """
+        Stop measuring a feed that has been removed
+        """
+        self.feeds.pop(feed, None)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self.task is not None:
+            return
+        self.last_flush = time.time()
+        self.task = loop.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        task, self.task = self.task, None
+        task.cancel()
+        self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        now = time.time()
+        elapsed = now - self.last_flush
+        if elapsed <= 0:
+            return
+        for feed, state in self.feeds.items():
+            counts, last_bytes = state
+            nbytes = sum(
+                getattr(c.conn, "received_bytes", 0) for c in feed.connection_handlers
+            )
+            delta_bytes = nbytes - last_bytes
+            total = sum(counts.values())
+            for key, count in counts.items():
+                channel, symbol = key
+                self.profile.update(
+                    feed.id,
+                    channel,
+                    symbol,
+                    count / elapsed,
+                    delta_bytes * count / total / elapsed if total else 0.0,
+                    timestamp=now,
+                )
+                counts[key] = 0
+            state[1] = nbytes
+        self.last_flush = now
+        try:
+            self.profile.save(self.filename)
+        except OSError:
+            LOG.error(
+                "RateRecorder: unable to save rate profile to %s",
+                self.filename,
+                exc_info=True,
+            )
@@ -1,3 +1,4 @@
+import heapq
 from typing import List
 
 
@@ -20,3 +21,24 @@ def list_by_max_items(large_list: list, max_items: int) -> List[list]:
     """
     number_of_lists = max(1, len(large_list) // max_items)
     return in_x_smaller_lists(large_list, number_of_lists)
+
+
+def by_weight(large_list: list, weights: list, number_of_lists: int) -> List[list]:
+    """
+    Split one large list into number_of_lists smaller ones with about the same total weight.
+
+    Greedy longest processing time partitioning: items are handed out heaviest first, each to
+    the currently lightest list. Empty lists are dropped.
+    """
+    if not large_list:
+        return []
+    number_of_lists = max(1, min(number_of_lists, len(large_list)))
+    loads = [(0.0, i) for i in range(number_of_lists)]
+    ret = [[] for _ in range(number_of_lists)]
+    for weight, item in sorted(
+        zip(weights, large_list), key=lambda x: x[0], reverse=True
+    ):
+        load, i = heapq.heappop(loads)
+        ret[i].append(item)
+        heapq.heappush(loads, (load + weight, i))
+    return [lst for lst in ret if lst]
@@ -5,6 +5,52 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 """
 
+import time
+
+# wall clock time of the monotonic clock's origin, see time_ns
+_anchor_ns = time.time_ns() - time.monotonic_ns()
+
+
+def time_ns() -> int:
+    """
+    Wall clock time in integer nanoseconds that advances with the monotonic clock: it never
+    goes backwards when the system clock is adjusted, so receipt timestamps order messages
+    as they arrived
+    """
+    return _anchor_ns + time.monotonic_ns()
+
+
+class ReceiptTimestamp(float):
+    """
+    A receipt timestamp in seconds, usable as the float it always was, that also keeps the
+    exact integer nanoseconds it was taken at in ns
+    """
+
+    __slots__ = ("ns",)
+
+    def __new__(cls, ns: int):
+        timestamp = super().__new__(cls, ns / 1e9)
+        timestamp.ns = ns
+        return timestamp
+
+    def __reduce__(self):
+        return ReceiptTimestamp, (self.ns,)
+
+
+def to_ns(timestamp) -> int:
+    """
+    Integer nanoseconds of a timestamp in seconds (exact for a ReceiptTimestamp)
+    """
+    ns = getattr(timestamp, "ns", None)
+    return ns if ns is not None else int(timestamp * 1_000_000_000)
+
+
+def to_seconds(timestamp) -> float:
+    """
+    Float seconds of a timestamp in seconds or, if an int, in nanoseconds
+    """
+    return timestamp / 1e9 if isinstance(timestamp, int) else float(timestamp)
+
 
 def timedelta_str_to_sec(td: str):
     if td == "1m":
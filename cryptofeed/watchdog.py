@@ -0,0 +1,131 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import weakref
+from typing import Awaitable, Callable, Optional
+
+LOG = logging.getLogger("feedhandler")
+
+
+class Watch:
+    __slots__ = ("name", "last_seen", "timeout", "callback", "started", "cancelled")
+
+    def __init__(
+        self,
+        name: str,
+        last_seen: Callable[[], Optional[float]],
+        timeout: float,
+        callback: Callable[[], Awaitable],
+    ):
+        self.name = name
+        self.last_seen = last_seen
+        self.timeout = timeout
+        self.callback = callback
+        self.started = time.time()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Watchdog:
+    """
+    Tracks the activity deadlines of all the connections and subscriptions of an event loop,
+    with a single timer instead of one polling task per connection.
+
+    Watches are kept in a heap ordered by deadline. Deadlines are updated lazily: activity
+    does not touch the heap, instead a watch coming due re-reads its last activity and is
+    pushed back to last activity + timeout if there was any since. The callback is invoked
+    (once) when there was none.
+    """
+
+    _watchdogs = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get(cls, loop: asyncio.AbstractEventLoop = None) -> "Watchdog":
+        """
+        The watchdog of the loop (by default the running loop)
+        """
+        loop = loop if loop else asyncio.get_running_loop()
+        if loop not in cls._watchdogs:
+            cls._watchdogs[loop] = cls(loop)
+        return cls._watchdogs[loop]
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.heap = []
+        self.seq = itertools.count()
+        self.timer = None
+        self.tasks = set()
+
+    def __len__(self):
+        return sum(1 for _, _, watch in self.heap if not watch.cancelled)
+
+    def watch(
+        self,
+        last_seen: Callable[[], Optional[float]],
+        timeout: float,
+        callback: Callable[[], Awaitable],
+        name: str = "",
+    ) -> Watch:
+        """
+        last_seen: callable
+            returns the time (time.time()) of the last activity, or None if there was none
+        timeout: float
+            seconds without activity after which callback is invoked
+        callback: coroutine function
+            invoked without arguments when the watch times out
+
+        Returns the Watch, cancel it when the watched object goes away.
+        """
+        watch = Watch(name, last_seen, timeout, callback)
+        self._push(watch.started + timeout, watch)
+        return watch
+
+    def _push(self, deadline: float, watch: Watch):
+        heapq.heappush(self.heap, (deadline, next(self.seq), watch))
+        if self.heap[0][2] is watch:
+            self._schedule()
+
+    def _schedule(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = self.loop.call_later(
+            max(0.0, self.heap[0][0] - time.time()), self._expire
+        )
+
+    def _expire(self):
+        self.timer = None
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, watch = heapq.heappop(self.heap)
+            if watch.cancelled:
+                continue
+            last_seen = watch.last_seen()
+            deadline = max(last_seen or 0, watch.started) + watch.timeout
+            if deadline > now:
+                heapq.heappush(self.heap, (deadline, next(self.seq), watch))
+                continue
+            watch.cancelled = True
+            task = self.loop.create_task(self._invoke(watch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        if self.heap:
+            self._schedule()
+
+    async def _invoke(self, watch: Watch):
+        try:
+            await watch.callback()
+        except Exception:
+            LOG.error(
+                "Watchdog: timeout handler of %s failed", watch.name, exc_info=True
+            )
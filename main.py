@@ -1,17 +1,38 @@
+import asyncio
+import logging
 import os
 import math
 import multiprocessing
 
 from dotenv import load_dotenv
 
-from cryptofeed import FeedHandler
 from cryptofeed import defines as callbacks
-from cryptofeed.backends import redis
+from cryptofeed.backends.pool import WriterPool
+from cryptofeed.backends.redis import RedisStreamSink
+from cryptofeed.coordinator import ShardCoordinator
 from cryptofeed.exchanges import EXCHANGE_MAP
-
+from cryptofeed.reloader import TopologyReloader
+from cryptofeed.shards import ShardRebalancer, ShardWorker
+from cryptofeed.symbols import Symbols
+from cryptofeed.supervisor import WorkerSupervisor
+from cryptofeed.topology import Topology, build_callback
+from cryptofeed.util import split
+from cryptofeed.util.rates import RateProfile
 
 load_dotenv()
 
+LOG = logging.getLogger("feedhandler")
+
+DEFAULT_CHANNELS = {
+    callbacks.L2_BOOK: {"backend": "redis.BookStream"},
+    callbacks.TRADES: {"backend": "redis.TradeStream"},
+    # callbacks.FUNDING: {"backend": "redis.FundingStream"},
+    # callbacks.TICKER: {"backend": "redis.TickerStream"},
+    # callbacks.OPEN_INTEREST: {"backend": "redis.OpenInterestStream"},
+    # callbacks.LIQUIDATIONS: {"backend": "redis.LiquidationsStream"},
+    # callbacks.CANDLES: {"backend": "redis.CandlesStream"},
+}
+
 BASE_CONFIG = {
     "log": {"disabled": True},
     "backend_multiprocessing": True,
@@ -35,7 +56,76 @@ class MarketDataAggregator:
         pairs: list = None,
         ref_currency: str = None,
         max_cpu_amount: int = None,
+        pack_pairs: bool = True,
+        rate_profile: str = None,
+        pinned_pairs: list = None,
+        symbol_cache: dict = None,
+        start_method: str = None,
+        gc_freeze: bool = False,
+        coordinator: dict = None,
+        exchange_filters: dict = None,
+        channels: dict = None,
+        feed_config: dict = None,
+        sharding: str = "load",
+        topology_file: str = None,
+        writer_pool: dict = None,
+        metrics: dict = None,
     ):
+        """
+        pack_pairs: bool
+            if True, a single Feed is created per exchange (per process) with all of the
+            process' pairs, and the Feed splits them across websocket connections only as far
+            as the exchange's endpoint limits require. If False, one Feed (and therefore one
+            websocket connection) is created per pair.
+        rate_profile: str
+            directory where each worker records the measured message and byte rates of its
+            pairs. When it holds a profile from a previous run, pairs are split between
+            processes by load instead of by count.
+        pinned_pairs: list of (exchange, pair) tuples
+            hot pairs that each get a dedicated process. Only used for load based splitting.
+        symbol_cache: dict
+            keyword arguments for Symbols.enable_cache (directory, ttl, refresh_interval). If
+            set, exchange symbols are loaded from an on-disk cache instead of being fetched
+            on every start.
+        start_method: str
+            multiprocessing start method of the worker processes. "forkserver" forks the workers
+            from a template process that has preloaded the exchange modules and the symbols, so
+            restarted workers do not copy the supervisor's memory nor fetch the symbols again.
+        gc_freeze: bool
+            gc.freeze the preloaded objects before forking the workers, so they stay shared
+            copy-on-write
+        coordinator: dict
+            enables running on several hosts. Keyword arguments for LeaseRegistry (url,
+            namespace, ttl, node_id) plus shards, the number of shards the pairs are split
+            into for the whole cluster (defaults to the number of processes of the first
+            host). Each host claims its share of the shards through leases in redis, see
+            ShardCoordinator. Singleton REST pollers run on one host only.
+        exchange_filters: dict
+            exchange -> dict with pairs and/or ref_currency, overriding the global filters
+            for that exchange, and optionally redundancy / redundant_addresses / ingress /
+            decoder (see Feed)
+        channels: dict
+            channel -> dict with the backend class (see cryptofeed.topology.load_backend) and
+            its constructor arguments. Defaults to DEFAULT_CHANNELS.
+        feed_config: dict
+            merged into the config of every feed
+        sharding: str
+            "load" splits the pairs by their recorded message rates when a rate profile is
+            available, "count" always splits them evenly by number
+        topology_file: str
+            yaml file the aggregator was created from (see from_topology). If the topology
+            sets reload_interval, changes to the file are applied to the running workers.
+        writer_pool: dict
+            if set, the backends of all workers write through a shared pool of writer
+            processes instead of a writer process per backend per worker. Keys: size (number
+            of writer processes), max_batch, and host / port of redis.
+        metrics: dict
+            if set, every worker serves its metrics in the Prometheus text format (see
+            cryptofeed.metrics): worker (or shard) i on port + i, followed by the writer
+            pool members. Keys: host, port, loop_interval.
+        """
+        if symbol_cache:
+            Symbols.enable_cache(**symbol_cache)
         self.cpu_amount = (
             max_cpu_amount if max_cpu_amount else multiprocessing.cpu_count()
         )
@@ -46,38 +136,95 @@ class MarketDataAggregator:
         )
         self.pairs = pairs
         self.ref_currency = ref_currency
+        self.pack_pairs = pack_pairs
+        self.rate_profile = rate_profile
+        self.pinned_pairs = [tuple(pair) for pair in pinned_pairs or []]
+        self.start_method = start_method
+        self.gc_freeze = gc_freeze
+        self.coordinator = dict(coordinator) if coordinator else None
+        self.exchange_filters = exchange_filters if exchange_filters else {}
+        self.channels = channels if channels else DEFAULT_CHANNELS
+        self.feed_config = feed_config if feed_config else {}
+        self.sharding = sharding
+        self.topology_file = topology_file
+        self.writer_pool_config = dict(writer_pool) if writer_pool else None
+        self.writer_pool = None
+        self.metrics = dict(metrics) if metrics else None
         self.markets = self.get_markets()
 
-    @staticmethod
-    def get_feed_config(exchange_name: str) -> dict:
-        feed_config = BASE_CONFIG.copy()
+    @classmethod
+    def from_topology(cls, topology_file: str) -> "MarketDataAggregator":
+        return cls(
+            **Topology(topology_file).aggregator_kwargs(), topology_file=topology_file
+        )
+
+    def get_feed_config(self, exchange_name: str) -> dict:
+        feed_config = {**BASE_CONFIG, **self.feed_config}
+        if self.coordinator:
+            feed_config["lease"] = {
+                k: v
+                for k, v in self.coordinator.items()
+                if k in ("url", "namespace", "ttl")
+            }
+        if feed_config.get("admission") is not False:
+            # every worker connects from this host, split the exchange limits between them
+            feed_config["admission"] = {
+                "share": 1 / self.cpu_amount,
+                **feed_config.get("admission", {}),
+            }
         keys = get_api_keys(exchange_name.lower(), websocket=True)
         if keys:
             feed_config[exchange_name.lower()] = keys
         return feed_config
 
     def get_markets(self) -> dict:
+        """
+        Raises ValueError if the symbols of an exchange named in the exchanges could not
+        be loaded. When running every supported exchange, those are skipped.
+        """
         markets = dict()
+        # fetch the instruments of all exchanges concurrently rather than one after another
+        errors = asyncio.run(
+            Symbols.load_all_async(
+                self.exchanges,
+                configs={name: self.get_feed_config(name) for name in self.exchanges},
+            )
+        )
+        if errors and self.exchanges is not EXCHANGE_MAP:
+            raise ValueError(f"Unable to load the symbols of {', '.join(errors)}")
         for exchange_name, exchange_object in self.exchanges.items():
-            config = self.get_feed_config(exchange_name)
-            pairs = exchange_object.symbols(config)
+            if not Symbols.populated(exchange_object.id):
+                LOG.warning("%s: no symbols, the exchange is not run", exchange_name)
+                continue
+            pairs = Symbols.get(exchange_object.id)[0]
+            filters = self.exchange_filters.get(exchange_name, {})
+            pair_filter = filters.get("pairs", self.pairs)
+            ref_currency = filters.get("ref_currency", self.ref_currency)
             filtered_pairs = list()
             for pair in pairs:
-                if not self.pairs or pair in self.pairs:
+                if not pair_filter or pair in pair_filter:
                     _, quote = pair.split("-")
                     if "PINDEX" not in pair and (
-                        not self.ref_currency or quote == self.ref_currency
+                        not ref_currency or quote == ref_currency
                     ):
                         filtered_pairs.append(pair)
             if filtered_pairs:
                 markets[exchange_name] = filtered_pairs
         return markets
 
-    def break_down_pairs_per_cpu(self) -> list:
+    def break_down_pairs_per_cpu(self, shards: int = None) -> list:
+        """
+        shards: int
+            number of lists to split the pairs into, defaults to the number of processes
+        """
+        shards = shards if shards else self.cpu_amount
+        profile = RateProfile.load(self.rate_profile)
+        if profile and self.sharding == "load":
+            return self.break_down_pairs_by_load(profile, shards)
         total_amount_of_pairs = 0
         for pairs in self.markets.values():
             total_amount_of_pairs += len(pairs)
-        symbols_per_process = math.ceil(total_amount_of_pairs / self.cpu_amount)
+        symbols_per_process = math.ceil(total_amount_of_pairs / shards)
         current_sub_dict = dict()
         sub_lists = list()
         for exchange, exchange_pairs in self.markets.items():
@@ -94,41 +241,195 @@ class MarketDataAggregator:
         sub_lists.append(current_sub_dict)
         return sub_lists
 
-    def run_process(self, markets: dict):
-        f = FeedHandler()
-        all_callbacks = {
-            callbacks.L2_BOOK: redis.BookStream(),
-            callbacks.TRADES: redis.TradeStream(),
-            # callbacks.FUNDING: redis.FundingStream,
-            # callbacks.TICKER: redis.TickerStream,
-            # callbacks.OPEN_INTEREST: redis.OpenInterestStream,
-            # callbacks.LIQUIDATIONS: redis.LiquidationsStream,
-            # callbacks.CANDLES: redis.CandlesStream,
+    def break_down_pairs_by_load(
+        self, profile: RateProfile, shards: int = None
+    ) -> list:
+        pairs = [
+            (exchange, pair)
+            for exchange, exchange_pairs in self.markets.items()
+            for pair in exchange_pairs
+        ]
+        pinned = [pair for pair in pairs if pair in self.pinned_pairs]
+        pairs = [pair for pair in pairs if pair not in self.pinned_pairs]
+        number_of_shards = shards if shards else self.cpu_amount
+        shards = [[pair] for pair in pinned]
+        shards.extend(
+            split.by_weight(
+                pairs,
+                profile.pair_weights(pairs),
+                max(1, number_of_shards - len(shards)),
+            )
+        )
+
+        sub_lists = list()
+        for shard in shards:
+            current_sub_dict = dict()
+            for exchange, pair in shard:
+                current_sub_dict.setdefault(exchange, list()).append(pair)
+            sub_lists.append(current_sub_dict)
+        return sub_lists
+
+    def build_callback(self, spec: dict):
+        callback = build_callback(spec)
+        if self.writer_pool is not None:
+            callback.use_pool(self.writer_pool)
+        return callback
+
+    def get_callbacks(self) -> dict:
+        return {
+            channel: self.build_callback(spec)
+            for channel, spec in self.channels.items()
         }
+
+    def metrics_config(self, index: int) -> dict:
+        """
+        Metrics endpoint of the index-th process of the host (workers first)
+        """
+        if not self.metrics:
+            return None
+        return {**self.metrics, "port": self.metrics.get("port", 9100) + index}
+
+    def start_writer_pool(self):
+        config = dict(self.writer_pool_config)
+        pool_kwargs = {k: config.pop(k) for k in ("size", "max_batch") if k in config}
+        # after the ports of the workers, numbered by shard with a coordinator
+        shards = (
+            self.coordinator.get("shards", self.cpu_amount)
+            if self.coordinator
+            else self.cpu_amount
+        )
+        pool_kwargs["metrics"] = self.metrics_config(shards)
+        self.writer_pool = WriterPool(RedisStreamSink(**config), **pool_kwargs)
+        self.writer_pool.start()
+
+    def create_feeds(self, markets: dict, all_callbacks: dict) -> list:
+        feeds = list()
         for exchange, exchange_pairs in markets.items():
             config = self.get_feed_config(exchange)
-            for pair in exchange_pairs:
-                f.add_feed(
-                    EXCHANGE_MAP[exchange](
-                        channels=list(all_callbacks.keys()),
-                        symbols=[pair],
-                        callbacks=all_callbacks,
-                        config=config,
-                    )
+            pair_groups = (
+                [exchange_pairs]
+                if self.pack_pairs
+                else [[pair] for pair in exchange_pairs]
+            )
+            channels = [
+                channel
+                for channel in all_callbacks
+                if channel in EXCHANGE_MAP[exchange].websocket_channels
+            ]
+            if len(channels) < len(all_callbacks):
+                LOG.warning(
+                    "%s does not support channels %s",
+                    exchange,
+                    [c for c in all_callbacks if c not in channels],
+                )
+            filters = self.exchange_filters.get(exchange, {})
+            stale_after = {
+                channel: self.channels[channel]["stale_after"]
+                for channel in channels
+                if "stale_after" in self.channels.get(channel, {})
+            }
+            for pairs in pair_groups:
+                # pinned (hot) pairs reconnect first
+                pinned = any((exchange, pair) in self.pinned_pairs for pair in pairs)
+                priority = 0 if pinned else 1
+                kwargs = dict(
+                    channels=channels,
+                    config=config,
+                    stale_after=stale_after,
+                    priority=priority,
+                    ingress=filters.get("ingress"),
+                    decoder=filters.get("decoder"),
+                    # exact receipt times for the backends writing nanoseconds
+                    timestamp_ns=any(
+                        spec.get("timestamp_ns") for spec in self.channels.values()
+                    ),
                 )
-        f.run()
+                redundancy = filters.get("redundancy", 1)
+                feed = EXCHANGE_MAP[exchange](
+                    symbols=pairs,
+                    callbacks=all_callbacks,
+                    redundancy=redundancy,
+                    redundant_addresses=filters.get("redundant_addresses"),
+                    **kwargs,
+                )
+                # same arguments, the replicas deliver through the feed (see Feed.add_replica)
+                for _ in range(1, redundancy):
+                    feed.add_replica(
+                        EXCHANGE_MAP[exchange](symbols=list(pairs), **kwargs)
+                    )
+                feeds.append(feed)
+        return feeds
+
+    def run_process(self, markets: dict, worker_id: int = 0, conn=None):
+        ShardWorker(self, markets, worker_id).run(conn)
+
+    def start_all_feeds(self, rebalance: bool = True):
+        """
+        Start one supervised worker process per shard and block until SIGINT/SIGTERM
 
-    def start_all_feeds(self):
-        sub_markets = self.break_down_pairs_per_cpu()
-        processes = list()
-        for markets in sub_markets:
-            process = multiprocessing.Process(target=self.run_process, args=(markets,))
-            processes.append(process)
-            process.start()
+        rebalance: bool
+            if True, pairs are moved away from workers whose event loop lags or whose
+            backend queues grow, see ShardRebalancer. Not used when running on several
+            hosts, as the shards are shared by the cluster.
+        """
+        coordinator = (
+            ShardCoordinator(self, **self.coordinator) if self.coordinator else None
+        )
+        rebalancer = ShardRebalancer(self) if rebalance and not coordinator else None
+        reload_interval = (
+            Topology(self.topology_file).reload_interval if self.topology_file else 0
+        )
+        reloader = (
+            TopologyReloader(
+                self,
+                reload_interval,
+                rebalancer,
+                coordinator,
+                default_channels=DEFAULT_CHANNELS,
+            )
+            if reload_interval
+            else None
+        )
+        if self.writer_pool_config:
+            # before the workers are started, so they get the addresses of its members
+            self.start_writer_pool()
+        handlers = [
+            h
+            for h in (coordinator, rebalancer, reloader, self.writer_pool)
+            if h is not None
+        ]
+
+        def on_message(worker, msg: dict):
+            for handler in handlers:
+                if hasattr(handler, "on_message"):
+                    handler.on_message(worker, msg)
+
+        def on_tick(supervisor: WorkerSupervisor):
+            for handler in handlers:
+                handler.on_tick(supervisor)
+
+        supervisor = WorkerSupervisor(
+            on_message=on_message,
+            on_tick=on_tick,
+            start_method=self.start_method,
+            gc_freeze=self.gc_freeze,
+        )
+        if coordinator is None:
+            for worker_id, markets in enumerate(self.break_down_pairs_per_cpu()):
+                supervisor.add_worker(self.run_process, args=(markets, worker_id))
+        try:
+            supervisor.run()
+        finally:
+            if coordinator is not None:
+                coordinator.close()
+            if self.writer_pool is not None:
+                self.writer_pool.stop()
 
 
 if __name__ == "__main__":
-    aggregator = MarketDataAggregator(exchanges=["COINBASE"], ref_currency="USD")
+    topology_file = os.getenv("TOPOLOGY_FILE", "topology.yaml")
+    if os.path.exists(topology_file):
+        aggregator = MarketDataAggregator.from_topology(topology_file)
+    else:
+        aggregator = MarketDataAggregator(exchanges=["COINBASE"], ref_currency="USD")
     aggregator.start_all_feeds()
-    while True:
-        pass
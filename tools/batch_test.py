@@ -0,0 +1,230 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Fills TradeBatch and BookDeltaBatch with random trades and book deltas (float and fixed
+point, L2 and L3) from a small capacity, to go through their growth, and checks their
+columns against the updates. With NumPy installed, also checks that the arrays of
+to_numpy share the memory of the batch, and that views taken before a growth or a clear
+keep their data. Times the appends against to_dict.
+"""
+
+import random
+import timeit
+from decimal import Decimal
+
+from cryptofeed.defines import ASK, BID, BUY, SELL
+from cryptofeed.types import (
+    BookDeltaBatch,
+    FixedPoint,
+    L3Book,
+    OrderBook,
+    Trade,
+    TradeBatch,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FP = FixedPoint.from_increments("0.01", "0.0001")
+COUNT = 5000
+
+
+def random_trades(rnd: random.Random, fixed_point: bool) -> list:
+    trades = []
+    for i in range(COUNT):
+        price = Decimal(rnd.randint(1, 10**7)) / 100
+        amount = Decimal(rnd.randint(1, 10**6)) / 10**4
+        trades.append(
+            Trade(
+                "COINBASE",
+                "BTC-USD",
+                rnd.choice((BUY, SELL)),
+                FP.size(amount) if fixed_point else amount,
+                FP.price(price) if fixed_point else price,
+                1.7e9 + i,
+                id=rnd.choice((str(i), None, f"uuid-{i}")),
+                fixed_point=FP if fixed_point else None,
+            )
+        )
+    return trades
+
+
+def check_trades(rnd: random.Random):
+    for fixed_point in (False, True):
+        trades = random_trades(rnd, fixed_point)
+        # float columns from fixed point trades too
+        for batch_fixed_point in {None, FP if fixed_point else None}:
+            batch = TradeBatch(
+                "COINBASE", "BTC-USD", capacity=4, fixed_point=batch_fixed_point
+            )
+            first = None
+            for i, trade in enumerate(trades):
+                batch.append(trade, 2e9 + i if i % 10 else None)
+                if i == 0:
+                    first = batch.price
+            assert len(batch) == len(trades)
+            assert list(first) == [batch.price[0]]
+            for i, trade in enumerate(trades):
+                assert batch.timestamp[i] == trade.timestamp
+                receipt = batch.receipt_timestamp[i]
+                assert receipt == 2e9 + i if i % 10 else receipt != receipt
+                assert batch.side[i] == (trade.side == BUY)
+                if batch_fixed_point is not None:
+                    assert batch.price[i] == trade.price
+                    assert batch.amount[i] == trade.amount
+                elif fixed_point:
+                    assert batch.price[i] == float(FP.to_price(trade.price))
+                    assert batch.amount[i] == float(FP.to_size(trade.amount))
+                else:
+                    assert batch.price[i] == float(trade.price)
+                    assert batch.amount[i] == float(trade.amount)
+                numeric = trade.id is not None and trade.id.isdigit()
+                assert batch.id[i] == (int(trade.id) if numeric else -1)
+    print("Checked", 3 * COUNT, "trades")
+
+
+def check_deltas(rnd: random.Random):
+    batch = BookDeltaBatch("COINBASE", "BTC-USD", capacity=4)
+    fixed = BookDeltaBatch("COINBASE", "BTC-USD", capacity=4, fixed_point=FP)
+    book = OrderBook("COINBASE", "BTC-USD")
+    fp_book = OrderBook("COINBASE", "BTC-USD", fixed_point=FP, tick_book=True)
+    l3_book = OrderBook("BITFINEX", "BTC-USD", book=L3Book())
+    rows = []
+    fixed_rows = []
+    for i in range(COUNT):
+        levels = {
+            side: [
+                (rnd.randint(1, 10**6), rnd.randint(0, 10**6))
+                for _ in range(rnd.randint(0, 3))
+            ]
+            for side in (BID, ASK)
+        }
+        sequence_number = i if i % 7 else None
+        timestamp = 1.7e9 + i if i % 5 else None
+        if i % 3 == 0:
+            fp_book.delta = levels
+            fp_book.sequence_number = sequence_number
+            fp_book.timestamp = timestamp
+            fixed.append(fp_book, 2e9 + i)
+            fixed_rows += [
+                (side == BID, price, size)
+                for side in (BID, ASK)
+                for price, size in levels[side]
+            ]
+            target = fp_book
+        elif i % 3 == 1:
+            book.delta = {
+                side: [(Decimal(p) / 100, Decimal(s) / 10**4) for p, s in values]
+                for side, values in levels.items()
+            }
+            target = book
+        else:
+            l3_book.delta = {
+                side: [
+                    (f"id-{p}", Decimal(p) / 100, Decimal(s) / 10**4) for p, s in values
+                ]
+                for side, values in levels.items()
+            }
+            target = l3_book
+        target.sequence_number = sequence_number
+        target.timestamp = timestamp
+        added = batch.append(target, 2e9 + i)
+        assert added == len(levels[BID]) + len(levels[ASK])
+        for side in (BID, ASK):
+            for price, size in levels[side]:
+                if target is fp_book:
+                    price, size = float(FP.to_price(price)), float(FP.to_size(size))
+                else:
+                    price, size = price / 100, size / 10**4
+                rows.append(
+                    (
+                        -1 if timestamp is None else timestamp,
+                        2e9 + i,
+                        -1 if sequence_number is None else sequence_number,
+                        side == BID,
+                        price,
+                        size,
+                    )
+                )
+    snapshot = OrderBook("COINBASE", "BTC-USD")
+    assert batch.append(snapshot) == 0
+    assert len(batch) == len(rows)
+    columns = [
+        batch.timestamp,
+        batch.receipt_timestamp,
+        batch.sequence_number,
+        batch.side,
+        batch.price,
+        batch.size,
+    ]
+    for i, row in enumerate(rows):
+        got = [column[i] for column in columns]
+        # NaN for the unknown timestamps
+        got[0] = -1 if got[0] != got[0] else got[0]
+        assert got[:4] == list(row[:4]), (i, got, row)
+        assert abs(got[4] - row[4]) <= 1e-9 * abs(row[4])
+        assert abs(got[5] - row[5]) <= 1e-9 * abs(row[5])
+    assert len(fixed) == len(fixed_rows)
+    assert [
+        (fixed.side[i], fixed.price[i], fixed.size[i]) for i in range(len(fixed))
+    ] == fixed_rows
+    print("Checked", len(rows), "delta levels")
+
+
+def check_numpy(rnd: random.Random):
+    if np is None:
+        print("NumPy is not installed, skipping the NumPy checks")
+        return
+    batch = TradeBatch("COINBASE", "BTC-USD", capacity=4)
+    batch.extend(random_trades(rnd, False)[:3], 1.0)
+    arrays = batch.to_numpy()
+    assert arrays["side"].dtype == np.uint8 and arrays["id"].dtype == np.int64
+    assert arrays["price"].dtype == np.float64
+    # shares the memory of the batch
+    arrays["price"][0] = 42.0
+    assert batch.price[0] == 42.0
+    assert np.shares_memory(arrays["price"], np.asarray(batch.price))
+    # views taken before a growth or a clear keep their data
+    before = list(arrays["amount"])
+    batch.extend(random_trades(rnd, False), 2.0)
+    assert list(arrays["amount"]) == before
+    assert not np.shares_memory(arrays["price"], np.asarray(batch.price))
+    arrays = batch.to_numpy()
+    before = arrays["price"].copy()
+    batch.clear()
+    batch.extend(random_trades(rnd, False), 3.0)
+    assert (arrays["price"] == before).all()
+    print("Checked the NumPy arrays")
+
+
+def benchmark(rnd: random.Random):
+    trades = random_trades(rnd, False)
+
+    def append():
+        TradeBatch("COINBASE", "BTC-USD").extend(trades, 1.0)
+
+    def to_dict():
+        for trade in trades:
+            trade.to_dict(numeric_type=float)
+
+    for name, func in (("TradeBatch.extend", append), ("to_dict", to_dict)):
+        ns = timeit.timeit(func, number=10) / 10 / len(trades) * 1e9
+        print(f"{name}: {ns:.0f} ns per trade")
+
+
+def main():
+    rnd = random.Random(1)
+    check_trades(rnd)
+    check_deltas(rnd)
+    check_numpy(rnd)
+    benchmark(rnd)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
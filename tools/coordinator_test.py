@@ -0,0 +1,166 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Unit checks of cryptofeed.coordinator, with the leases in an in-memory stand-in for
+redis: two nodes split the shards evenly, the survivor takes over the shards of a node
+whose leases expired, a node joining gets shards handed over, and a shard plan that
+disappears between the set and the get does not stop a node from starting.
+"""
+
+from unittest import mock
+
+from cryptofeed import lease
+from cryptofeed.coordinator import ShardCoordinator
+
+
+class FakeRedis:
+    """
+    The commands LeaseRegistry and ShardCoordinator use, on a manual clock
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}
+        self.fail_gets = 0
+
+    def _alive(self, key: str) -> bool:
+        if key in self.data and self.data[key][1] is not None:
+            if self.data[key][1] <= self.now:
+                del self.data[key]
+        return key in self.data
+
+    def set(self, key: str, value: str, nx: bool = False, px: int = None):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = (value, None if px is None else self.now + px / 1000)
+        return True
+
+    def get(self, key: str):
+        if self.fail_gets:
+            # as if the key expired right after the set failed
+            self.fail_gets -= 1
+            return None
+        return self.data[key][0] if self._alive(key) else None
+
+    def mget(self, keys: list) -> list:
+        return [self.data[key][0] if self._alive(key) else None for key in keys]
+
+    def pexpire(self, key: str, px: int):
+        if self._alive(key):
+            self.data[key] = (self.data[key][0], self.now + px / 1000)
+            return 1
+        return 0
+
+    def delete(self, key: str):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match: str):
+        prefix = match.rstrip("*")
+        return [
+            key
+            for key in list(self.data)
+            if key.startswith(prefix) and self._alive(key)
+        ]
+
+    def register_script(self, script: str):
+        def run(keys: list, args: list):
+            key = keys[0]
+            if not self._alive(key) or self.data[key][0] != args[0]:
+                return 0
+            if script == lease.RENEW_SCRIPT:
+                return self.pexpire(key, args[1])
+            self.delete(key)
+            return 1
+
+        return run
+
+    def close(self):
+        pass
+
+
+class FakeSupervisor:
+    def __init__(self):
+        self.workers = []
+
+    def add_worker(self, target, args: tuple = ()):
+        self.workers.append(args[1])
+        return args[1]
+
+    def remove_worker(self, worker):
+        self.workers.remove(worker)
+
+
+class FakeAggregator:
+    def __init__(self, cpu_amount: int):
+        self.cpu_amount = cpu_amount
+
+    def break_down_pairs_per_cpu(self, shards: int) -> list:
+        return [{"COINBASE": [f"P{i}-USD"]} for i in range(shards)]
+
+    def run_process(self, markets: dict, index: int, conn):
+        pass
+
+
+def node(fake: FakeRedis, name: str, shards: int = 4):
+    with mock.patch.object(lease.redis.Redis, "from_url", return_value=fake):
+        return ShardCoordinator(FakeAggregator(4), shards=shards, ttl=30, node_id=name)
+
+
+def tick(fake: FakeRedis, seconds: float, *nodes):
+    fake.now += seconds
+    for coordinator, supervisor in nodes:
+        coordinator.last_renew = 0
+        coordinator.on_tick(supervisor)
+
+
+def check_fair_share():
+    fake = FakeRedis()
+    a = (node(fake, "a"), FakeSupervisor())
+    b = (node(fake, "b"), FakeSupervisor())
+    for _ in range(3):
+        tick(fake, 1, a, b)
+    assert sorted(a[1].workers + b[1].workers) == [0, 1, 2, 3]
+    assert len(a[1].workers) == len(b[1].workers) == 2
+    assert a[0].shards == b[0].shards
+
+    # b dies without releasing anything, its leases expire
+    for _ in range(4):
+        tick(fake, 10, a)
+    assert sorted(a[1].workers) == [0, 1, 2, 3]
+    print("Checked the fair share and the takeover of a dead node")
+
+    # a node joins, a hands shards over until both have their share
+    c = (node(fake, "c"), FakeSupervisor())
+    for _ in range(6):
+        tick(fake, 1, a, c)
+    assert len(a[1].workers) == len(c[1].workers) == 2
+    assert sorted(a[1].workers + c[1].workers) == [0, 1, 2, 3]
+    print("Checked the hand over to a joining node")
+
+
+def check_plan_missing():
+    fake = FakeRedis()
+    node(fake, "a", shards=3)
+    # the plan of a expires each time between the set and the get of b
+    fake.fail_gets = 10
+    b = node(fake, "b", shards=2)
+    assert b.shards == [{"COINBASE": ["P0-USD"]}, {"COINBASE": ["P1-USD"]}]
+
+    # a single failed get, the next round reads the published plan
+    fake.fail_gets = 1
+    c = node(fake, "c", shards=2)
+    assert len(c.shards) == 3
+    print("Checked a missing shard plan")
+
+
+def main():
+    check_fair_share()
+    check_plan_missing()
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
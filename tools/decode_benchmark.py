@@ -0,0 +1,100 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Compares decoding websocket messages inline on the event loop with the decode stage
+(cryptofeed.decode) on a thread and a process pool, with several connections decoding
+concurrently, and measures how long the event loop is blocked.
+
+    python tools/decode_benchmark.py [messages per connection] [connections]
+"""
+
+import asyncio
+import gzip
+import sys
+import time
+
+from yapic import json
+
+from cryptofeed.decode import DecodeStage, YapicDecoder
+
+
+def book_message(i: int) -> str:
+    return json.dumps(
+        {
+            "channel": "l2_data",
+            "sequence_num": i,
+            "events": [
+                {
+                    "type": "update",
+                    "product_id": "BTC-USD",
+                    "updates": [
+                        {
+                            "side": "bid" if j % 2 else "offer",
+                            "price_level": f"{60000 + j}.{i % 100:02d}",
+                            "new_quantity": f"0.{j:04d}",
+                        }
+                        for j in range(50)
+                    ],
+                }
+            ],
+        }
+    )
+
+
+async def lag_probe(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run(messages: list, connections: int, decoder, stage: DecodeStage = None):
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(lag_probe(stop, lags))
+
+    async def connection():
+        for i in range(0, len(messages), 100):
+            batch = messages[i : i + 100]
+            if stage:
+                await stage.decode(batch)
+            else:
+                for msg in batch:
+                    decoder(msg)
+                await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[connection() for _ in range(connections)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return len(messages) * connections / elapsed, max(lags) if lags else 0.0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    plain = [book_message(i) for i in range(count)]
+    gzipped = [gzip.compress(msg.encode()) for msg in plain]
+
+    for name, messages, decoder in (
+        ("json", plain, YapicDecoder()),
+        ("gzip+json", gzipped, YapicDecoder(gzip=True)),
+    ):
+        for mode, stage in (
+            ("inline", None),
+            ("thread", DecodeStage(decoder, executor="thread", workers=connections)),
+            ("process", DecodeStage(decoder, executor="process", workers=connections)),
+        ):
+            rate, lag = asyncio.run(run(messages, connections, decoder, stage))
+            print(
+                f"{name:10} {mode:8} {rate:10.0f} msg/s   max loop lag {lag * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Feeds a fixed point Coinbase feed (with and without tick_book) a book snapshot, then
+book updates and trades with more decimals than the tick and lot sizes of the symbol (as
+after the exchange changes them), and checks that the feed switches the symbol to
+Decimal, keeps its book, and delivers every update instead of raising.
+"""
+
+import asyncio
+from decimal import Decimal
+
+from cryptofeed.defines import ASK, BID, L2_BOOK, TRADES
+from cryptofeed.exchanges import Coinbase
+from cryptofeed.symbols import Symbols
+
+
+def level(side: str, price: str, size: str) -> dict:
+    return {"side": side, "price_level": price, "new_quantity": size}
+
+
+def trade(price: str, size: str) -> dict:
+    return {
+        "trade_id": "1",
+        "product_id": "BTC-USD",
+        "price": price,
+        "size": size,
+        "side": "BUY",
+        "time": "2024-01-01T00:00:00.000000Z",
+    }
+
+
+async def replay(tick_book: bool):
+    feed = Coinbase(
+        symbols=["BTC-USD"],
+        channels=[L2_BOOK, TRADES],
+        fixed_point=True,
+        tick_book=tick_book,
+    )
+    books = []
+    trades = []
+
+    async def on_book(book, receipt_timestamp):
+        books.append((book.to_dict(), book.fixed_point))
+
+    async def on_trade(t, receipt_timestamp):
+        trades.append((t.to_dict(), t.fixed_point))
+
+    feed.callbacks[L2_BOOK] = [on_book]
+    feed.callbacks[TRADES] = [on_trade]
+
+    snapshot = {
+        "product_id": "BTC-USD",
+        "updates": [level("bid", "100.01", "1.5"), level("ask", "100.02", "2")],
+    }
+    await feed._pair_level2_snapshot(snapshot, 1.0)
+    assert books[-1][1] is not None
+    await feed._trade_update([trade("100.01", "0.5")], 1.0)
+    assert trades[-1][1] is not None
+
+    # a tick size of 0.001
+    update = {"product_id": "BTC-USD", "updates": [level("bid", "100.005", "3")]}
+    await feed._pair_level2_update(update, 2.0, "2024-01-01T00:00:01.000000Z")
+    book, fixed_point = books[-1]
+    assert fixed_point is None
+    assert book["book"] == {
+        BID: {Decimal("100.01"): Decimal("1.5"), Decimal("100.005"): Decimal(3)},
+        ASK: {Decimal("100.02"): Decimal(2)},
+    }, book
+    assert book["delta"] == {BID: [(Decimal("100.005"), Decimal(3))], ASK: []}
+
+    await feed._trade_update([trade("100.005", "0.000000001")], 2.0)
+    data, fixed_point = trades[-1]
+    assert fixed_point is None
+    assert data["price"] == Decimal("100.005")
+    assert data["amount"] == Decimal("0.000000001")
+
+    # the next snapshot builds a Decimal book too
+    await feed._pair_level2_snapshot(snapshot, 3.0)
+    assert books[-1][1] is None
+    assert books[-1][0]["book"][BID] == {Decimal("100.01"): Decimal("1.5")}
+    print("Checked tick_book", tick_book)
+
+
+def main():
+    info = {
+        "tick_size": {"BTC-USD": "0.01"},
+        "lot_size": {"BTC-USD": "0.00000001"},
+    }
+    for tick_book in (False, True):
+        Symbols.set("COINBASE", {"BTC-USD": "BTC-USD"}, info)
+        asyncio.run(replay(tick_book))
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
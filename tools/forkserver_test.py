@@ -0,0 +1,75 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Starts a WorkerSupervisor with the "forkserver" start method after loading the symbols
+of a real exchange (the Coinbase parser, from a sample REST response), and checks that
+its workers get the same symbols from the template process without fetching them.
+"""
+
+import time
+
+from cryptofeed.exchanges import Coinbase
+from cryptofeed.supervisor import WorkerSupervisor
+from cryptofeed.symbols import Symbols
+
+SAMPLE = {
+    "products": [
+        {
+            "product_id": f"{base}-USD",
+            "base_currency_id": base,
+            "quote_currency_id": "USD",
+            "quote_increment": "0.01",
+            "base_increment": "0.00000001",
+        }
+        for base in ("BTC", "ETH", "SOL")
+    ]
+}
+
+
+def worker(conn):
+    if Symbols.populated(Coinbase.id):
+        normalized, info = Symbols.get(Coinbase.id)
+        conn.send({"type": "symbols", "normalized": normalized, "info": dict(info)})
+    else:
+        conn.send({"type": "symbols", "normalized": None})
+    while True:
+        time.sleep(1)
+
+
+def main():
+    Symbols.clear()
+    syms = Coinbase._set_symbol_data(SAMPLE)
+    info = {key: dict(value) for key, value in Symbols.get(Coinbase.id)[1].items()}
+    received = []
+
+    def on_message(w, msg):
+        received.append(msg)
+        supervisor.running = False
+
+    def on_tick(supervisor):
+        if time.time() - start > 60:
+            supervisor.running = False
+
+    supervisor = WorkerSupervisor(
+        start_method="forkserver",
+        on_message=on_message,
+        on_tick=on_tick,
+        shutdown_timeout=5,
+    )
+    supervisor.add_worker(worker)
+    start = time.time()
+    supervisor.run()
+
+    assert len(received) == 1, "the worker did not report its symbols"
+    assert received[0]["normalized"] == syms, received[0]
+    assert received[0]["info"] == info, received[0]
+    assert supervisor.snapshot_dir is None
+    print("Checked the symbols of a forkserver worker")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
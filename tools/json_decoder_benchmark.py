@@ -0,0 +1,110 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+
+Compares the JSON decoders of cryptofeed.decode on recorded websocket traffic: the raw
+data files written by AsyncFileCallback (named <EXCHANGE>.ws.<n>.<rotation>), grouped by
+exchange.
+
+    python tools/json_decoder_benchmark.py [--decimal-fields price,amount,bids,asks] FILE...
+
+Each exchange's messages are decoded with yapic (the default), orjson, and orjson with the
+decimal fields converted to Decimal (the field-selective mode for exchanges that send
+prices and sizes as JSON numbers).
+"""
+
+import argparse
+import ast
+import time
+from collections import defaultdict
+from os.path import basename
+
+from cryptofeed.decode import orjson, get_decoder
+from cryptofeed.exchanges import EXCHANGE_MAP
+
+
+def read_messages(filename: str) -> list:
+    """
+    The websocket messages received in a raw data file (sent messages, connects, headers
+    and http responses are skipped)
+    """
+    messages = []
+    with open(filename, "r") as fp:
+        for line in fp:
+            line = line.rstrip("\n")
+            if not line or line.startswith("configuration") or " -> " in line:
+                continue
+            if " <- " in line or " <-> " in line:
+                continue
+            _, data = line.split(": ", 1)
+            if data.startswith("b'") or data.startswith('b"'):
+                data = ast.literal_eval(data)
+            messages.append(data)
+    return messages
+
+
+def decoders(exchange: str, decimal_fields: list) -> dict:
+    settings = getattr(EXCHANGE_MAP.get(exchange), "message_decoder", None) or {}
+    gzip = settings.get("gzip", False)
+    ret = {"yapic": get_decoder("yapic", gzip=gzip)}
+    if orjson is not None:
+        ret["orjson"] = get_decoder("orjson", gzip=gzip)
+        if decimal_fields:
+            ret["orjson+decimal_fields"] = get_decoder(
+                "orjson", gzip=gzip, decimal_fields=decimal_fields
+            )
+    return ret
+
+
+def bench(decoder, messages: list, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for msg in messages:
+            decoder(msg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    parser.add_argument(
+        "--decimal-fields",
+        default="price,amount,size,bids,asks",
+        help="comma separated keys converted to Decimal in the field-selective mode",
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    decimal_fields = [f for f in args.decimal_fields.split(",") if f]
+
+    traffic = defaultdict(list)
+    for filename in args.files:
+        traffic[basename(filename).split(".")[0]].extend(read_messages(filename))
+
+    if orjson is None:
+        print("orjson is not installed, only yapic is measured")
+    for exchange, messages in sorted(traffic.items()):
+        if not messages:
+            continue
+        print(f"{exchange}: {len(messages)} messages")
+        baseline = None
+        for name, decoder in decoders(exchange, decimal_fields).items():
+            try:
+                elapsed = bench(decoder, messages, args.rounds)
+            except Exception as e:
+                print(f"    {name:24} failed: {e!r}")
+                continue
+            baseline = baseline or elapsed
+            print(
+                f"    {name:24} {len(messages) / elapsed:10.0f} msg/s "
+                f"{elapsed / len(messages) * 1e6:8.2f} us/msg   x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
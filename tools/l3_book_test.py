@@ -0,0 +1,190 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Replays random order flow through the Bitfinex raw (L3) book and BitMEX book handlers,
+and checks the books they deliver (L3Book, and the L2View of the BitMEX levels) against
+a plain dict model of the same orders, including the FIFO order of the orders of a level
+and max_depth.
+"""
+
+import asyncio
+import random
+from decimal import Decimal
+
+from cryptofeed.defines import ASK, BID, L2_BOOK, L3_BOOK
+from cryptofeed.exchanges import Bitfinex, Bitmex
+from cryptofeed.symbols import Symbols
+
+STEPS = 5000
+
+
+def expected_l3(orders: dict, max_depth: int) -> dict:
+    # orders: order id -> (side, price, size), in arrival order
+    book = {BID: {}, ASK: {}}
+    for order_id, (side, price, size) in orders.items():
+        book[side].setdefault(price, {})[order_id] = size
+    ret = {}
+    for side in (BID, ASK):
+        prices = sorted(book[side], reverse=side == BID)
+        if max_depth:
+            prices = prices[:max_depth]
+        ret[side] = {price: book[side][price] for price in prices}
+    return ret
+
+
+def expected_l2(orders: dict, max_depth: int) -> dict:
+    return {
+        side: {price: sum(level.values()) for price, level in levels.items()}
+        for side, levels in expected_l3(orders, max_depth).items()
+    }
+
+
+def bitfinex(max_depth: int, rnd: random.Random):
+    Symbols.set("BITFINEX", {"BTC-USD": "tBTCUSD"}, {})
+    feed = Bitfinex(symbols=["BTC-USD"], channels=[L3_BOOK], max_depth=max_depth)
+    books = []
+
+    async def book(book, receipt_timestamp):
+        books.append((book.to_dict(), book.delta))
+
+    feed.callbacks[L3_BOOK] = [book]
+    orders = {}
+
+    def random_order():
+        price = rnd.randint(900, 1100)
+        amount = rnd.randint(1, 9) * (1 if price < 1000 else -1)
+        return price, amount
+
+    snapshot = []
+    for order_id in range(200):
+        price, amount = random_order()
+        snapshot.append([order_id, price, amount])
+        orders[order_id] = (
+            BID if amount > 0 else ASK,
+            Decimal(price),
+            Decimal(abs(amount)),
+        )
+    asyncio.run(feed._raw_book("BTC-USD", [1, snapshot, 1], 1.0))
+    assert books[-1][0]["book"] == expected_l3(orders, max_depth)
+
+    next_id = 1000
+    for step in range(STEPS):
+        r = rnd.random()
+        if r < 0.3 and orders:
+            order_id = rnd.choice(list(orders))
+            side, price, _ = orders.pop(order_id)
+            msg = [order_id, 0, 1 if side == BID else -1]
+            delta = {BID: [], ASK: []}
+            delta[side].append((order_id, price, 0))
+        else:
+            if r < 0.6 and orders:
+                order_id = rnd.choice(list(orders))
+            else:
+                order_id, next_id = next_id, next_id + 1
+            price, amount = random_order()
+            side = BID if amount > 0 else ASK
+            delta = {BID: [], ASK: []}
+            if order_id in orders:
+                # a modified order goes to the back of its (new) level
+                delta[side].append((order_id, orders.pop(order_id)[1], 0))
+            orders[order_id] = (side, Decimal(price), Decimal(abs(amount)))
+            delta[side].append((order_id, Decimal(price), Decimal(abs(amount))))
+            msg = [order_id, price, amount]
+        asyncio.run(feed._raw_book("BTC-USD", [1, msg, step + 2], 1.0))
+        book, got_delta = books[-1]
+        assert got_delta == delta, (step, got_delta, delta)
+        expected = expected_l3(orders, max_depth)
+        assert book["book"] == expected, step
+        for side in (BID, ASK):
+            assert list(book["book"][side]) == list(expected[side])
+            for price, level in expected[side].items():
+                assert list(book["book"][side][price]) == list(level)
+    print("Bitfinex max_depth", max_depth, "checked", len(books), "updates")
+
+
+def bitmex(max_depth: int, rnd: random.Random):
+    Symbols.set("BITMEX", {"BTC-USD-PERP": "XBTUSD"}, {})
+    feed = Bitmex(symbols=["BTC-USD-PERP"], channels=[L2_BOOK], max_depth=max_depth)
+    feed._reset()
+    books = []
+
+    async def book(book, receipt_timestamp):
+        books.append(book.to_dict())
+
+    feed.callbacks[L2_BOOK] = [book]
+    # BitMEX levels: id -> (side, price, size), one id per price
+    orders = {}
+    data = []
+    for price in range(950, 1050):
+        side = "Buy" if price < 1000 else "Sell"
+        orders[price] = (BID if side == "Buy" else ASK, Decimal(price), Decimal(5))
+        data.append(
+            {"symbol": "XBTUSD", "id": price, "side": side, "size": 5, "price": price}
+        )
+    asyncio.run(feed._book({"action": "partial", "data": data}, 1.0))
+    assert books[-1]["book"] == expected_l2(orders, max_depth)
+
+    for step in range(STEPS):
+        r = rnd.random()
+        if r < 0.3 and orders:
+            level_id = rnd.choice(list(orders))
+            side = "Buy" if orders.pop(level_id)[0] == BID else "Sell"
+            msg = {
+                "action": "delete",
+                "data": [{"symbol": "XBTUSD", "id": level_id, "side": side}],
+            }
+        elif r < 0.7 and orders:
+            level_id = rnd.choice(list(orders))
+            side, price, _ = orders[level_id]
+            size = rnd.randint(1, 50)
+            orders[level_id] = (side, price, Decimal(size))
+            msg = {
+                "action": "update",
+                "data": [
+                    {
+                        "symbol": "XBTUSD",
+                        "id": level_id,
+                        "side": "Buy" if side == BID else "Sell",
+                        "size": size,
+                    }
+                ],
+            }
+        else:
+            price = rnd.randint(900, 1100)
+            if price in orders:
+                continue
+            side = "Buy" if price < 1000 else "Sell"
+            orders[price] = (BID if side == "Buy" else ASK, Decimal(price), Decimal(3))
+            msg = {
+                "action": "insert",
+                "data": [
+                    {
+                        "symbol": "XBTUSD",
+                        "id": price,
+                        "side": side,
+                        "size": 3,
+                        "price": price,
+                    }
+                ],
+            }
+        asyncio.run(feed._book(msg, 1.0))
+        expected = expected_l2(orders, max_depth)
+        assert books[-1]["book"] == expected, step
+        for side in (BID, ASK):
+            assert list(books[-1]["book"][side]) == list(expected[side])
+    print("BitMEX max_depth", max_depth, "checked", len(books), "updates")
+
+
+def main():
+    rnd = random.Random(1)
+    for max_depth in (0, 10):
+        bitfinex(max_depth, rnd)
+        bitmex(max_depth, rnd)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
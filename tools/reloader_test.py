@@ -0,0 +1,132 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Unit checks of cryptofeed.reloader with stand-ins for the aggregator and the workers:
+added pairs go to the least loaded worker, removed pairs are removed from the workers
+carrying them, a channel change is sent to every worker, and changes wait while the
+rebalancer moves pairs.
+"""
+
+import os
+import tempfile
+
+import yaml
+
+from cryptofeed.reloader import TopologyReloader
+from cryptofeed.shards import ACK, ADD_PAIRS, REMOVE_PAIRS, SET_CHANNELS
+
+TRADES = {"trades": {"backend": "redis.TradeStream"}}
+BOOKS = {"l2_book": {"backend": "redis.BookStream"}}
+
+
+class FakeWorker:
+    def __init__(self, worker_id: int, markets: dict):
+        self.id = worker_id
+        self.args = (markets, worker_id)
+        self.is_alive = True
+        self.sent = []
+
+    def send(self, msg: dict) -> bool:
+        self.sent.append(msg)
+        return True
+
+
+class FakeSupervisor:
+    def __init__(self, workers: list):
+        self.workers = workers
+
+
+class FakeAggregator:
+    def __init__(self, topology_file: str):
+        self.topology_file = topology_file
+        self.channels = TRADES
+        self.markets = None
+
+    def get_markets(self) -> dict:
+        return {"COINBASE": list(self.pairs)}
+
+
+class FakeRebalancer:
+    move = None
+
+
+def write(path: str, pairs: list, channels: dict):
+    with open(path, "w") as fp:
+        yaml.safe_dump(
+            {"exchanges": ["COINBASE"], "pairs": pairs, "channels": channels}, fp
+        )
+    # a new mtime, even within the resolution of the file system
+    mtime = os.path.getmtime(path) + 1
+    os.utime(path, (mtime, mtime))
+
+
+def reload(reloader: TopologyReloader, supervisor: FakeSupervisor):
+    reloader.last_check = 0
+    reloader.on_tick(supervisor)
+    if reloader.loading is not None:
+        reloader.loading.result()
+        reloader.on_tick(supervisor)
+
+
+def check_reload(directory: str):
+    path = os.path.join(directory, "topology.yaml")
+    write(path, ["A-USD", "B-USD", "C-USD"], TRADES)
+    aggregator = FakeAggregator(path)
+    rebalancer = FakeRebalancer()
+    reloader = TopologyReloader(aggregator, 1, rebalancer=rebalancer)
+    first = FakeWorker(0, {"COINBASE": ["A-USD", "B-USD"]})
+    second = FakeWorker(1, {"COINBASE": ["C-USD"]})
+    supervisor = FakeSupervisor([first, second])
+
+    write(path, ["A-USD", "C-USD", "D-USD", "E-USD"], TRADES)
+    reload(reloader, supervisor)
+    assert [msg["type"] for msg in first.sent] == [REMOVE_PAIRS, ADD_PAIRS]
+    assert first.sent[0]["markets"] == {"COINBASE": ["B-USD"]}
+    assert second.sent[0]["type"] == ADD_PAIRS
+    added = first.sent[1]["markets"]["COINBASE"] + second.sent[0]["markets"]["COINBASE"]
+    assert sorted(added) == ["D-USD", "E-USD"]
+    assert sorted(first.args[0]["COINBASE"] + second.args[0]["COINBASE"]) == [
+        "A-USD",
+        "C-USD",
+        "D-USD",
+        "E-USD",
+    ]
+    for msg in first.sent + second.sent:
+        reloader.on_message(first, {"type": ACK, "id": msg["id"], "ok": True})
+    assert not reloader.pending
+    print("Checked added and removed pairs")
+
+    # a move of the rebalancer is running, the change waits for it to complete
+    first.sent.clear()
+    second.sent.clear()
+    write(path, ["A-USD"], BOOKS)
+    rebalancer.move = {}
+    reload(reloader, supervisor)
+    assert not first.sent and not second.sent
+    rebalancer.move = None
+    reload(reloader, supervisor)
+    assert first.sent[0] == {
+        "type": SET_CHANNELS,
+        "id": first.sent[0]["id"],
+        "channels": BOOKS,
+    }
+    assert second.sent[0]["type"] == SET_CHANNELS
+    assert [msg["type"] for msg in first.sent[1:] + second.sent[1:]] == [
+        REMOVE_PAIRS
+    ] * 2
+    assert first.args[0] == {"COINBASE": ["A-USD"]} and second.args[0] == {}
+    assert aggregator.channels == BOOKS
+    print("Checked a channel change and a change during a move")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        check_reload(directory)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
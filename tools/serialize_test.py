@@ -0,0 +1,201 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Decodes the output of serialize() with msgpack (pip install msgpack) and checks it
+against to_dict(numeric_type=float) with the timestamps the backends add, for every
+type and kind of book (order_book, fixed point TickBook, L3Book and its L2View, with
+and without max_depth, snapshots and deltas). Also times serialize() against to_dict()
+and json.dumps (yapic, as the backends).
+"""
+
+import random
+import timeit
+from decimal import Decimal
+
+import msgpack
+from yapic import json
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import (
+    Buffer,
+    Candle,
+    FixedPoint,
+    Funding,
+    Index,
+    L3Book,
+    Liquidation,
+    OpenInterest,
+    OrderBook,
+    Ticker,
+    Trade,
+)
+from cryptofeed.util.time import ReceiptTimestamp
+
+FP = FixedPoint.from_increments("0.01", "0.0001")
+
+
+def lists(data):
+    # msgpack decodes arrays as lists, to_dict has tuples
+    if isinstance(data, dict):
+        return {key: lists(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [lists(value) for value in data]
+    return data
+
+
+def expected(data: dict, receipt_timestamp) -> dict:
+    # see _set_timestamps in cryptofeed.backends.backend
+    if receipt_timestamp is not None:
+        if not data["timestamp"]:
+            data["timestamp"] = (
+                receipt_timestamp / 1e9
+                if type(receipt_timestamp) is int
+                else float(receipt_timestamp)
+            )
+        data["receipt_timestamp"] = receipt_timestamp
+    return lists(data)
+
+
+def check_types(buffer: Buffer):
+    objs = [
+        Trade(
+            "COINBASE", "BTC-USD", "buy", Decimal("0.5"), Decimal("100.01"), 1.5, id="1"
+        ),
+        Trade(
+            "COINBASE",
+            "BTC-USD",
+            "sell",
+            FP.size("0.5"),
+            FP.price("100.01"),
+            1.5,
+            id="2",
+            fixed_point=FP,
+        ),
+        Trade("COINBASE", "é" * 40, "buy", Decimal(1), Decimal(1), 1.0, id="x" * 300),
+        Ticker("COINBASE", "BTC-USD", Decimal("1"), Decimal("2"), None),
+        Ticker(
+            "COINBASE", "BTC-USD", FP.price("1"), FP.price("2"), 3.0, fixed_point=FP
+        ),
+        Funding("BITMEX", "BTC-USD-PERP", Decimal(3), Decimal("0.0001"), 12.0, 4.0),
+        Candle(
+            "BINANCE",
+            "BTC-USDT",
+            1.0,
+            2.0,
+            "1m",
+            5,
+            Decimal(1),
+            Decimal(2),
+            Decimal(3),
+            Decimal("0.5"),
+            Decimal(10),
+            True,
+            2.0,
+        ),
+        Liquidation(
+            "BITMEX", "BTC-USD-PERP", "buy", Decimal(1), Decimal(2), "id", "filled", 3.0
+        ),
+        Index("BITMEX", "BTC-USD-PERP", Decimal("5.5"), 1.0),
+        OpenInterest("BITMEX", "BTC-USD-PERP", Decimal(7), None),
+    ]
+    receipts = (None, 10.5, ReceiptTimestamp(1700000000123456789), 1700000000123456789)
+    for obj in objs:
+        for receipt_timestamp in receipts:
+            data = expected(obj.to_dict(numeric_type=float), receipt_timestamp)
+            got = msgpack.unpackb(obj.serialize(receipt_timestamp, buffer))
+            assert got == data, (got, data)
+    print("Checked", len(objs), "updates of", len({type(o) for o in objs}), "types")
+
+
+def random_books(rnd: random.Random) -> list:
+    books = []
+    for max_depth in (0, 3):
+        book = OrderBook("COINBASE", "BTC-USD", max_depth=max_depth)
+        tick_book = OrderBook(
+            "COINBASE", "BTC-USD", max_depth=max_depth, fixed_point=FP, tick_book=True
+        )
+        l3 = L3Book(max_depth=max_depth)
+        for order_id in range(300):
+            side = rnd.choice((BID, ASK))
+            price = (
+                rnd.randint(9000, 9999) if side == BID else rnd.randint(10000, 11000)
+            )
+            if rnd.random() < 0.02:
+                # far from the others, in the overflow of the tick ladder
+                price += 10**6 if side == ASK else -8000
+            size = rnd.randint(1, 10**6)
+            book.book[side][Decimal(price) / 100] = Decimal(size) / 10**4
+            tick_book.book[side][price] = size
+            l3.add(order_id, side, Decimal(price) / 100, Decimal(size) / 10**4)
+        for b in (book, tick_book):
+            b.delta = {BID: [(b.book[BID].index(0)[0], 0)], ASK: []}
+        l3_book = OrderBook("BITFINEX", "BTC-USD", book=l3)
+        l3_book.delta = {BID: [(7, Decimal(1), Decimal(2))], ASK: [("x", 3, 0)]}
+        l2_view = OrderBook("BITMEX", "BTC-USD-PERP", book=l3.l2)
+        l2_view.delta = {BID: [], ASK: [(Decimal(2), Decimal(1))]}
+        books += [book, tick_book, l3_book, l2_view]
+    books.append(OrderBook("COINBASE", "ETH-USD"))
+    return books
+
+
+def check_books(buffer: Buffer, rnd: random.Random):
+    books = random_books(rnd)
+    for book in books:
+        for delta in (False, True):
+            data = book.to_dict(delta=delta, numeric_type=float)
+            if not delta:
+                del data["delta"]
+            data = expected(data, 10.5)
+            got = msgpack.unpackb(
+                book.serialize(10.5, buffer, delta), strict_map_key=False
+            )
+            assert got == data, (got, data)
+            if not delta:
+                for side in (BID, ASK):
+                    assert list(got["book"][side]) == list(data["book"][side])
+    print("Checked", len(books), "books")
+
+
+def benchmark(buffer: Buffer):
+    trades = [
+        Trade(
+            "COINBASE",
+            "BTC-USD",
+            "buy",
+            Decimal("0.5"),
+            Decimal("100.25"),
+            1.0,
+            id=str(i),
+        )
+        for i in range(10000)
+    ]
+
+    def serialize():
+        for trade in trades:
+            trade.serialize(1.5, buffer)
+
+    def to_json():
+        for trade in trades:
+            data = trade.to_dict(numeric_type=float)
+            data["receipt_timestamp"] = 1.5
+            json.dumps(data)
+
+    for name, func in (("serialize", serialize), ("to_dict + json", to_json)):
+        ns = timeit.timeit(func, number=10) / 10 / len(trades) * 1e9
+        print(f"{name}: {ns:.0f} ns per trade")
+
+
+def main():
+    # a small buffer, to go through its growth
+    buffer = Buffer(16)
+    check_types(buffer)
+    check_books(buffer, random.Random(1))
+    benchmark(buffer)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Unit checks of cryptofeed.shards with stand-ins for the supervisor's workers and the
+aggregator: a ShardRebalancer move (make before break, acknowledgements, roll back on a
+failed add or a timeout), and a ShardWorker adding and removing pairs on the running
+feed of their exchange and acknowledging the commands.
+"""
+
+import asyncio
+import time
+
+from cryptofeed.shards import (
+    ACK,
+    ADD_PAIRS,
+    REMOVE_PAIRS,
+    ShardRebalancer,
+    ShardWorker,
+    update_worker_markets,
+)
+
+
+class FakeWorker:
+    def __init__(self, worker_id: int, markets: dict):
+        self.id = worker_id
+        self.args = (markets, worker_id)
+        self.is_alive = True
+        self.status = {}
+        self.sent = []
+
+    def send(self, msg: dict) -> bool:
+        self.sent.append(msg)
+        return True
+
+    def heartbeat(self, loop_lag: float):
+        self.status = {"time": time.time() + len(self.sent), "loop_lag": loop_lag}
+
+
+class FakeSupervisor:
+    def __init__(self, workers: list):
+        self.workers = workers
+
+
+class FakeAggregator:
+    rate_profile = None
+    pack_pairs = True
+
+    def metrics_config(self, index: int):
+        return None
+
+    def get_callbacks(self) -> dict:
+        return {}
+
+    def create_feeds(self, markets: dict, callbacks: dict) -> list:
+        return []
+
+
+class FakeFeed:
+    incremental_subscriptions = True
+
+    def __init__(self, exchange: str, pairs: list, ready: bool = True):
+        self.id = exchange
+        self.normalized_symbols = list(pairs)
+        self._feed_config = {"trades": list(pairs)}
+        self.ready = ready
+        self.calls = []
+
+    async def add_symbols(self, channel: str, pairs: list):
+        self.calls.append(("add", channel, list(pairs)))
+        self.normalized_symbols += pairs
+
+    async def remove_symbols(self, channel: str, pairs: list):
+        self.calls.append(("remove", channel, list(pairs)))
+        self.normalized_symbols = [p for p in self.normalized_symbols if p not in pairs]
+
+    async def wait_updates(self, pairs: list, timeout: float) -> bool:
+        return self.ready
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg: dict):
+        self.sent.append(msg)
+
+
+def check_update_worker_markets():
+    worker = FakeWorker(0, {"COINBASE": ["BTC-USD"]})
+    update_worker_markets(worker, {"COINBASE": ["ETH-USD"], "BINANCE": ["X"]}, add=True)
+    assert worker.args[0] == {"COINBASE": ["BTC-USD", "ETH-USD"], "BINANCE": ["X"]}
+    update_worker_markets(
+        worker, {"COINBASE": ["BTC-USD"], "BINANCE": ["X"]}, add=False
+    )
+    assert worker.args[0] == {"COINBASE": ["ETH-USD"]}
+    assert worker.args[1] == 0
+    print("Checked update_worker_markets")
+
+
+def overloaded_supervisor():
+    source = FakeWorker(0, {"COINBASE": ["A-USD", "B-USD", "C-USD", "D-USD"]})
+    destination = FakeWorker(1, {"COINBASE": ["E-USD"]})
+    supervisor = FakeSupervisor([source, destination])
+    rebalancer = ShardRebalancer(FakeAggregator(), patience=2, cooldown=0, timeout=60)
+    for _ in range(2):
+        source.heartbeat(1.0)
+        destination.heartbeat(0.0)
+        rebalancer.on_tick(supervisor)
+    return rebalancer, supervisor, source, destination
+
+
+def check_rebalancer_move():
+    rebalancer, supervisor, source, destination = overloaded_supervisor()
+    add = destination.sent[-1]
+    assert add["type"] == ADD_PAIRS and not source.sent
+    moved = add["markets"]["COINBASE"]
+    assert 0 < len(moved) < 4
+    # make before break: the source keeps the pairs until the destination has them
+    assert source.args[0]["COINBASE"] == ["A-USD", "B-USD", "C-USD", "D-USD"]
+    rebalancer.on_message(destination, {"type": ACK, "id": add["id"], "ok": True})
+    remove = source.sent[-1]
+    assert remove["type"] == REMOVE_PAIRS and remove["markets"] == add["markets"]
+    assert destination.args[0]["COINBASE"] == ["E-USD", *moved]
+    assert not set(moved) & set(source.args[0]["COINBASE"])
+    rebalancer.on_message(source, {"type": ACK, "id": remove["id"], "ok": True})
+    assert rebalancer.move is None
+    print("Checked a rebalancer move of", moved)
+
+
+def check_rebalancer_rollback():
+    # the destination fails to add the pairs
+    rebalancer, supervisor, source, destination = overloaded_supervisor()
+    add = destination.sent[-1]
+    rebalancer.on_message(destination, {"type": ACK, "id": add["id"], "ok": False})
+    assert destination.sent[-1]["type"] == REMOVE_PAIRS
+    assert destination.sent[-1]["markets"] == add["markets"]
+    assert not source.sent and rebalancer.move is None
+    assert len(source.args[0]["COINBASE"]) == 4
+
+    # no acknowledgement at all
+    rebalancer, supervisor, source, destination = overloaded_supervisor()
+    rebalancer.move["sent"] -= rebalancer.timeout + 1
+    rebalancer.on_tick(supervisor)
+    assert destination.sent[-1]["type"] == REMOVE_PAIRS
+    assert not source.sent and rebalancer.move is None
+    print("Checked the rebalancer roll backs")
+
+
+async def check_worker():
+    worker = ShardWorker(FakeAggregator(), {}, 0, ready_timeout=1)
+    feed = FakeFeed("COINBASE", ["BTC-USD"])
+    worker.feedhandler.feeds.append(feed)
+    conn = FakeConn()
+
+    await worker._handle(
+        conn, {"type": ADD_PAIRS, "id": 1, "markets": {"COINBASE": ["ETH-USD"]}}
+    )
+    assert feed.calls == [("add", "trades", ["ETH-USD"])]
+    assert conn.sent[-1] == {"type": ACK, "id": 1, "ok": True}
+
+    await worker._handle(
+        conn, {"type": REMOVE_PAIRS, "id": 2, "markets": {"COINBASE": ["BTC-USD"]}}
+    )
+    assert feed.calls[-1] == ("remove", "trades", ["BTC-USD"])
+    assert feed.normalized_symbols == ["ETH-USD"]
+    assert conn.sent[-1] == {"type": ACK, "id": 2, "ok": True}
+
+    # the added pairs have no update in time, the supervisor is told so
+    feed.ready = False
+    await worker._handle(
+        conn, {"type": ADD_PAIRS, "id": 3, "markets": {"COINBASE": ["SOL-USD"]}}
+    )
+    assert conn.sent[-1] == {"type": ACK, "id": 3, "ok": False}
+    print("Checked the ShardWorker commands")
+
+
+def main():
+    check_update_worker_markets()
+    check_rebalancer_move()
+    check_rebalancer_rollback()
+    asyncio.run(check_worker())
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
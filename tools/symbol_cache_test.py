@@ -0,0 +1,86 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Saves the symbols parsed by the real _parse_symbol_data of a few exchanges (from sample
+REST responses) to the symbol cache, loads them back and checks they are the same. Also
+checks that a failure to write the cache does not fail the fetch.
+"""
+
+import os
+import tempfile
+
+from cryptofeed.exchanges import Binance, Coinbase
+from cryptofeed.symbols import Symbols
+
+SAMPLES = {
+    Coinbase: {
+        "products": [
+            {
+                "product_id": f"{base}-USD",
+                "base_currency_id": base,
+                "quote_currency_id": "USD",
+                "quote_increment": "0.01",
+                "base_increment": "0.00000001",
+            }
+            for base in ("BTC", "ETH", "SOL")
+        ]
+    },
+    Binance: {
+        "symbols": [
+            {
+                "symbol": f"{base}USDT",
+                "status": "TRADING",
+                "baseAsset": base,
+                "quoteAsset": "USDT",
+                "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.01000000"}],
+            }
+            for base in ("BTC", "ETH")
+        ]
+    },
+}
+
+
+def plain(data):
+    if isinstance(data, dict):
+        return {key: plain(value) for key, value in data.items()}
+    return data
+
+
+def check_round_trip(directory: str):
+    Symbols.enable_cache(directory)
+    for exchange, sample in SAMPLES.items():
+        Symbols.clear()
+        syms = exchange._set_symbol_data(sample)
+        info = plain(Symbols.get(exchange.id)[1])
+        assert os.path.exists(Symbols._cache_file(exchange.id)), exchange.id
+        Symbols.clear()
+        assert exchange._load_cached_symbols() == syms, exchange.id
+        assert Symbols.get(exchange.id)[1] == info, exchange.id
+        print("Checked", exchange.id, len(syms), "symbols")
+
+
+def check_write_failure(directory: str):
+    # the cache directory is a file, the symbols are still set
+    filename = os.path.join(directory, "not-a-directory")
+    open(filename, "w").close()
+    Symbols.clear()
+    Symbols.cache_dir = filename
+    syms = Coinbase._set_symbol_data(SAMPLES[Coinbase])
+    assert Symbols.get(Coinbase.id)[0] == syms
+    assert os.listdir(directory) == ["not-a-directory"]
+    print("Checked a failed cache write")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        check_round_trip(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        check_write_failure(directory)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Applies the same random updates (a drifting mid price, with levels far from it landing
+in the overflow of the ladder) to a TickBook and an order_book.OrderBook, and checks
+that they read the same: to_dict, len, keys, index, to_list and iteration, with and
+without max_depth.
+"""
+
+import random
+
+import order_book
+
+from cryptofeed.defines import ASK, BID
+from cryptofeed.types import TickBook
+
+TRIALS = 200
+STEPS = 2000
+
+
+def check(a: TickBook, b: order_book.OrderBook, strict: bool, where):
+    assert a.to_dict() == b.to_dict(), where
+    for side in (BID, ASK):
+        assert list(a.to_dict()[side]) == list(b.to_dict()[side]), where
+        assert len(a[side]) == len(b[side]), where
+        assert a[side].keys() == b[side].keys(), where
+        if len(b[side]):
+            assert a[side].index(0) == b[side].index(0), where
+        # order_book does not truncate on bulk assignment in strict mode, so
+        # the levels beyond max_depth differ
+        if not strict:
+            assert a[side].to_list() == b[side].to_list(), where
+            assert list(a[side]) == list(b[side]), where
+            if len(b[side]):
+                assert a[side].index(-1) == b[side].index(-1), where
+
+
+def trial(rnd: random.Random, index: int):
+    tick = rnd.choice([1, 5])
+    max_depth = rnd.choice([0, 0, 5, 20])
+    strict = bool(max_depth) and rnd.random() < 0.3
+    levels = rnd.choice([4, 16, 64, 4096])
+    a = TickBook(tick, max_depth=max_depth, max_depth_strict=strict, levels=levels)
+    b = order_book.OrderBook(max_depth=max_depth, max_depth_strict=strict)
+
+    mid = rnd.randint(1000, 100000)
+    for side in (BID, ASK):
+        snapshot = {
+            (mid + (i if side == ASK else -i)) * tick: rnd.randint(1, 100)
+            for i in rnd.sample(range(1, 500), 50)
+        }
+        a[side] = snapshot
+        b[side] = snapshot
+
+    for step in range(STEPS):
+        side = rnd.choice([BID, ASK])
+        mid += rnd.randint(-3, 3)
+        offset = int(rnd.expovariate(0.05))
+        price = (mid - offset if side == BID else mid + offset) * tick
+        if rnd.random() < 0.4:
+            assert (price in a[side]) == (price in b[side]), (index, step)
+            if price in b[side]:
+                assert a[side][price] == b[side][price], (index, step)
+                del a[side][price]
+                del b[side][price]
+        else:
+            size = rnd.randint(1, 100)
+            a[side][price] = size
+            b[side][price] = size
+        if step % 97 == 0:
+            check(a, b, strict, (index, step))
+    check(a, b, strict, (index, STEPS))
+
+
+def main():
+    rnd = random.Random(1)
+    for index in range(TRIALS):
+        trial(rnd, index)
+    print("Checked", TRIALS, "books of", STEPS, "updates")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Copyright (C) 2017-2024 Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+
+Kills a process in the middle of submitting large updates to a WriterPool (as the
+supervisor kills a hung worker), and checks that another process can still submit to
+the same member, and that all its updates are written.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from cryptofeed.backends.pool import WriterPool
+
+
+class FileSink:
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    async def open(self):
+        pass
+
+    async def write(self, items: list):
+        # a slow writer, so the producers block in the middle of their sends
+        await asyncio.sleep(0.01)
+        with open(self.filename, "a") as fp:
+            for item in items:
+                fp.write(item.split()[0] + "\n")
+
+    async def close(self):
+        pass
+
+
+def producer(pool: WriterPool, prefix: str, count: int, size: int):
+    async def run():
+        for i in range(count):
+            pool.submit(("trades", "COINBASE", prefix), f"{prefix}-{i}".ljust(size))
+            await asyncio.sleep(0)
+        pool.flush()
+
+    asyncio.run(run())
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "written")
+        pool = WriterPool(FileSink(filename), size=1)
+        pool.start()
+
+        killed = multiprocessing.Process(
+            target=producer, args=(pool, "killed", 10**9, 10**6)
+        )
+        killed.start()
+        time.sleep(1)
+        killed.kill()
+        killed.join()
+
+        other = multiprocessing.Process(target=producer, args=(pool, "other", 100, 10))
+        other.start()
+        other.join(10)
+        assert other.exitcode == 0, "the other producer is blocked"
+
+        pool.stop(timeout=10)
+        with open(filename) as fp:
+            written = fp.read().split()
+        assert any(w.startswith("killed-") for w in written)
+        assert [w for w in written if w.startswith("other-")] == [
+            f"other-{i}" for i in range(100)
+        ]
+        assert not os.path.exists(pool.directory)
+        print("Checked", len(written), "updates after a producer was killed")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()